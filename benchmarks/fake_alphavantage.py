@@ -0,0 +1,330 @@
+# fake_alphavantage.py
+"""
+Local stand-in for the AlphaVantage query API.
+
+Serves TIME_SERIES_INTRADAY, CURRENCY_EXCHANGE_RATE, FX_DAILY and
+FX_INTRADAY responses from recorded payloads or, for symbols and pairs
+without a recording, from deterministic synthetic data. Network latency and the per-minute quota are
+simulated: requests beyond the quota get the same "Note" payload as the real
+API, with HTTP status 200.
+
+    python -m benchmarks.fake_alphavantage serve --port 18765 --latency-ms 80 --calls-per-minute 75
+    python -m benchmarks.fake_alphavantage record --symbol IBM --pair USD:EUR   # needs an API key
+
+Recordings are stored in the fixtures directory as
+TIME_SERIES_INTRADAY_<SYMBOL>_<interval>_<outputsize>.json,
+CURRENCY_EXCHANGE_RATE_<FROM>_<TO>.json and
+FX_DAILY_<FROM>_<TO>_<outputsize>.json (FX_INTRADAY_<FROM>_<TO>_<interval>_...).
+A compact (latest 100 points) response is derived from a full recording
+when there is no compact one, so incremental updates of the servers merge
+cleanly. Request counters are
+available at /stats.
+
+Run from the repository root.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import time
+import zlib
+from collections import Counter, deque
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Deque, Dict, Optional
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+# Bars in a compact intraday response
+COMPACT_BARS = 100
+
+THROTTLE_NOTE = (
+    "Thank you for using Alpha Vantage! Our standard API call frequency is 5 calls per minute and 500 calls per day."
+)
+
+INTERVAL_MINUTES = {"1min": 1, "5min": 5, "15min": 15, "30min": 30, "60min": 60}
+
+
+def _seed(*parts: str) -> int:
+    return zlib.crc32("|".join(parts).encode())
+
+
+def synthetic_intraday(symbol: str, interval: str, bars: int) -> Dict[str, Any]:
+    """A random-walk intraday payload, newest bar first, ending at a fixed time."""
+    rng = random.Random(_seed(symbol, interval))
+    step = timedelta(minutes=INTERVAL_MINUTES.get(interval, 1))
+    end = datetime(2025, 1, 31, 19, 59)
+    close = 50 + rng.random() * 200
+    closes = []
+    for _ in range(bars):
+        close = max(1.0, close * (1 + rng.gauss(0, 0.0005)))
+        closes.append(close)
+    series = {}
+    for i in range(bars):
+        close = closes[bars - 1 - i]
+        series[(end - i * step).strftime("%Y-%m-%d %H:%M:%S")] = {
+            "1. open": f"{close * (1 + rng.gauss(0, 0.0002)):.4f}",
+            "2. high": f"{close * 1.0005:.4f}",
+            "3. low": f"{close * 0.9995:.4f}",
+            "4. close": f"{close:.4f}",
+            "5. volume": str(rng.randint(100, 100_000)),
+        }
+    return {
+        "Meta Data": {
+            "1. Information": "Intraday prices (synthetic)",
+            "2. Symbol": symbol,
+            "3. Last Refreshed": end.strftime("%Y-%m-%d %H:%M:%S"),
+            "4. Interval": interval,
+            "5. Output Size": "Full size",
+            "6. Time Zone": "US/Eastern",
+        },
+        f"Time Series ({interval})": series,
+    }
+
+
+def _currency_value(code: str) -> float:
+    return 0.01 + (_seed(code) % 10_000) / 2_000
+
+
+def synthetic_fx_series(from_currency: str, to_currency: str, interval: str, points: int) -> Dict[str, Any]:
+    """A random-walk FX_DAILY / FX_INTRADAY payload, newest point first, ending at a fixed time."""
+    rng = random.Random(_seed(from_currency, to_currency, interval))
+    daily = interval == "daily"
+    end = datetime(2025, 1, 31) if daily else datetime(2025, 1, 31, 21, 55)
+    step = timedelta(days=1) if daily else timedelta(minutes=INTERVAL_MINUTES.get(interval, 5))
+    rate = _currency_value(from_currency) / _currency_value(to_currency)
+    series = {}
+    stamp = end
+    while len(series) < points:
+        if not (daily and stamp.weekday() >= 5):
+            close = rate
+            rate = max(1e-6, rate * (1 + rng.gauss(0, 0.004 if daily else 0.0003)))
+            series[stamp.strftime("%Y-%m-%d" if daily else "%Y-%m-%d %H:%M:%S")] = {
+                "1. open": f"{rate:.5f}",
+                "2. high": f"{max(rate, close) * (1 + abs(rng.gauss(0, 0.001))):.5f}",
+                "3. low": f"{min(rate, close) * (1 - abs(rng.gauss(0, 0.001))):.5f}",
+                "4. close": f"{close:.5f}",
+            }
+        stamp -= step
+    key = "Time Series FX (Daily)" if daily else f"Time Series FX ({interval})"
+    return {
+        "Meta Data": {
+            "1. Information": f"Forex {'Daily' if daily else 'Intraday'} Prices (synthetic)",
+            "2. From Symbol": from_currency,
+            "3. To Symbol": to_currency,
+            "4. Last Refreshed": next(iter(series)),
+            "5. Time Zone": "UTC",
+        },
+        key: series,
+    }
+
+
+def synthetic_exchange_rate(from_currency: str, to_currency: str) -> Dict[str, Any]:
+    """An exchange rate derived from stable per-currency values, drifting slowly over time."""
+    drift = 1 + 0.001 * math.sin(time.time() / 60 + _seed(from_currency, to_currency) % 100)
+    rate = _currency_value(from_currency) / _currency_value(to_currency) * drift
+    return {
+        "Realtime Currency Exchange Rate": {
+            "1. From_Currency Code": from_currency,
+            "2. From_Currency Name": f"{from_currency} (synthetic)",
+            "3. To_Currency Code": to_currency,
+            "4. To_Currency Name": f"{to_currency} (synthetic)",
+            "5. Exchange Rate": f"{rate:.8f}",
+            "6. Last Refreshed": datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+            "7. Time Zone": "UTC",
+            "8. Bid Price": f"{rate * 0.9999:.8f}",
+            "9. Ask Price": f"{rate * 1.0001:.8f}",
+        }
+    }
+
+
+class Payloads:
+    """
+    Response bodies by request, from recordings or synthetic data.
+
+    Args:
+        fixtures_dir: Directory of recorded payloads.
+        full_bars: Bars in a synthetic full intraday response.
+    """
+
+    def __init__(self, fixtures_dir: Path = FIXTURES_DIR, full_bars: int = 20_000):
+        self.fixtures_dir = fixtures_dir
+        self.full_bars = full_bars
+        self._bodies: Dict[tuple, bytes] = {}
+
+    def _recorded(self, name: str) -> Optional[Dict[str, Any]]:
+        path = self.fixtures_dir / f"{name}.json"
+        if not path.is_file():
+            return None
+        with open(path, "rb") as f:
+            return json.loads(f.read())
+
+    def intraday(self, symbol: str, interval: str, outputsize: str) -> bytes:
+        key = ("intraday", symbol, interval, outputsize)
+        if key not in self._bodies:
+            payload = self._recorded(f"TIME_SERIES_INTRADAY_{symbol}_{interval}_{outputsize}")
+            if payload is None:
+                payload = self._recorded(f"TIME_SERIES_INTRADAY_{symbol}_{interval}_full")
+                if payload is None:
+                    payload = synthetic_intraday(symbol, interval, self.full_bars)
+                if outputsize == "compact":
+                    # The latest bars of the full series (newest first)
+                    series_key = f"Time Series ({interval})"
+                    series = payload.get(series_key, {})
+                    payload = {**payload, series_key: dict(list(series.items())[:COMPACT_BARS])}
+            self._bodies[key] = json.dumps(payload).encode()
+        return self._bodies[key]
+
+    def fx_series(self, from_currency: str, to_currency: str, interval: str, outputsize: str) -> bytes:
+        key = ("fx", from_currency, to_currency, interval, outputsize)
+        if key not in self._bodies:
+            name = f"FX_DAILY_{from_currency}_{to_currency}" if interval == "daily" else f"FX_INTRADAY_{from_currency}_{to_currency}_{interval}"
+            payload = self._recorded(f"{name}_{outputsize}")
+            if payload is None:
+                payload = self._recorded(f"{name}_full")
+                if payload is None:
+                    payload = synthetic_fx_series(from_currency, to_currency, interval, min(self.full_bars, 5000))
+                if outputsize == "compact":
+                    series_key = next(k for k in payload if k.startswith("Time Series"))
+                    payload = {**payload, series_key: dict(list(payload[series_key].items())[:COMPACT_BARS])}
+            self._bodies[key] = json.dumps(payload).encode()
+        return self._bodies[key]
+
+    def exchange_rate(self, from_currency: str, to_currency: str) -> bytes:
+        payload = self._recorded(f"CURRENCY_EXCHANGE_RATE_{from_currency}_{to_currency}")
+        if payload is None:
+            payload = synthetic_exchange_rate(from_currency, to_currency)
+        return json.dumps(payload).encode()
+
+
+class Quota:
+    """Sliding one-minute window of accepted calls (0 = unlimited)."""
+
+    def __init__(self, calls_per_minute: int):
+        self.calls_per_minute = calls_per_minute
+        self._calls: Deque[float] = deque()
+
+    def allow(self) -> bool:
+        if self.calls_per_minute <= 0:
+            return True
+        now = time.monotonic()
+        while self._calls and now - self._calls[0] >= 60.0:
+            self._calls.popleft()
+        if len(self._calls) >= self.calls_per_minute:
+            return False
+        self._calls.append(now)
+        return True
+
+
+def create_app(payloads: Payloads, latency_ms: float = 0.0, jitter_ms: float = 0.0, calls_per_minute: int = 0):
+    """The Starlette app serving /query and /stats."""
+    from starlette.applications import Starlette
+    from starlette.responses import JSONResponse, Response
+    from starlette.routing import Route
+
+    quota = Quota(calls_per_minute)
+    stats: Counter = Counter()
+
+    async def query(request) -> Response:
+        params = request.query_params
+        function = params.get("function", "")
+        stats["requests"] += 1
+        stats[function] += 1
+        if latency_ms or jitter_ms:
+            await asyncio.sleep(max(0.0, random.gauss(latency_ms, jitter_ms)) / 1000)
+        if not quota.allow():
+            stats["throttled"] += 1
+            return JSONResponse({"Note": THROTTLE_NOTE})
+        if function == "TIME_SERIES_INTRADAY":
+            body = payloads.intraday(params.get("symbol", "").upper(), params.get("interval", "1min"), params.get("outputsize", "compact"))
+        elif function == "CURRENCY_EXCHANGE_RATE":
+            body = payloads.exchange_rate(params.get("from_currency", "").upper(), params.get("to_currency", "").upper())
+        elif function in ("FX_DAILY", "FX_INTRADAY"):
+            interval = "daily" if function == "FX_DAILY" else params.get("interval", "5min")
+            body = payloads.fx_series(
+                params.get("from_symbol", "").upper(), params.get("to_symbol", "").upper(), interval, params.get("outputsize", "compact")
+            )
+        else:
+            stats["errors"] += 1
+            return JSONResponse({"Error Message": f"Invalid API call. Unsupported function: {function!r}"})
+        return Response(body, media_type="application/json")
+
+    async def stats_endpoint(request) -> Response:
+        return JSONResponse(dict(stats))
+
+    return Starlette(routes=[Route("/query", query), Route("/stats", stats_endpoint)])
+
+
+def record(args: argparse.Namespace) -> None:
+    """Save real AlphaVantage responses as fixtures."""
+    import httpx
+
+    api_key = os.getenv("ALPHAVANTAGE_API_KEY") or os.getenv("ALPHA_VANTAGE_API_KEY")
+    if not api_key:
+        raise SystemExit("Set ALPHAVANTAGE_API_KEY to record payloads.")
+    fixtures_dir = Path(args.fixtures)
+    fixtures_dir.mkdir(parents=True, exist_ok=True)
+    requests = []
+    for symbol in args.symbol:
+        for outputsize in ("compact", "full"):
+            params = {"function": "TIME_SERIES_INTRADAY", "symbol": symbol.upper(), "interval": args.interval, "outputsize": outputsize}
+            requests.append((f"TIME_SERIES_INTRADAY_{symbol.upper()}_{args.interval}_{outputsize}", params))
+    for pair in args.pair:
+        from_currency, to_currency = pair.upper().split(":")
+        params = {"function": "CURRENCY_EXCHANGE_RATE", "from_currency": from_currency, "to_currency": to_currency}
+        requests.append((f"CURRENCY_EXCHANGE_RATE_{from_currency}_{to_currency}", params))
+        if args.fx_daily:
+            params = {"function": "FX_DAILY", "from_symbol": from_currency, "to_symbol": to_currency, "outputsize": "full"}
+            requests.append((f"FX_DAILY_{from_currency}_{to_currency}_full", params))
+
+    with httpx.Client(timeout=60) as client:
+        for name, params in requests:
+            response = client.get(args.url, params={**params, "apikey": api_key})
+            response.raise_for_status()
+            data = response.json()
+            if "Note" in data or "Information" in data or "Error Message" in data:
+                print(f"{name}: not recorded ({next(iter(data.values()))})")
+                continue
+            (fixtures_dir / f"{name}.json").write_bytes(response.content)
+            print(f"{name}: {len(response.content) / 1024:.0f} KiB")
+            time.sleep(args.pause)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="Serve recorded or synthetic payloads")
+    serve_parser.add_argument("--host", default="127.0.0.1", help="Address to bind (default: 127.0.0.1)")
+    serve_parser.add_argument("--port", type=int, default=18765, help="Port to listen on (default: 18765)")
+    serve_parser.add_argument("--fixtures", default=str(FIXTURES_DIR), help="Directory of recorded payloads")
+    serve_parser.add_argument("--bars", type=int, default=20_000, help="Bars in a synthetic full intraday response (default: 20000)")
+    serve_parser.add_argument("--latency-ms", type=float, default=0.0, help="Mean added latency per request (default: 0)")
+    serve_parser.add_argument("--jitter-ms", type=float, default=0.0, help="Standard deviation of the added latency (default: 0)")
+    serve_parser.add_argument("--calls-per-minute", type=int, default=0, help="Quota before throttle responses (default: 0, unlimited)")
+
+    record_parser = commands.add_parser("record", help="Record real AlphaVantage responses as fixtures")
+    record_parser.add_argument("--symbol", action="append", default=[], help="Ticker to record (repeatable)")
+    record_parser.add_argument("--interval", default="1min", help="Intraday interval (default: 1min)")
+    record_parser.add_argument("--pair", action="append", default=[], help="Currency pair FROM:TO to record (repeatable)")
+    record_parser.add_argument("--fx-daily", action="store_true", help="Also record the full FX_DAILY history of each pair")
+    record_parser.add_argument("--fixtures", default=str(FIXTURES_DIR), help="Directory to write the payloads to")
+    record_parser.add_argument("--url", default="https://www.alphavantage.co/query", help="AlphaVantage query endpoint")
+    record_parser.add_argument("--pause", type=float, default=12.0, help="Seconds between requests, to stay within the quota (default: 12)")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        record(args)
+        return
+
+    import uvicorn
+
+    app = create_app(Payloads(Path(args.fixtures), args.bars), args.latency_ms, args.jitter_ms, args.calls_per_minute)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# fanout.py
+"""
+Quote subscription fan-out benchmark for the forex server.
+
+Starts the fake AlphaVantage server and one forex server over SSE, opens
+many MCP sessions that each subscribe to the same handful of pairs with
+`subscribe_fx_quotes`, and listens for the pushed quote notifications for a
+while. Reports the notifications received per session next to the upstream
+requests the server made, which should follow the number of distinct pairs
+rather than the number of sessions:
+
+    python -m benchmarks.fanout --sessions 50 --pairs EUR:USD,USD:JPY --duration 30
+    python -m benchmarks.fanout --sessions 200 --min-interval 2 --duration 20
+
+Run from the repository root.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+from contextlib import AsyncExitStack
+from typing import Any, Dict, List
+
+import httpx
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+
+from benchmarks.load import ROOT, TARGETS, free_port, subprocess, wait_for_http
+
+
+async def run_session(sse_url: str, pairs: List[str], stop: asyncio.Event, received: List[int], index: int) -> None:
+    async def on_log(params: Any) -> None:
+        if params.logger == "fx_quotes":
+            received[index] += 1
+
+    async with AsyncExitStack() as stack:
+        read, write = await stack.enter_async_context(sse_client(sse_url, timeout=30))
+        session = await stack.enter_async_context(ClientSession(read, write, logging_callback=on_log))
+        await session.initialize()
+        result = await session.call_tool("subscribe_fx_quotes", {"pairs": pairs})
+        if result.isError or "error" in json.loads(result.content[0].text):
+            raise RuntimeError(result.content[0].text[:200])
+        await stop.wait()
+
+
+async def run_fanout(args: argparse.Namespace) -> Dict[str, Any]:
+    target = TARGETS["forex"]
+    quiet = not args.verbose
+    pairs = [pair.replace(":", "/") for pair in args.pairs]
+    async with AsyncExitStack() as stack:
+        port = free_port()
+        await stack.enter_async_context(subprocess(
+            ["-m", "benchmarks.fake_alphavantage", "serve", "--port", str(port), "--latency-ms", str(args.latency_ms)],
+            ROOT, dict(os.environ), quiet,
+        ))
+        fake_url = f"http://127.0.0.1:{port}/query"
+        await wait_for_http(fake_url.replace("/query", "/stats"))
+
+        env = {
+            **os.environ,
+            **target.env(fake_url, args.server_quota),
+            "FOREX_SUBSCRIPTION_MIN_INTERVAL": str(args.min_interval),
+        }
+        port = free_port()
+        await stack.enter_async_context(subprocess(target.sse_args(port), target.cwd, env, quiet))
+        sse_url = f"http://127.0.0.1:{port}/sse"
+        await wait_for_http(sse_url)
+
+        stop = asyncio.Event()
+        received = [0] * args.sessions
+        sessions = [
+            asyncio.create_task(run_session(sse_url, pairs, stop, received, i)) for i in range(args.sessions)
+        ]
+        try:
+            await asyncio.sleep(args.duration)
+        finally:
+            stop.set()
+        results = await asyncio.gather(*sessions, return_exceptions=True)
+        session_errors = [str(r) for r in results if isinstance(r, BaseException)]
+
+        async with httpx.AsyncClient() as client:
+            fake_stats = (await client.get(fake_url.replace("/query", "/stats"))).json()
+
+    connected = args.sessions - len(session_errors)
+    return {
+        "sessions": args.sessions,
+        "failed_sessions": len(session_errors),
+        "pairs": len(pairs),
+        "duration_s": args.duration,
+        "notifications": sum(received),
+        "notifications_per_session": round(sum(received) / connected, 1) if connected else 0.0,
+        "upstream": fake_stats,
+        "sample_errors": session_errors[:5],
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"\nforex quote subscriptions, {report['sessions']} sessions x {report['pairs']} pairs over {report['duration_s']}s")
+    print(f"{'sessions':<22}{report['sessions'] - report['failed_sessions']} connected ({report['failed_sessions']} failed)")
+    print(f"{'notifications':<22}{report['notifications']} ({report['notifications_per_session']} per session)")
+    print(f"{'upstream requests':<22}{report['upstream']}")
+    for error in report["sample_errors"]:
+        print(f"  error: {error}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sessions", type=int, default=20, help="Subscribed MCP sessions (default: 20)")
+    parser.add_argument("--pairs", type=lambda v: v.split(","), default=["EUR:USD", "USD:JPY", "GBP:USD"], help="Currency pairs FROM:TO every session subscribes to (comma separated)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to listen for notifications (default: 30)")
+    parser.add_argument("--min-interval", type=float, default=5.0, help="Server: FOREX_SUBSCRIPTION_MIN_INTERVAL (default: 5)")
+    parser.add_argument("--server-quota", type=int, default=75, help="Calls per minute configured in the server's rate limiter (default: 75)")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Fake server: mean added latency (default: 50)")
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+    parser.add_argument("--verbose", action="store_true", help="Show the output of the servers")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_fanout(args))
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if report["failed_sessions"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
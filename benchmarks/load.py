@@ -0,0 +1,399 @@
+# load.py
+"""
+Load generator for the MCP servers.
+
+Starts the fake AlphaVantage server (unless --alphavantage-url is given) and
+the MCP server under test. It opens many concurrent MCP sessions, over stdio
+(one server process per session, as MCP clients do) or SSE (one server
+process shared by all sessions), and calls the target's tool repeatedly from
+every session. Reports throughput, latency percentiles and the peak memory of
+the server processes, and optionally compares them with a saved baseline:
+
+    python -m benchmarks.load --target stockanalyst --transport sse --sessions 20 --calls 50
+    python -m benchmarks.load --target forex --transport stdio --sessions 8 --output forex.json
+    python -m benchmarks.load --target stockanalyst --baseline base.json --tolerance 0.2
+
+Run from the repository root. Memory is read from /proc, so it is only
+reported on Linux.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sys
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, List, NamedTuple, Optional, Set
+
+import httpx
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+from mcp.client.stdio import StdioServerParameters, stdio_client
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+class Target(NamedTuple):
+    """How to start one MCP server and which tool to drive."""
+
+    cwd: Path
+    stdio_args: List[str]
+    sse_args: Callable[[int], List[str]]
+    env: Callable[[str, int], Dict[str, str]]
+    tool: str
+    arguments: Callable[[int, argparse.Namespace], Dict[str, Any]]
+
+
+TARGETS: Dict[str, Target] = {
+    "stockanalyst": Target(
+        cwd=ROOT / "stockanalyst_mcp_server",
+        stdio_args=["-m", "stockanalyst_mcp_tool.server"],
+        sse_args=lambda port: ["-m", "stockanalyst_mcp_tool.server", "--transport", "sse", "--port", str(port)],
+        env=lambda url, quota: {
+            "ALPHAVANTAGE_API_KEY": "benchmark",
+            "ALPHAVANTAGE_BASE_URL": url,
+            "ALPHAVANTAGE_CALLS_PER_MINUTE": str(quota),
+            "ALPHAVANTAGE_BURST": str(max(5, quota // 60)),
+            "STOCKANALYST_BAR_STORE_DIR": "",
+        },
+        tool="trade_recommendation",
+        arguments=lambda i, args: {"symbol": args.symbols[i % len(args.symbols)]},
+    ),
+    "forex": Target(
+        cwd=ROOT / "forex_mcp_server",
+        stdio_args=["-c", "from src.forex_mcp_server.server import app; app.run()"],
+        sse_args=lambda port: [
+            "-m", "uvicorn", "--factory", "src.forex_mcp_server.server:create_sse_app",
+            "--port", str(port), "--log-level", "warning",
+        ],
+        env=lambda url, quota: {
+            "ALPHA_VANTAGE_API_KEY": "benchmark",
+            "ALPHA_VANTAGE_BASE_URL": url,
+            "ALPHA_VANTAGE_CALLS_PER_MINUTE": str(quota),
+            "ALPHA_VANTAGE_BURST": str(max(5, quota // 60)),
+        },
+        tool="from_currency_to_target_currency",
+        arguments=lambda i, args: dict(
+            zip(("from_currency", "to_currency"), args.pairs[i % len(args.pairs)].upper().split(":")), amount=100.0
+        ),
+    ),
+}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def wait_for_http(url: str, timeout: float = 60.0) -> None:
+    """Poll until the URL answers (any status)."""
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while True:
+            try:
+                async with client.stream("GET", url, timeout=1.0):
+                    return
+            except httpx.HTTPError:
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"{url} did not come up within {timeout:.0f}s")
+                await asyncio.sleep(0.2)
+
+
+@asynccontextmanager
+async def subprocess(args: List[str], cwd: Path, env: Dict[str, str], quiet: bool) -> AsyncIterator[asyncio.subprocess.Process]:
+    """Run a Python subprocess for the duration of the block."""
+    output = asyncio.subprocess.DEVNULL if quiet else None
+    process = await asyncio.create_subprocess_exec(sys.executable, *args, cwd=cwd, env=env, stdout=output, stderr=output)
+    try:
+        yield process
+    finally:
+        if process.returncode is None:
+            process.terminate()
+            try:
+                await asyncio.wait_for(process.wait(), 10)
+            except asyncio.TimeoutError:
+                process.kill()
+
+
+# --- Memory (Linux /proc) ---
+
+def _children() -> Dict[int, List[int]]:
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces; fields after it are fixed
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    return children
+
+
+def descendants(pid: int, exclude: Set[int]) -> List[int]:
+    """All processes below `pid`, except the `exclude` subtrees."""
+    children = _children()
+    found, stack = [], [pid]
+    while stack:
+        for child in children.get(stack.pop(), []):
+            if child not in exclude:
+                found.append(child)
+                stack.append(child)
+    return found
+
+
+def rss_bytes(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+class MemorySampler:
+    """Peak combined RSS of the server processes, sampled periodically."""
+
+    def __init__(self, exclude: Set[int], period: float = 0.25):
+        self.exclude = exclude
+        self.period = period
+        self.peak = 0
+        self.processes = 0
+        self.available = os.path.isdir("/proc")
+
+    async def run(self) -> None:
+        while self.available:
+            pids = descendants(os.getpid(), self.exclude)
+            self.processes = max(self.processes, len(pids))
+            self.peak = max(self.peak, sum(rss_bytes(pid) for pid in pids))
+            await asyncio.sleep(self.period)
+
+
+# --- Load ---
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of unsorted values."""
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered) + 0.5) - 1))]
+
+
+def failed(result: Any) -> bool:
+    """Tool errors, including tools that report errors as an {"error": ...} result."""
+    if result.isError:
+        return True
+    try:
+        payload = json.loads(result.content[0].text)
+    except (IndexError, AttributeError, ValueError):
+        return False
+    return isinstance(payload, dict) and "error" in payload
+
+
+async def run_session(
+    index: int,
+    open_streams: Callable[[], Any],
+    target: Target,
+    args: argparse.Namespace,
+    ready: Callable[[int], None],
+    start: asyncio.Event,
+    latencies: List[float],
+    errors: List[str],
+) -> None:
+    async with AsyncExitStack() as stack:
+        read, write = await stack.enter_async_context(open_streams())
+        session = await stack.enter_async_context(ClientSession(read, write))
+        await session.initialize()
+        for call in range(args.warmup):
+            await session.call_tool(target.tool, target.arguments(index + call, args))
+        ready(index)
+        await start.wait()
+        for call in range(args.calls):
+            arguments = target.arguments(index + call, args)
+            began = time.perf_counter()
+            try:
+                result = await session.call_tool(target.tool, arguments)
+            except Exception as e:
+                errors.append(str(e))
+                continue
+            latencies.append(time.perf_counter() - began)
+            if failed(result):
+                errors.append(result.content[0].text[:200] if result.content else "error")
+
+
+async def run_load(args: argparse.Namespace) -> Dict[str, Any]:
+    target = TARGETS[args.target]
+    quiet = not args.verbose
+    async with AsyncExitStack() as stack:
+        exclude: Set[int] = set()
+        fake_url = args.alphavantage_url
+        if fake_url is None:
+            port = free_port()
+            fake = await stack.enter_async_context(subprocess(
+                [
+                    "-m", "benchmarks.fake_alphavantage", "serve", "--port", str(port),
+                    "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms),
+                    "--calls-per-minute", str(args.fake_quota), "--bars", str(args.bars),
+                ],
+                ROOT, dict(os.environ), quiet,
+            ))
+            exclude.add(fake.pid)
+            fake_url = f"http://127.0.0.1:{port}/query"
+            await wait_for_http(fake_url.replace("/query", "/stats"))
+
+        quota = args.server_quota or (args.fake_quota if args.fake_quota > 0 else 60_000)
+        env = {**os.environ, **target.env(fake_url, quota), **dict(item.split("=", 1) for item in args.server_env)}
+
+        if args.transport == "sse":
+            port = free_port()
+            await stack.enter_async_context(subprocess(target.sse_args(port), target.cwd, env, quiet))
+            sse_url = f"http://127.0.0.1:{port}/sse"
+            await wait_for_http(sse_url)
+
+            def open_streams():
+                return sse_client(sse_url, timeout=30)
+        else:
+            errlog = stack.enter_context(open(os.devnull, "w")) if quiet else sys.stderr
+            params = StdioServerParameters(command=sys.executable, args=target.stdio_args, env=env, cwd=str(target.cwd))
+
+            def open_streams():
+                return stdio_client(params, errlog=errlog)
+
+        latencies: List[float] = []
+        errors: List[str] = []
+        start = asyncio.Event()
+        ready_sessions: Set[int] = set()
+
+        def ready(index: int) -> None:
+            ready_sessions.add(index)
+            if len(ready_sessions) == args.sessions:
+                start.set()
+
+        async def session(index: int) -> None:
+            try:
+                await run_session(index, open_streams, target, args, ready, start, latencies, errors)
+            finally:
+                # A session that fails during setup must not hold back the others
+                ready(index)
+
+        sampler = MemorySampler(exclude)
+        sampling = asyncio.create_task(sampler.run())
+        sessions = [asyncio.create_task(session(i)) for i in range(args.sessions)]
+        try:
+            await start.wait()
+            began = time.perf_counter()
+            results = await asyncio.gather(*sessions, return_exceptions=True)
+            elapsed = time.perf_counter() - began
+        finally:
+            sampling.cancel()
+            for task in sessions:
+                task.cancel()
+        session_errors = [str(r) for r in results if isinstance(r, BaseException)]
+
+        fake_stats = None
+        if args.alphavantage_url is None:
+            async with httpx.AsyncClient() as client:
+                fake_stats = (await client.get(fake_url.replace("/query", "/stats"))).json()
+
+    return {
+        "target": args.target,
+        "tool": target.tool,
+        "transport": args.transport,
+        "sessions": args.sessions,
+        "calls": len(latencies),
+        "errors": len(errors),
+        "failed_sessions": len(session_errors),
+        "duration_s": round(elapsed, 3),
+        "throughput_per_s": round(len(latencies) / elapsed, 2) if elapsed > 0 else 0.0,
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else None,
+            "p50": round(percentile(latencies, 50) * 1000, 3),
+            "p90": round(percentile(latencies, 90) * 1000, 3),
+            "p99": round(percentile(latencies, 99) * 1000, 3),
+            "max": round(max(latencies) * 1000, 3) if latencies else None,
+        },
+        "server_processes": sampler.processes,
+        "server_rss_peak_mb": round(sampler.peak / 2**20, 1) if sampler.available else None,
+        "upstream": fake_stats,
+        "sample_errors": (errors + session_errors)[:5],
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Metrics that are worse than the baseline by more than `tolerance` (a fraction)."""
+    regressions = []
+    checks = [
+        ("throughput_per_s", report["throughput_per_s"], baseline["throughput_per_s"], False),
+        ("latency p50", report["latency_ms"]["p50"], baseline["latency_ms"]["p50"], True),
+        ("latency p99", report["latency_ms"]["p99"], baseline["latency_ms"]["p99"], True),
+        ("server_rss_peak_mb", report["server_rss_peak_mb"], baseline.get("server_rss_peak_mb"), True),
+    ]
+    for name, value, reference, higher_is_worse in checks:
+        if value is None or not reference:
+            continue
+        change = (value - reference) / reference
+        if (change if higher_is_worse else -change) > tolerance:
+            regressions.append(f"{name}: {reference} -> {value} ({change:+.0%})")
+    return regressions
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    latency = report["latency_ms"]
+    print(f"\n{report['target']} / {report['tool']} over {report['transport']}, {report['sessions']} sessions")
+    print(f"{'calls':<22}{report['calls']} ({report['errors']} errors, {report['failed_sessions']} failed sessions)")
+    print(f"{'throughput':<22}{report['throughput_per_s']} calls/s over {report['duration_s']}s")
+    print(f"{'latency ms':<22}p50 {latency['p50']}  p90 {latency['p90']}  p99 {latency['p99']}  max {latency['max']}")
+    if report["server_rss_peak_mb"] is not None:
+        print(f"{'server memory':<22}{report['server_rss_peak_mb']} MiB peak RSS over {report['server_processes']} processes")
+    if report["upstream"] is not None:
+        print(f"{'upstream requests':<22}{report['upstream']}")
+    for error in report["sample_errors"]:
+        print(f"  error: {error}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--target", choices=sorted(TARGETS), default="stockanalyst", help="Server to benchmark (default: stockanalyst)")
+    parser.add_argument("--transport", choices=["stdio", "sse"], default="sse", help="MCP transport (default: sse)")
+    parser.add_argument("--sessions", type=int, default=10, help="Concurrent MCP sessions (default: 10)")
+    parser.add_argument("--calls", type=int, default=20, help="Timed tool calls per session (default: 20)")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed calls per session before the run (default: 1)")
+    parser.add_argument("--symbols", type=lambda v: v.split(","), default=["IBM", "MSFT", "AAPL", "GOOG", "AMZN"], help="Tickers for trade_recommendation (comma separated)")
+    parser.add_argument("--pairs", type=lambda v: v.split(","), default=["USD:EUR", "EUR:JPY", "GBP:USD", "USD:CAD"], help="Currency pairs FROM:TO for the forex tool (comma separated)")
+    parser.add_argument("--alphavantage-url", help="Use this AlphaVantage endpoint instead of starting the fake server")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Fake server: mean added latency (default: 50)")
+    parser.add_argument("--jitter-ms", type=float, default=10.0, help="Fake server: latency standard deviation (default: 10)")
+    parser.add_argument("--fake-quota", type=int, default=0, help="Fake server: calls per minute before throttling (default: 0, unlimited)")
+    parser.add_argument("--bars", type=int, default=20_000, help="Fake server: bars in a full intraday response (default: 20000)")
+    parser.add_argument("--server-quota", type=int, default=0, help="Calls per minute configured in the server's rate limiter (default: the fake quota, or 60000)")
+    parser.add_argument("--server-env", action="append", default=[], help="Extra KEY=VALUE environment for the server (repeatable)")
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+    parser.add_argument("--baseline", help="Compare with a report written by --output; exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed regression against the baseline, as a fraction (default: 0.2)")
+    parser.add_argument("--verbose", action="store_true", help="Show the output of the servers")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_load(args))
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+# startup.py
+"""
+Cold start benchmark for the MCP servers.
+
+Under stdio every MCP client launch starts a fresh server process, so the
+time until the server answers, and the memory it holds once it does, are
+paid per session. This starts the server under test over stdio repeatedly
+and reports the time to a completed `initialize` and `tools/list`, and the
+server's RSS at that point:
+
+    python -m benchmarks.startup --target forex --runs 10
+    python -m benchmarks.startup --target forex --output startup.json
+    python -m benchmarks.startup --target forex --baseline startup.json --tolerance 0.2
+
+No tool is called, so no AlphaVantage endpoint is needed. Run from the
+repository root. Memory is read from /proc, so it is only reported on Linux.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from contextlib import AsyncExitStack, ExitStack
+from typing import Any, Dict, List
+
+from mcp import ClientSession
+from mcp.client.stdio import StdioServerParameters, stdio_client
+
+from benchmarks.load import TARGETS, descendants, rss_bytes
+
+
+async def start_once(params: StdioServerParameters, errlog: Any) -> Dict[str, float]:
+    """Start one server process and time it until it has listed its tools."""
+    began = time.perf_counter()
+    async with AsyncExitStack() as stack:
+        read, write = await stack.enter_async_context(stdio_client(params, errlog=errlog))
+        session = await stack.enter_async_context(ClientSession(read, write))
+        await session.initialize()
+        initialized = time.perf_counter()
+        tools = await session.list_tools()
+        listed = time.perf_counter()
+        rss = sum(rss_bytes(pid) for pid in descendants(os.getpid(), set()))
+    return {
+        "initialize_ms": (initialized - began) * 1000,
+        "list_tools_ms": (listed - began) * 1000,
+        "rss_mb": rss / 2**20,
+        "tools": len(tools.tools),
+    }
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    return {
+        "median": round(statistics.median(values), 1),
+        "min": round(min(values), 1),
+        "max": round(max(values), 1),
+    }
+
+
+async def run_startup(args: argparse.Namespace) -> Dict[str, Any]:
+    target = TARGETS[args.target]
+    env = {
+        **os.environ,
+        **target.env("http://127.0.0.1:9/query", 60_000),
+        **dict(item.split("=", 1) for item in args.server_env),
+    }
+    params = StdioServerParameters(command=sys.executable, args=target.stdio_args, env=env, cwd=str(target.cwd))
+    runs = []
+    with ExitStack() as stack:
+        errlog = sys.stderr if args.verbose else stack.enter_context(open(os.devnull, "w"))
+        # The first start also warms the OS file cache; it is not reported
+        for run in range(args.runs + 1):
+            result = await start_once(params, errlog)
+            if run:
+                runs.append(result)
+    return {
+        "target": args.target,
+        "runs": len(runs),
+        "tools": runs[-1]["tools"],
+        "initialize_ms": summarize([run["initialize_ms"] for run in runs]),
+        "list_tools_ms": summarize([run["list_tools_ms"] for run in runs]),
+        "rss_mb": summarize([run["rss_mb"] for run in runs]) if os.path.isdir("/proc") else None,
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Medians that are worse than the baseline by more than `tolerance` (a fraction)."""
+    regressions = []
+    for name in ("initialize_ms", "list_tools_ms", "rss_mb"):
+        if not report.get(name) or not baseline.get(name):
+            continue
+        value, reference = report[name]["median"], baseline[name]["median"]
+        change = (value - reference) / reference
+        if change > tolerance:
+            regressions.append(f"{name}: {reference} -> {value} ({change:+.0%})")
+    return regressions
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"\n{report['target']} cold start over stdio, {report['runs']} runs, {report['tools']} tools")
+    for name, label, unit in (
+        ("initialize_ms", "initialize", "ms"),
+        ("list_tools_ms", "initialize + list", "ms"),
+        ("rss_mb", "server memory", "MiB RSS"),
+    ):
+        if report[name] is not None:
+            values = report[name]
+            print(f"{label:<22}median {values['median']} {unit}  (min {values['min']}, max {values['max']})")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--target", choices=sorted(TARGETS), default="forex", help="Server to benchmark (default: forex)")
+    parser.add_argument("--runs", type=int, default=5, help="Measured starts, after one unmeasured warm-up start (default: 5)")
+    parser.add_argument("--server-env", action="append", default=[], help="Extra KEY=VALUE environment for the server (repeatable)")
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+    parser.add_argument("--baseline", help="Compare with a report written by --output; exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed regression against the baseline, as a fraction (default: 0.2)")
+    parser.add_argument("--verbose", action="store_true", help="Show the output of the server")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_startup(args))
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
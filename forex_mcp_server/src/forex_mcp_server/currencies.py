@@ -0,0 +1,175 @@
+# currencies.py
+"""
+In-memory index over the physical and digital currency lists.
+
+The index is built once and answers, without scanning the lists:
+
+- exact lookups by code (a dict),
+- exact lookups by name after normalization (case, accents and punctuation
+  are ignored),
+- partial matches: codes and name words starting with the search term, found
+  by binary search in a sorted list of words,
+- fuzzy matches for misspellings, by trigram similarity.
+
+Results are ranked with the best match first, as plain dictionaries.
+"""
+
+import bisect
+import re
+import unicodedata
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+# Scores per kind of match; fuzzy matches scale with their similarity
+SCORE_CODE = 1.0
+SCORE_NAME = 0.95
+SCORE_CODE_PREFIX = 0.8
+SCORE_NAME_PREFIX = 0.7
+SCORE_FUZZY = 0.6
+# Minimum trigram similarity (Dice coefficient) for a fuzzy match
+MIN_SIMILARITY = 0.35
+
+
+def normalize(text: str) -> str:
+    """Lower-case ASCII words separated by single spaces ("Côte d'Ivoire" -> "cote d ivoire")."""
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+    return _NON_ALNUM.sub(" ", text.lower()).strip()
+
+
+def trigrams(text: str) -> Set[str]:
+    """Character trigrams of each word, padded so word starts and ends count."""
+    grams: Set[str] = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+@dataclass(frozen=True)
+class Currency:
+    """
+    One entry of a currency list.
+
+    Attributes:
+        code: Currency code (e.g. "USD", "BTC").
+        name: Currency name (e.g. "United States Dollar").
+        currency_type: "physical" or "digital".
+    """
+
+    code: str
+    name: str
+    currency_type: str
+
+
+class CurrencyIndex:
+    """
+    Code, name, prefix and trigram indexes over a list of currencies.
+
+    Args:
+        currencies: The entries to index; later duplicates of a code are ignored.
+    """
+
+    def __init__(self, currencies: Iterable[Currency]):
+        self.currencies: List[Currency] = []
+        self._by_code: Dict[str, int] = {}
+        self._by_name: Dict[str, List[int]] = {}
+        self._trigrams: Dict[str, List[int]] = {}
+        self._gram_counts: List[int] = []
+        # Sorted (word, entry) pairs of lower-cased codes and name words, for prefix search
+        words: List[Tuple[str, int]] = []
+        for currency in currencies:
+            code = currency.code.strip().upper()
+            if not code or code in self._by_code:
+                continue
+            entry = len(self.currencies)
+            self.currencies.append(currency)
+            self._by_code[code] = entry
+            name = normalize(currency.name)
+            self._by_name.setdefault(name, []).append(entry)
+            words.append((code.lower(), entry))
+            words.extend((word, entry) for word in set(name.split()))
+            grams = trigrams(name)
+            self._gram_counts.append(len(grams))
+            for gram in grams:
+                self._trigrams.setdefault(gram, []).append(entry)
+        words.sort()
+        self._words = [word for word, _ in words]
+        self._word_entries = [entry for _, entry in words]
+
+    def __len__(self) -> int:
+        return len(self.currencies)
+
+    def get(self, code: str) -> Optional[Currency]:
+        """The currency with this code, if any."""
+        entry = self._by_code.get(code.strip().upper())
+        return self.currencies[entry] if entry is not None else None
+
+    def _prefixed(self, prefix: str) -> Set[int]:
+        """Entries with a code or name word starting with `prefix`."""
+        found = set()
+        i = bisect.bisect_left(self._words, prefix)
+        while i < len(self._words) and self._words[i].startswith(prefix):
+            found.add(self._word_entries[i])
+            i += 1
+        return found
+
+    def search(self, term: str, limit: int = 10) -> List[Dict[str, object]]:
+        """
+        Ranked matches for a code, a name, the start of either, or a misspelled name.
+
+        Args:
+            term: Search term, e.g. "usd", "euro", "canad", "swiss frank".
+            limit: Maximum number of matches returned.
+
+        Returns:
+            Matches as {"currency_code", "currency_name", "currency_type",
+            "score", "match"} dictionaries, best first.
+        """
+        query = normalize(term)
+        if not query:
+            return []
+        scores: Dict[int, Tuple[float, str]] = {}
+
+        def offer(entry: int, score: float, match: str) -> None:
+            if entry not in scores or scores[entry][0] < score:
+                scores[entry] = (score, match)
+
+        code = query.replace(" ", "").upper()
+        if code in self._by_code:
+            offer(self._by_code[code], SCORE_CODE, "code")
+        for entry in self._by_name.get(query, ()):
+            offer(entry, SCORE_NAME, "name")
+
+        # Every word of the query must start a code or a word of the name
+        tokens = query.split()
+        prefixed = self._prefixed(tokens[0])
+        for token in tokens[1:]:
+            prefixed &= self._prefixed(token)
+        for entry in prefixed:
+            is_code = self.currencies[entry].code.lower().startswith(query.replace(" ", ""))
+            offer(entry, SCORE_CODE_PREFIX if is_code else SCORE_NAME_PREFIX, "prefix")
+
+        # Trigram candidates, scored by the Dice coefficient of the trigram sets
+        grams = trigrams(query)
+        shared: Dict[int, int] = {}
+        for gram in grams:
+            for entry in self._trigrams.get(gram, ()):
+                shared[entry] = shared.get(entry, 0) + 1
+        for entry, count in shared.items():
+            similarity = 2 * count / (len(grams) + self._gram_counts[entry])
+            if similarity >= MIN_SIMILARITY:
+                offer(entry, SCORE_FUZZY * similarity, "fuzzy")
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1][0], len(self.currencies[item[0]].name)))
+        return [
+            {
+                "currency_code": self.currencies[entry].code,
+                "currency_name": self.currencies[entry].name,
+                "currency_type": self.currencies[entry].currency_type,
+                "score": round(score, 3),
+                "match": match,
+            }
+            for entry, (score, match) in ranked[:limit]
+        ]
@@ -0,0 +1,411 @@
+# history.py
+"""
+Historical FX series in columnar form.
+
+Series from FX_DAILY and FX_INTRADAY are held as numpy columns (timestamp,
+open, high, low, close) per currency pair and interval, and persisted as one
+Arrow IPC file per series:
+
+    <root>/<FROM>_<TO>/<interval>.arrow
+
+A stored series is served without API calls until it is older than the
+interval's TTL. After that it is updated incrementally: the compact response
+(the latest 100 points) is merged into the stored history when it overlaps
+it, and the full history is fetched (and merged the same way) only when it
+does not.
+
+Range queries, resampling and statistics (returns, volatility, drawdown and
+correlation matrices) are vectorized over the columns.
+
+Currency codes become path components, so only codes matching
+`CODE_PATTERN` are accepted.
+
+pyarrow is an optional dependency; without it series are only kept in memory.
+"""
+
+import asyncio
+import logging
+import os
+import re
+import tempfile
+import time
+from dataclasses import dataclass, replace
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+except ImportError:  # optional dependency
+    pa = None
+
+logger = logging.getLogger(__name__)
+
+FILE_SUFFIX = ".arrow"
+PRICE_COLUMNS = ("open", "high", "low", "close")
+# Points in a compact FX_DAILY / FX_INTRADAY response
+COMPACT_POINTS = 100
+
+INTRADAY_MINUTES = {"1min": 1, "5min": 5, "15min": 15, "30min": 30, "60min": 60}
+INTERVALS = ("daily", *INTRADAY_MINUTES)
+# Physical and digital currency codes (e.g. "EUR", "BTC"); no path separators
+CODE_PATTERN = re.compile(r"[A-Z0-9]{2,10}")
+# Target frequencies for resampling
+RESAMPLE_RULES = ("weekly", "monthly", "daily", *INTRADAY_MINUTES)
+# FX trades around the clock on weekdays
+WEEKDAYS_PER_YEAR = 260
+PERIODS_PER_YEAR = {
+    "daily": WEEKDAYS_PER_YEAR,
+    "weekly": 52,
+    "monthly": 12,
+    **{interval: WEEKDAYS_PER_YEAR * 24 * 60 / minutes for interval, minutes in INTRADAY_MINUTES.items()},
+}
+
+
+@dataclass(frozen=True)
+class FxSeries:
+    """
+    OHLC series for one currency pair.
+
+    Attributes:
+        from_currency: Base currency code.
+        to_currency: Quote currency code.
+        interval: "daily", a resampled frequency or an intraday interval.
+        timestamps: Point times as datetime64[s], ascending.
+        open, high, low, close: Prices as float64 arrays.
+        fetched_at: `time.time()` of the last API update.
+    """
+
+    from_currency: str
+    to_currency: str
+    interval: str
+    timestamps: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    fetched_at: float
+
+    @property
+    def pair(self) -> str:
+        return f"{self.from_currency}/{self.to_currency}"
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def age(self) -> float:
+        """Seconds since the series was last updated from the API."""
+        return time.time() - self.fetched_at
+
+    def _take(self, selector: Any) -> "FxSeries":
+        return replace(
+            self,
+            timestamps=self.timestamps[selector],
+            **{column: getattr(self, column)[selector] for column in PRICE_COLUMNS},
+        )
+
+    def between(self, start: Optional[str] = None, end: Optional[str] = None) -> "FxSeries":
+        """
+        Points from `start` to `end` inclusive ("YYYY-MM-DD" or "YYYY-MM-DD HH:MM:SS").
+        A date-only `end` includes the whole day.
+        """
+        lo = 0 if start is None else np.searchsorted(self.timestamps, np.datetime64(start, "s"), side="left")
+        if end is None:
+            hi = len(self.timestamps)
+        else:
+            bound = np.datetime64(end, "s")
+            if len(end.strip()) <= 10:
+                bound = bound + np.timedelta64(1, "D") - np.timedelta64(1, "s")
+            hi = np.searchsorted(self.timestamps, bound, side="right")
+        return self._take(slice(lo, hi))
+
+    def tail(self, count: int) -> "FxSeries":
+        return self._take(slice(max(0, len(self) - count), None))
+
+    def resample(self, rule: str) -> "FxSeries":
+        """
+        Aggregate into coarser bars: "weekly" (weeks starting Monday),
+        "monthly", "daily" or an intraday interval such as "15min".
+        """
+        if rule not in RESAMPLE_RULES:
+            raise ValueError(f"Unsupported resample rule: {rule!r} (expected one of {', '.join(RESAMPLE_RULES)})")
+        if not len(self):
+            return replace(self, interval=rule)
+        if rule == "monthly":
+            buckets = self.timestamps.astype("datetime64[M]").astype(np.int64)
+            labels = buckets.astype("datetime64[M]").astype("datetime64[s]")
+        elif rule == "weekly":
+            # datetime64 weeks start on Thursday (1970-01-01); shift so they start on Monday
+            shifted = self.timestamps.astype("datetime64[D]") + np.timedelta64(3, "D")
+            buckets = shifted.astype("datetime64[W]").astype(np.int64)
+            labels = (buckets.astype("datetime64[W]").astype("datetime64[D]") - np.timedelta64(3, "D")).astype("datetime64[s]")
+        else:
+            seconds = 86400 if rule == "daily" else INTRADAY_MINUTES[rule] * 60
+            buckets = self.timestamps.astype(np.int64) // seconds
+            labels = (buckets * seconds).astype("datetime64[s]")
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        ends = np.r_[starts[1:], len(buckets)] - 1
+        return replace(
+            self,
+            interval=rule,
+            timestamps=labels[starts],
+            open=self.open[starts],
+            high=np.maximum.reduceat(self.high, starts),
+            low=np.minimum.reduceat(self.low, starts),
+            close=self.close[ends],
+        )
+
+    def log_returns(self) -> np.ndarray:
+        """Log returns between consecutive closes (one fewer than points)."""
+        return np.diff(np.log(self.close))
+
+    def statistics(self, periods_per_year: float) -> Dict[str, Any]:
+        """First/last close, total return, return moments, annualized volatility and max drawdown."""
+        if len(self) < 2:
+            return {"points": len(self)}
+        returns = self.log_returns()
+        peaks = np.maximum.accumulate(self.close)
+        volatility = float(returns.std(ddof=1)) if len(returns) > 1 else 0.0
+        return {
+            "points": len(self),
+            "start": str(self.timestamps[0]),
+            "end": str(self.timestamps[-1]),
+            "first_close": float(self.close[0]),
+            "last_close": float(self.close[-1]),
+            "total_return": float(self.close[-1] / self.close[0] - 1),
+            "mean_log_return": float(returns.mean()),
+            "volatility": volatility,
+            "annualized_volatility": volatility * float(np.sqrt(periods_per_year)),
+            "max_drawdown": float((self.close / peaks - 1).min()),
+            "high": float(self.high.max()),
+            "low": float(self.low.min()),
+        }
+
+    def to_columns(self) -> Dict[str, List[Any]]:
+        """Columns as JSON-serializable lists."""
+        fmt = "D" if self.interval in ("daily", "weekly", "monthly") else "s"
+        return {
+            "timestamp": np.datetime_as_string(self.timestamps, unit=fmt).tolist(),
+            **{column: getattr(self, column).tolist() for column in PRICE_COLUMNS},
+        }
+
+
+def correlation_matrix(series: List[FxSeries]) -> Dict[str, Dict[str, Optional[float]]]:
+    """
+    Correlations of log returns between pairs, over the timestamps all pairs share.
+    """
+    common = series[0].timestamps
+    for other in series[1:]:
+        common = np.intersect1d(common, other.timestamps, assume_unique=True)
+    if len(common) < 3:
+        return {s.pair: {t.pair: None for t in series} for s in series}
+    returns = np.vstack([
+        np.diff(np.log(s.close[np.searchsorted(s.timestamps, common)])) for s in series
+    ])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        matrix = np.corrcoef(returns)
+    matrix = np.atleast_2d(matrix)
+    return {
+        s.pair: {t.pair: (None if np.isnan(matrix[i, j]) else round(float(matrix[i, j]), 6)) for j, t in enumerate(series)}
+        for i, s in enumerate(series)
+    }
+
+
+def check_code(code: str) -> str:
+    """
+    Return a currency code after checking it is a plain code such as "EUR".
+
+    Raises:
+        ValueError: If the code contains anything other than 2-10 upper-case letters or digits.
+    """
+    if not CODE_PATTERN.fullmatch(code):
+        raise ValueError(f"Invalid currency code: {code!r}")
+    return code
+
+
+def parse_series(data: Dict[str, Any], from_currency: str, to_currency: str, interval: str) -> FxSeries:
+    """
+    Columns from an FX_DAILY / FX_INTRADAY payload.
+
+    Raises:
+        ValueError: If the payload has no time series.
+    """
+    key = "Time Series FX (Daily)" if interval == "daily" else f"Time Series FX ({interval})"
+    points = data.get(key)
+    if not points:
+        message = data.get("Error Message") or data.get("Note") or data.get("Information") or f"'{key}' missing from API response."
+        raise ValueError(f"Could not retrieve {interval} FX history for {from_currency}/{to_currency}: {message}")
+    stamps = sorted(points)
+    timestamps = np.array(stamps, dtype="datetime64[s]")
+    prices = np.array(
+        [[float(points[stamp][f"{i}. {column}"]) for i, column in enumerate(PRICE_COLUMNS, start=1)] for stamp in stamps],
+        dtype=np.float64,
+    ).reshape(-1, len(PRICE_COLUMNS))
+    return FxSeries(from_currency, to_currency, interval, timestamps, *prices.T.copy(), fetched_at=time.time())
+
+
+def merge(old: FxSeries, new: FxSeries) -> FxSeries:
+    """`old` extended with `new`; points present in both take the values from `new`."""
+    keep = old.timestamps < new.timestamps[0] if len(new) else np.ones(len(old), dtype=bool)
+    return replace(
+        new,
+        timestamps=np.concatenate([old.timestamps[keep], new.timestamps]),
+        **{column: np.concatenate([getattr(old, column)[keep], getattr(new, column)]) for column in PRICE_COLUMNS},
+    )
+
+
+class FxStore:
+    """
+    Arrow IPC files of FX series, one per pair and interval.
+
+    Args:
+        root: Directory holding the files; created on first write.
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(os.path.expanduser(root))
+        if pa is None:
+            logger.warning("pyarrow is not installed; FX history is only kept in memory.")
+
+    @property
+    def available(self) -> bool:
+        return pa is not None
+
+    def _path(self, from_currency: str, to_currency: str, interval: str) -> str:
+        check_code(from_currency)
+        check_code(to_currency)
+        return os.path.join(self.root, f"{from_currency}_{to_currency}", interval + FILE_SUFFIX)
+
+    def read(self, from_currency: str, to_currency: str, interval: str) -> Optional[FxSeries]:
+        """The stored series, or None if there is none (or it is unreadable)."""
+        path = self._path(from_currency, to_currency, interval)
+        if pa is None or not os.path.exists(path):
+            return None
+        try:
+            with pa.memory_map(path, "r") as source:
+                table = pa.ipc.open_file(source).read_all()
+        except (OSError, pa.ArrowInvalid):
+            logger.warning("Skipping unreadable FX history file %s", path, exc_info=True)
+            return None
+        return FxSeries(
+            from_currency,
+            to_currency,
+            interval,
+            table.column("timestamp").to_numpy().astype("datetime64[s]"),
+            *(table.column(column).to_numpy() for column in PRICE_COLUMNS),
+            fetched_at=float((table.schema.metadata or {}).get(b"fetched_at", os.path.getmtime(path))),
+        )
+
+    def write(self, series: FxSeries) -> bool:
+        """Persist a series, atomically replacing the stored one."""
+        if pa is None:
+            return False
+        path = self._path(series.from_currency, series.to_currency, series.interval)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        table = pa.table(
+            {"timestamp": series.timestamps, **{column: getattr(series, column) for column in PRICE_COLUMNS}},
+            metadata={"fetched_at": repr(series.fetched_at)},
+        )
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return True
+
+
+# Fetcher signature: (from_currency, to_currency, interval, outputsize) -> decoded API payload
+Fetcher = Callable[[str, str, str, str], Awaitable[Dict[str, Any]]]
+
+
+class FxHistory:
+    """
+    Series served from memory and the store, updated from the API when stale.
+
+    Args:
+        store: Persistent store, or None to keep series in memory only.
+        ttls: Seconds a series is served without an update, per interval.
+        default_ttl: TTL for intervals missing from `ttls`.
+    """
+
+    def __init__(self, store: Optional[FxStore], ttls: Dict[str, float], default_ttl: float = 300.0):
+        self.store = store
+        self.ttls = dict(ttls)
+        self.default_ttl = default_ttl
+        self.stats = {"memory_hits": 0, "store_hits": 0, "full_fetches": 0, "incremental_fetches": 0}
+        self._series: Dict[Tuple[str, str, str], FxSeries] = {}
+        self._inflight: Dict[Tuple[str, str, str], asyncio.Task] = {}
+
+    def ttl_for(self, interval: str) -> float:
+        return self.ttls.get(interval, self.default_ttl)
+
+    async def get(self, from_currency: str, to_currency: str, interval: str, fetch: Fetcher) -> Tuple[FxSeries, str]:
+        """
+        The series for a pair, and where it came from ("memory", "store" or "api").
+
+        Raises:
+            ValueError: If a currency code or the interval is invalid, or the
+                API returned no data.
+        """
+        if interval not in INTERVALS:
+            raise ValueError(f"Unsupported interval: {interval!r} (expected one of {', '.join(INTERVALS)})")
+        key = (check_code(from_currency.upper()), check_code(to_currency.upper()), interval)
+        series = self._series.get(key)
+        if series is not None and series.age() <= self.ttl_for(interval):
+            self.stats["memory_hits"] += 1
+            return series, "memory"
+        if series is None and self.store is not None:
+            series = self.store.read(*key)
+            if series is not None:
+                self._series[key] = series
+                if series.age() <= self.ttl_for(interval):
+                    self.stats["store_hits"] += 1
+                    return series, "store"
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(self._update(key, series, fetch))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task), "api"
+
+    async def _update(self, key: Tuple[str, str, str], current: Optional[FxSeries], fetch: Fetcher) -> FxSeries:
+        from_currency, to_currency, interval = key
+        step = np.timedelta64(1, "D") if interval == "daily" else np.timedelta64(INTRADAY_MINUTES[interval], "m")
+        now = np.datetime64(int(time.time()), "s")
+        # The compact response covers the latest points; it must reach back to the stored history
+        incremental = current is not None and len(current) and current.timestamps[-1] >= now - step * (COMPACT_POINTS - 5)
+        if incremental:
+            fresh = parse_series(await fetch(from_currency, to_currency, interval, "compact"), from_currency, to_currency, interval)
+            if len(fresh) and fresh.timestamps[0] <= current.timestamps[-1]:
+                series = merge(current, fresh)
+                self.stats["incremental_fetches"] += 1
+            else:
+                incremental = False
+        if not incremental:
+            series = parse_series(await fetch(from_currency, to_currency, interval, "full"), from_currency, to_currency, interval)
+            if current is not None and len(current):
+                # Stored points older than the API's full window are kept
+                series = merge(current, series)
+            self.stats["full_fetches"] += 1
+        self._series[key] = series
+        if self.store is not None:
+            try:
+                await asyncio.to_thread(self.store.write, series)
+            except OSError:
+                logger.exception("Failed to persist FX history for %s/%s (%s)", *key)
+        return series
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Counters and held series suitable for JSON serialization."""
+        return {
+            **self.stats,
+            "series": len(self._series),
+            "points": sum(len(series) for series in self._series.values()),
+            "persistent": self.store is not None and self.store.available,
+        }
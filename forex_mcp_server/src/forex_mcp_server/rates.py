@@ -0,0 +1,270 @@
+# rates.py
+"""
+Exchange rate cache with inverse and cross-rate derivation.
+
+Quotes fetched from Alpha Vantage are kept per currency pair for a
+configurable TTL. A lookup is answered without an API call when:
+
+- the pair itself is cached,
+- the inverse pair is cached: the rate is 1 / rate, and bid and ask are
+  swapped and inverted (1 / ask, 1 / bid),
+- both legs through a pivot currency (e.g. EUR->USD and USD->JPY for EUR->JPY)
+  are cached, directly or inversely: rates, bids and asks are multiplied.
+
+A derived quote is as old as its oldest leg. Concurrent misses for the same
+pair share one fetch.
+"""
+
+import asyncio
+import time
+from dataclasses import asdict, dataclass, replace
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class Quote:
+    """
+    An exchange rate between two currencies.
+
+    Attributes:
+        from_currency: Currency code converted from (e.g. "USD").
+        to_currency: Currency code converted to (e.g. "JPY").
+        from_name: Name of `from_currency`, as reported by the API.
+        to_name: Name of `to_currency`, as reported by the API.
+        rate: Units of `to_currency` per unit of `from_currency`.
+        bid: Bid price, if the API reported one.
+        ask: Ask price, if the API reported one.
+        last_refreshed: When Alpha Vantage last refreshed the rate.
+        time_zone: Time zone of `last_refreshed`.
+        fetched_at: `time.monotonic()` when the rate was fetched (the oldest
+            leg for derived quotes).
+        source: "api", "cache", "inverse" or "cross".
+        via: Pivot currency of a cross rate.
+    """
+
+    from_currency: str
+    to_currency: str
+    from_name: Optional[str]
+    to_name: Optional[str]
+    rate: float
+    bid: Optional[float]
+    ask: Optional[float]
+    last_refreshed: Optional[str]
+    time_zone: Optional[str]
+    fetched_at: float
+    source: str = "api"
+    via: Optional[str] = None
+
+    @classmethod
+    def from_api(cls, data: Dict[str, Any]) -> "Quote":
+        """
+        Build a quote from a "Realtime Currency Exchange Rate" object.
+
+        Raises:
+            ValueError: If the exchange rate is missing, not a number or not
+                positive, or if a reported bid or ask price is not positive.
+        """
+        rate = data.get("5. Exchange Rate")
+        if not rate:
+            raise ValueError("Exchange rate not found in API response.")
+        try:
+            rate = float(rate)
+        except ValueError:
+            raise ValueError(f"Invalid exchange rate format received: {rate}")
+        # Inverse and cross quotes divide and multiply by these
+        if not rate > 0:
+            raise ValueError(f"Invalid exchange rate received: {rate}")
+        return cls(
+            from_currency=str(data.get("1. From_Currency Code", "")).upper(),
+            to_currency=str(data.get("3. To_Currency Code", "")).upper(),
+            from_name=data.get("2. From_Currency Name"),
+            to_name=data.get("4. To_Currency Name"),
+            rate=rate,
+            bid=_price(data.get("8. Bid Price")),
+            ask=_price(data.get("9. Ask Price")),
+            last_refreshed=data.get("6. Last Refreshed"),
+            time_zone=data.get("7. Time Zone"),
+            fetched_at=time.monotonic(),
+        )
+
+    def age(self) -> float:
+        """Seconds since the rate (or its oldest leg) was fetched."""
+        return time.monotonic() - self.fetched_at
+
+    def inverse(self) -> "Quote":
+        """The quote for the opposite direction."""
+        return replace(
+            self,
+            from_currency=self.to_currency,
+            to_currency=self.from_currency,
+            from_name=self.to_name,
+            to_name=self.from_name,
+            rate=1.0 / self.rate,
+            bid=1.0 / self.ask if self.ask else None,
+            ask=1.0 / self.bid if self.bid else None,
+            source="inverse",
+        )
+
+    def cross(self, other: "Quote") -> "Quote":
+        """Chain this quote (A->P) with `other` (P->B) into A->B."""
+        older = self if self.fetched_at <= other.fetched_at else other
+        return Quote(
+            from_currency=self.from_currency,
+            to_currency=other.to_currency,
+            from_name=self.from_name,
+            to_name=other.to_name,
+            rate=self.rate * other.rate,
+            bid=self.bid * other.bid if self.bid and other.bid else None,
+            ask=self.ask * other.ask if self.ask and other.ask else None,
+            last_refreshed=older.last_refreshed,
+            time_zone=older.time_zone,
+            fetched_at=older.fetched_at,
+            source="cross",
+            via=self.to_currency,
+        )
+
+
+def _price(value: Any) -> Optional[float]:
+    """A reported bid or ask price; None if missing or unparseable."""
+    try:
+        price = float(value)
+    except (TypeError, ValueError):
+        return None
+    if not price > 0:
+        raise ValueError(f"Invalid bid/ask price received: {value}")
+    return price
+
+
+@dataclass
+class RateCacheStats:
+    """
+    Counters describing rate cache effectiveness.
+
+    Attributes:
+        hits: Lookups answered by the cached pair itself.
+        inverse_hits: Lookups answered by inverting the cached opposite pair.
+        cross_hits: Lookups answered by chaining two cached legs.
+        misses: Lookups that needed an API call.
+        coalesced: Misses that joined a fetch already in flight for the pair.
+    """
+
+    hits: int = 0
+    inverse_hits: int = 0
+    cross_hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+
+
+# Fetcher signature: (from_currency, to_currency) -> fresh quote
+Fetcher = Callable[[str, str], Awaitable[Quote]]
+
+
+class RateCache:
+    """
+    TTL cache of quotes keyed by currency pair.
+
+    Args:
+        ttl: Seconds a fetched rate is served for; 0 disables the cache.
+        pivots: Currencies tried, in order, to derive cross rates.
+        max_entries: Maximum number of cached pairs (the oldest are dropped).
+    """
+
+    def __init__(self, ttl: float = 60.0, pivots: Iterable[str] = ("USD",), max_entries: int = 1024):
+        self.ttl = ttl
+        self.pivots = [pivot.strip().upper() for pivot in pivots if pivot.strip()]
+        self.max_entries = max_entries
+        self.stats = RateCacheStats()
+        self._quotes: Dict[Tuple[str, str], Quote] = {}
+        self._inflight: Dict[Tuple[str, str], asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._quotes)
+
+    def put(self, quote: Quote) -> None:
+        """Store a fetched quote, replacing any older one for the pair."""
+        key = (quote.from_currency, quote.to_currency)
+        self._quotes.pop(key, None)
+        self._quotes[key] = quote
+        while len(self._quotes) > self.max_entries:
+            del self._quotes[next(iter(self._quotes))]
+
+    def _fresh(self, from_currency: str, to_currency: str) -> Optional[Quote]:
+        """The pair from the cache, directly or inverted, if within the TTL."""
+        quote = self._quotes.get((from_currency, to_currency))
+        if quote is not None and quote.age() <= self.ttl:
+            return quote
+        quote = self._quotes.get((to_currency, from_currency))
+        if quote is not None and quote.age() <= self.ttl:
+            return quote.inverse()
+        return None
+
+    def lookup(self, from_currency: str, to_currency: str) -> Optional[Quote]:
+        """
+        A cached, inverted or cross-derived quote, or None if the pair needs
+        an API call. Does not count misses.
+        """
+        from_currency, to_currency = from_currency.upper(), to_currency.upper()
+        if self.ttl <= 0:
+            return None
+        quote = self._fresh(from_currency, to_currency)
+        if quote is not None:
+            if quote.source == "inverse":
+                self.stats.inverse_hits += 1
+                return quote
+            self.stats.hits += 1
+            return replace(quote, source="cache")
+        for pivot in self.pivots:
+            if pivot in (from_currency, to_currency):
+                continue
+            first = self._fresh(from_currency, pivot)
+            second = self._fresh(pivot, to_currency) if first is not None else None
+            if second is not None:
+                self.stats.cross_hits += 1
+                return first.cross(second)
+        return None
+
+    async def get_or_fetch(self, from_currency: str, to_currency: str, fetch: Fetcher) -> Quote:
+        """
+        Return a quote for the pair, fetching it only when it cannot be
+        served or derived from the cache.
+
+        Args:
+            from_currency: Currency code converted from.
+            to_currency: Currency code converted to.
+            fetch: Coroutine function returning a fresh quote for the pair.
+        """
+        from_currency, to_currency = from_currency.upper(), to_currency.upper()
+        quote = self.lookup(from_currency, to_currency)
+        if quote is not None:
+            return quote
+
+        key = (from_currency, to_currency)
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats.coalesced += 1
+        else:
+            self.stats.misses += 1
+            task = asyncio.get_running_loop().create_task(self._fetch(key, fetch))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shielded: one caller being cancelled must not cancel the others' fetch
+        return await asyncio.shield(task)
+
+    async def _fetch(self, key: Tuple[str, str], fetch: Fetcher) -> Quote:
+        # Keyed by the requested codes, whatever casing the API reports
+        quote = replace(await fetch(*key), from_currency=key[0], to_currency=key[1])
+        if self.ttl > 0:
+            self.put(quote)
+        return quote
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Counters and occupancy suitable for JSON serialization."""
+        served = self.stats.hits + self.stats.inverse_hits + self.stats.cross_hits
+        lookups = served + self.stats.misses
+        return {
+            **asdict(self.stats),
+            "hit_ratio": served / lookups if lookups else 0.0,
+            "entries": len(self._quotes),
+            "ttl": self.ttl,
+            "pivots": self.pivots,
+        }
@@ -1,66 +1,249 @@
 import os
+import csv
+import json
+import logging
 import httpx
-import pandas as pd
 import asyncio # Keep asyncio if other async operations might be added later
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
-from pydantic import ValidationError # Keep ValidationError for error handling
+from pydantic import AnyUrl, ValidationError # Keep ValidationError for error handling
 # Remove BaseModel, Field, field_validator as models are removed
-from typing import Optional, Dict, Any, List, Literal
-
-from mcp.server.fastmcp import FastMCP # Only import FastMCP from here
+from typing import Optional, Dict, Any, List, Literal, AsyncIterator, Tuple
+
+import mcp_observability as observability
+from mcp.server.fastmcp import Context, FastMCP
+from mcp_observability import Priority, RequestScheduler
+
+try:
+    from .currencies import Currency, CurrencyIndex
+    from .rates import Quote, RateCache
+    from .subscriptions import QuoteHub
+except ImportError:  # loaded as a plain script, e.g. `mcp run server.py`
+    from currencies import Currency, CurrencyIndex
+    from rates import Quote, RateCache
+    from subscriptions import QuoteHub
 # ToolContext import removed as it's not used per examples
 
 # Load environment variables from .env file located in the project root
 # Adjust the path if your .env file is elsewhere relative to this script's execution location
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '..', '.env'))
 
+# --- Logging ---
+# JSON records to stderr from a background thread; stdout carries the stdio transport
+observability.configure_logging("forex-mcp-server", level=logging.INFO)
+logger = logging.getLogger(__name__)
+
 # --- Configuration ---
 ALPHA_VANTAGE_API_KEY = os.getenv("ALPHA_VANTAGE_API_KEY")
-ALPHA_VANTAGE_BASE_URL = "https://www.alphavantage.co/query"
+# Query endpoint; can point at a mirror or a local fake server for benchmarks
+ALPHA_VANTAGE_BASE_URL = os.getenv("ALPHA_VANTAGE_BASE_URL", "https://www.alphavantage.co/query")
+
+# --- HTTP Client Configuration ---
+HTTP2 = os.getenv("ALPHA_VANTAGE_HTTP2", "true").lower() in ("1", "true", "yes")
+HTTP_MAX_CONNECTIONS = int(os.getenv("ALPHA_VANTAGE_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("ALPHA_VANTAGE_MAX_KEEPALIVE_CONNECTIONS", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("ALPHA_VANTAGE_KEEPALIVE_EXPIRY", "60"))
+HTTP_TIMEOUT = float(os.getenv("ALPHA_VANTAGE_TIMEOUT", "30"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("ALPHA_VANTAGE_CONNECT_TIMEOUT", "10"))
+
+# --- Rate Limit Configuration (free tier: 5 calls per minute) ---
+RATE_LIMIT_PER_MINUTE = float(os.getenv("ALPHA_VANTAGE_CALLS_PER_MINUTE", "5"))
+RATE_LIMIT_BURST = int(os.getenv("ALPHA_VANTAGE_BURST", "5"))
+# The token bucket is per process: every process using the same API key needs its own share
+RATE_LIMIT_SHARE = float(os.getenv("ALPHA_VANTAGE_QUOTA_SHARE", "1"))
+THROTTLE_BACKOFF_INITIAL = float(os.getenv("ALPHA_VANTAGE_BACKOFF_INITIAL", "15"))
+THROTTLE_BACKOFF_MAX = float(os.getenv("ALPHA_VANTAGE_BACKOFF_MAX", "120"))
+THROTTLE_RETRIES = int(os.getenv("ALPHA_VANTAGE_THROTTLE_RETRIES", "2"))
+
+# --- Rate Cache Configuration ---
+RATE_CACHE_TTL = float(os.getenv("FOREX_RATE_CACHE_TTL", "60"))  # 0 disables the cache
+RATE_CACHE_PIVOTS = os.getenv("FOREX_RATE_CACHE_PIVOTS", "USD,EUR").split(",")  # cross-rate pivots, tried in order
+RATE_CACHE_MAX_ENTRIES = int(os.getenv("FOREX_RATE_CACHE_MAX_ENTRIES", "1024"))
+
+# Largest list of conversions accepted by convert_batch
+BATCH_MAX_ITEMS = int(os.getenv("FOREX_BATCH_MAX_ITEMS", "1000"))
+
+# --- Quote Subscription Configuration ---
+SUBSCRIPTION_MIN_INTERVAL = float(os.getenv("FOREX_SUBSCRIPTION_MIN_INTERVAL", "60"))  # seconds between polls of a pair
+SUBSCRIPTION_QUOTA_SHARE = float(os.getenv("FOREX_SUBSCRIPTION_QUOTA_SHARE", "0.5"))  # share of the API quota pollers may use
+SUBSCRIPTION_MAX_PAIRS = int(os.getenv("FOREX_SUBSCRIPTION_MAX_PAIRS", "20"))  # most distinct pairs polled at once
+
+# --- FX History Configuration ---
+# Arrow files of FX_DAILY / FX_INTRADAY series (empty: keep them in memory only)
+HISTORY_DIR = os.getenv("FOREX_HISTORY_DIR", "~/.forex_mcp/history")
+HISTORY_TTL_DAILY = float(os.getenv("FOREX_HISTORY_TTL_DAILY", "21600"))  # seconds before a stored series is updated
+HISTORY_TTL_INTRADAY = float(os.getenv("FOREX_HISTORY_TTL_INTRADAY", "300"))
+HISTORY_MAX_POINTS = int(os.getenv("FOREX_HISTORY_MAX_POINTS", "5000"))  # most points returned by fx_history
+HISTORY_MAX_PAIRS = int(os.getenv("FOREX_HISTORY_MAX_PAIRS", "20"))  # most pairs accepted by fx_statistics
 
 PHYSICAL_CURRENCY_LIST_PATH = os.path.join(os.path.dirname(__file__), 'data', 'physical_currency_list.csv')
 DIGITAL_CURRENCY_LIST_PATH = os.path.join(os.path.dirname(__file__), 'data', 'digital_currency_list.csv')
 
-# --- Simple Cache for Currency Data ---
-_currency_data_cache: Dict[str, Optional[pd.DataFrame]] = {
-    "physical": None,
-    "digital": None,
-}
-
 if not ALPHA_VANTAGE_API_KEY:
-    print("Warning: ALPHA_VANTAGE_API_KEY environment variable not set. Using 'demo' key.")
+    logger.warning("ALPHA_VANTAGE_API_KEY environment variable not set. Using 'demo' key.")
     ALPHA_VANTAGE_API_KEY = "demo" # Fallback to demo key if not set
 
 # --- Helper Function to Load Currency Data ---
-def _load_currency_data(currency_type: Literal["physical", "digital"]) -> Optional[pd.DataFrame]:
-    """Loads currency data from CSV, caching the result."""
-    if _currency_data_cache[currency_type] is not None:
-        return _currency_data_cache[currency_type]
-
+def _load_currency_data(currency_type: Literal["physical", "digital"]) -> List[Currency]:
+    """Loads a currency list from CSV (empty if the file is missing or malformed)."""
     file_path = PHYSICAL_CURRENCY_LIST_PATH if currency_type == "physical" else DIGITAL_CURRENCY_LIST_PATH
     if not os.path.exists(file_path):
-        print(f"Warning: Currency list file not found at {file_path}")
-        return None
+        logger.warning("Currency list file not found at %s", file_path)
+        return []
 
     try:
-        df = pd.read_csv(file_path)
-        # Standardize column names (assuming 'currency code'/'currency name' or similar)
-        df.columns = [col.lower().replace(' ', '_') for col in df.columns]
-        if 'currency_code' not in df.columns or 'currency_name' not in df.columns:
-             print(f"Warning: Expected columns 'currency_code' and 'currency_name' not found in {file_path}")
-             return None # Or handle differently
-        _currency_data_cache[currency_type] = df
-        print(f"Loaded and cached {currency_type} currency data.")
-        return df
-    except Exception as e:
-        print(f"Error loading currency data from {file_path}: {e}")
-        return None
+        with open(file_path, newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            # Standardize column names (assuming 'currency code'/'currency name' or similar)
+            columns = {col.strip().lower().replace(' ', '_'): col for col in reader.fieldnames or []}
+            if 'currency_code' not in columns or 'currency_name' not in columns:
+                logger.warning("Expected columns 'currency_code' and 'currency_name' not found in %s", file_path)
+                return []
+            code_column, name_column = columns['currency_code'], columns['currency_name']
+            currencies = [
+                Currency(row[code_column] or "", row[name_column] or "", currency_type) for row in reader
+            ]
+    except (OSError, UnicodeDecodeError, csv.Error) as e:
+        logger.error("Error loading currency data from %s: %s", file_path, e)
+        return []
+    logger.info("Loaded %d %s currencies.", len(currencies), currency_type)
+    return currencies
+
+def _build_currency_index(currency_type: Literal["physical", "digital"]) -> CurrencyIndex:
+    """Builds the search index for one currency list (empty if the list cannot be loaded)."""
+    return CurrencyIndex(_load_currency_data(currency_type))
+
+# --- Currency Search Index (built once at startup) ---
+_currency_indexes: Dict[str, CurrencyIndex] = {
+    currency_type: _build_currency_index(currency_type) for currency_type in ("physical", "digital")
+}
 
 
+# --- Shared HTTP Client ---
+# One pooled keep-alive client per process. FastMCP enters the lifespan once per
+# session (once per SSE connection), so it is reference counted: the first
+# session opens the client and the last one to finish closes it.
+_http_client: Optional[httpx.AsyncClient] = None
+_http_client_users = 0
+
+def _get_http_client() -> httpx.AsyncClient:
+    """Returns the shared AsyncClient, creating it on first use."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        try:
+            import h2  # noqa: F401 - only needed to enable HTTP/2
+            http2 = HTTP2
+        except ImportError:
+            http2 = False
+        _http_client = httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        )
+    return _http_client
+
+@asynccontextmanager
+async def _lifespan(server: FastMCP) -> AsyncIterator[Dict[str, Any]]:
+    """Opens the shared HTTP client on startup and closes it on shutdown."""
+    global _http_client, _http_client_users
+    _http_client_users += 1
+    _get_http_client()
+    observability.start_metrics_server()
+    try:
+        yield {}
+    finally:
+        _http_client_users -= 1
+        if _http_client_users == 0 and _http_client is not None:
+            await _http_client.aclose()
+            _http_client = None
+
+# --- Rate Limiter ---
+# Every Alpha Vantage request acquires a token first; throttle responses pause the bucket.
+_scheduler = RequestScheduler(
+    rate_per_minute=RATE_LIMIT_PER_MINUTE,
+    burst=RATE_LIMIT_BURST,
+    backoff_initial=THROTTLE_BACKOFF_INITIAL,
+    backoff_max=THROTTLE_BACKOFF_MAX,
+    share=RATE_LIMIT_SHARE,
+)
+
+async def _alpha_vantage_get(params: Dict[str, Any], priority: Priority = Priority.INTERACTIVE) -> Dict[str, Any]:
+    """
+    Sends a rate-limited GET to Alpha Vantage and returns the decoded JSON.
+    Throttle responses ("Note"/"Information") trigger a backoff and a retry;
+    the last throttle payload is returned if all retries are exhausted.
+    """
+    client = _get_http_client()
+    for _ in range(THROTTLE_RETRIES + 1):
+        await _scheduler.acquire(priority)
+        with observability.upstream_request("alphavantage") as call:
+            response = await client.get(ALPHA_VANTAGE_BASE_URL, params=params)
+            call.status = str(response.status_code)
+        response.raise_for_status()  # Raise an exception for bad status codes (4xx or 5xx)
+        with observability.timed(observability.PARSE_SECONDS, params["function"].lower()):
+            data = response.json()
+        if "Error Message" not in data and len(data) == 1 and ("Note" in data or "Information" in data):
+            _scheduler.report_throttle()
+            continue
+        _scheduler.report_success()
+        return data
+    return data
+
+# --- Rate Cache ---
+# Repeated, inverse and cross (via a pivot) conversions are answered from cached quotes.
+_rate_cache = RateCache(ttl=RATE_CACHE_TTL, pivots=RATE_CACHE_PIVOTS, max_entries=RATE_CACHE_MAX_ENTRIES)
+
+def _rate_cache_metrics() -> Dict[str, Any]:
+    stats = _rate_cache.snapshot()
+    return {"hits": stats["hits"] + stats["inverse_hits"] + stats["cross_hits"], "misses": stats["misses"], "hit_ratio": stats["hit_ratio"]}
+
+observability.register_cache("fx_rates", _rate_cache_metrics)
+
+async def _fetch_quote(from_currency: str, to_currency: str, priority: Priority = Priority.INTERACTIVE) -> Quote:
+    """
+    Fetches the realtime exchange rate for a pair from Alpha Vantage.
+
+    Raises:
+        ValueError: If the API returned no usable rate.
+    """
+    params = {
+        "function": "CURRENCY_EXCHANGE_RATE",
+        "from_currency": from_currency,
+        "to_currency": to_currency,
+        "apikey": ALPHA_VANTAGE_API_KEY,
+    }
+    data = await _alpha_vantage_get(params, priority)
+    rate_data = data.get("Realtime Currency Exchange Rate")
+    if not rate_data:
+        error_message = data.get("Error Message", "Unknown error from Alpha Vantage API.")
+        note = data.get("Note") or data.get("Information")
+        if note:
+             error_message += f" Note: {note}"
+        raise ValueError(f"Could not retrieve exchange rate: {error_message}")
+    return Quote.from_api(rate_data)
+
+def _format_price(price: Optional[float]) -> Optional[str]:
+    """Formats a price the way Alpha Vantage reports it."""
+    return f"{price:.8f}" if price is not None else None
+
 # --- MCP Server Setup ---
-app = FastMCP(
+class _InstrumentedFastMCP(FastMCP):
+    """FastMCP that records latency, in-flight count and a trace span for every tool call."""
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any]):
+        with observability.tool_call(name):
+            return await super().call_tool(name, arguments)
+
+observability.configure_tracing("forex")
+
+app = _InstrumentedFastMCP(
     title="FOREX MCP Server",
-    dependencies=["requests", "pandas", "tabulate"],    
+    lifespan=_lifespan,
+    dependencies=["requests", "numpy", "tabulate"],
     description="Provides tools for foreign currency exchange operations using Alpha Vantage.",
     version="0.1.0",
 )
@@ -77,6 +260,11 @@ async def from_currency_to_target_currency(
     Performs a currency value conversion from one currency to another using the
     realtime exchange rate from Alpha Vantage. Multiplies the rate by the provided amount.
 
+    Rates are cached for a short time: repeated conversions, the inverse pair
+    and cross rates through a pivot currency (e.g. USD) are answered without
+    an API call. `rate_source` tells where the rate came from ("api", "cache",
+    "inverse" or "cross") and `rate_age_seconds` how long ago it was fetched.
+
     Realtime Currency Exchange Rate	
     1. From_Currency Code	"USD"
     2. From_Currency Name	"United States Dollar"
@@ -92,95 +280,482 @@ async def from_currency_to_target_currency(
     if not ALPHA_VANTAGE_API_KEY:
          return {"error": "ALPHA_VANTAGE_API_KEY is not configured."}
 
+    try:
+        quote = await _rate_cache.get_or_fetch(from_currency.strip(), to_currency.strip(), _fetch_quote)
+    except ValueError as e:
+        return {"error": str(e)}
+    except httpx.HTTPStatusError as e:
+        return {"error": f"HTTP error occurred: {e.response.status_code} - {e.response.text}"}
+    except httpx.RequestError as e:
+        return {"error": f"An unexpected error occurred: {str(e)}"}
+
+    result = {
+        "from_currency": quote.from_currency,
+        "from_currency_name": quote.from_name,
+        "to_currency": quote.to_currency,
+        "to_currency_name": quote.to_name,
+        "exchange_rate": quote.rate,
+        "last_refreshed": quote.last_refreshed,
+        "time_zone": quote.time_zone,
+        "bid_price": _format_price(quote.bid),
+        "ask_price": _format_price(quote.ask),
+        "input_amount": amount,
+        "converted_amount": quote.rate * amount,
+        "rate_source": quote.source,
+        "rate_age_seconds": round(quote.age(), 3),
+    }
+    if quote.via:
+        result["derived_via"] = quote.via
+    return result
+
+@app.tool()
+async def convert_batch(conversions: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Converts many amounts in one call, e.g. to price a multi-currency portfolio.
+
+    Each item is {"from_currency": "EUR", "to_currency": "USD", "amount": 1250.0}
+    ("amount" defaults to 1). Every distinct currency pair is priced once:
+    pairs that are cached or derivable (inverse, cross rate) need no API call,
+    a pair and its inverse share one call, and the remaining rates are fetched
+    concurrently under the rate limit. Legs through a pivot currency (e.g.
+    USD) are fetched first so that cross pairs can be derived from them.
+
+    Returns the conversions in input order (items that could not be converted
+    carry an "error"), the converted totals per target currency, the number
+    of distinct pairs and the number of rates successfully fetched.
+    """
+    if not ALPHA_VANTAGE_API_KEY:
+         return {"error": "ALPHA_VANTAGE_API_KEY is not configured."}
+    if not isinstance(conversions, list) or not conversions:
+        return {"error": "'conversions' must be a non-empty list of {from_currency, to_currency, amount} items."}
+    if len(conversions) > BATCH_MAX_ITEMS:
+        return {"error": f"Too many conversions: {len(conversions)} (maximum is {BATCH_MAX_ITEMS})."}
+
+    # --- Parse items and collect the distinct pairs ---
+    items: List[Any] = []
+    for item in conversions:
+        try:
+            pair = (str(item["from_currency"]).strip().upper(), str(item["to_currency"]).strip().upper())
+            amount = float(item.get("amount", 1.0))
+        except (KeyError, TypeError, ValueError, AttributeError):
+            items.append(f"Invalid conversion item: {item!r}")
+            continue
+        if not all(pair):
+            items.append(f"Invalid conversion item: {item!r}")
+            continue
+        items.append((pair, amount))
+    pairs = list(dict.fromkeys(entry[0] for entry in items if isinstance(entry, tuple)))
+
+    # --- Resolve pairs from the cache; fetch one representative per unordered pair ---
+    quotes: Dict[Any, Quote] = {}
+    errors: Dict[Any, str] = {}
+    to_fetch: Dict[frozenset, Any] = {}
+    for pair in pairs:
+        if pair[0] == pair[1]:
+            continue
+        quote = _rate_cache.lookup(*pair)
+        if quote is not None:
+            quotes[pair] = quote
+        else:
+            to_fetch.setdefault(frozenset(pair), pair)
+
+    rates_fetched = 0
+
+    async def fetch_all(batch: List[Any]) -> None:
+        nonlocal rates_fetched
+        fetched = await asyncio.gather(
+            *(_rate_cache.get_or_fetch(*pair, _fetch_quote) for pair in batch), return_exceptions=True
+        )
+        for pair, result in zip(batch, fetched):
+            reverse = (pair[1], pair[0])
+            if isinstance(result, Quote):
+                quotes[pair] = result
+                quotes.setdefault(reverse, result.inverse())
+                rates_fetched += 1
+            elif isinstance(result, httpx.HTTPStatusError):
+                errors[pair] = errors[reverse] = f"HTTP error occurred: {result.response.status_code}"
+            elif isinstance(result, (ValueError, httpx.RequestError)):
+                errors[pair] = errors[reverse] = str(result)
+            elif isinstance(result, Exception):
+                # Only this pair's items fail; the rest of the batch is still converted
+                logger.error("Unexpected error fetching %s/%s", *pair, exc_info=result)
+                errors[pair] = errors[reverse] = f"An unexpected error occurred: {result}"
+            else:
+                raise result
+
+    # Legs through a pivot currency first, so other pairs can be derived as cross rates
+    pivots = set(_rate_cache.pivots)
+    legs = [pair for pair in to_fetch.values() if pivots & set(pair)]
+    await fetch_all(legs)
+    rest = []
+    for pair in to_fetch.values():
+        if pair in quotes or pair in errors:
+            continue
+        quote = _rate_cache.lookup(*pair)
+        if quote is not None:
+            quotes[pair] = quote
+        else:
+            rest.append(pair)
+    await fetch_all(rest)
+
+    # --- Convert every item ---
+    results: List[Dict[str, Any]] = []
+    totals: Dict[str, float] = {}
+    for entry in items:
+        if isinstance(entry, str):
+            results.append({"error": entry})
+            continue
+        (from_code, to_code), amount = entry
+        converted: Dict[str, Any] = {"from_currency": from_code, "to_currency": to_code, "input_amount": amount}
+        if from_code == to_code:
+            converted.update(exchange_rate=1.0, converted_amount=amount, rate_source="identity", rate_age_seconds=0.0)
+        elif (from_code, to_code) in quotes:
+            quote = quotes[(from_code, to_code)]
+            converted.update(
+                exchange_rate=quote.rate,
+                converted_amount=quote.rate * amount,
+                rate_source=quote.source,
+                rate_age_seconds=round(quote.age(), 3),
+            )
+            if quote.via:
+                converted["derived_via"] = quote.via
+        else:
+            converted["error"] = errors.get((from_code, to_code), "Exchange rate unavailable.")
+            results.append(converted)
+            continue
+        totals[to_code] = totals.get(to_code, 0.0) + converted["converted_amount"]
+        results.append(converted)
+
+    return {
+        "conversions": results,
+        "totals": totals,
+        "distinct_pairs": len(pairs),
+        "rates_fetched": rates_fetched,
+        "failed": sum(1 for converted in results if "error" in converted),
+    }
+
+# --- FX History ---
+# The history module (numpy, pyarrow) is imported by the first history tool
+# call, so it adds nothing to the startup of every stdio server process.
+_fx_history: Optional["history.FxHistory"] = None
+
+def _history_module():
+    try:
+        from . import history
+    except ImportError:  # loaded as a plain script, e.g. `mcp run server.py`
+        import history
+    return history
+
+def _get_fx_history():
+    """The shared FX history, created on first use."""
+    global _fx_history
+    if _fx_history is None:
+        history = _history_module()
+        _fx_history = history.FxHistory(
+            history.FxStore(HISTORY_DIR) if HISTORY_DIR else None,
+            ttls={"daily": HISTORY_TTL_DAILY},
+            default_ttl=HISTORY_TTL_INTRADAY,
+        )
+    return _fx_history
+
+async def _fetch_history(from_currency: str, to_currency: str, interval: str, outputsize: str) -> Dict[str, Any]:
+    """Fetches an FX_DAILY or FX_INTRADAY payload from Alpha Vantage."""
     params = {
-        "function": "CURRENCY_EXCHANGE_RATE",
-        "from_currency": from_currency,
-        "to_currency": to_currency,
+        "function": "FX_DAILY" if interval == "daily" else "FX_INTRADAY",
+        "from_symbol": from_currency,
+        "to_symbol": to_currency,
+        "outputsize": outputsize,
         "apikey": ALPHA_VANTAGE_API_KEY,
     }
+    if interval != "daily":
+        params["interval"] = interval
+    return await _alpha_vantage_get(params)
+
+def _parse_pair(pair: str) -> Tuple[str, str]:
+    """Splits "EUR/USD", "EUR:USD", "EUR-USD" or "EURUSD" into codes."""
+    for separator in "/:-":
+        if separator in pair:
+            from_currency, _, to_currency = pair.partition(separator)
+            return from_currency.strip().upper(), to_currency.strip().upper()
+    pair = pair.strip().upper()
+    if len(pair) == 6:
+        return pair[:3], pair[3:]
+    raise ValueError(f"Invalid currency pair: {pair!r} (expected e.g. 'EUR/USD')")
+
+def _select(series: "history.FxSeries", start: Optional[str], end: Optional[str], resample: Optional[str]) -> "history.FxSeries":
+    """Applies the date range and the optional resampling to a series."""
+    if resample and resample != series.interval:
+        minutes = _history_module().INTRADAY_MINUTES
+        if series.interval == "daily" and resample in minutes:
+            raise ValueError(f"Cannot resample daily points to {resample}.")
+        if series.interval in minutes and resample in minutes and minutes[resample] < minutes[series.interval]:
+            raise ValueError(f"Cannot resample {series.interval} points to the finer {resample}.")
+    series = series.between(start, end)
+    return series.resample(resample) if resample and resample != series.interval else series
+
+@app.tool()
+async def fx_history(
+    from_currency: str,
+    to_currency: str,
+    interval: Literal["daily", "1min", "5min", "15min", "30min", "60min"] = "daily",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    resample: Optional[Literal["weekly", "monthly", "daily", "1min", "5min", "15min", "30min", "60min"]] = None,
+    limit: int = 500,
+) -> Dict[str, Any]:
+    """
+    Returns historical FX rates (open, high, low, close) for a currency pair
+    from FX_DAILY or FX_INTRADAY, as columns.
+
+    History is stored locally and updated incrementally, so repeated queries
+    make no API calls until the stored series is due for an update.
+    `start` / `end` ("YYYY-MM-DD" or "YYYY-MM-DD HH:MM:SS") select a range,
+    `resample` aggregates the points (e.g. daily to "weekly" or "monthly"),
+    and `limit` keeps the latest points.
+    """
+    if not ALPHA_VANTAGE_API_KEY:
+         return {"error": "ALPHA_VANTAGE_API_KEY is not configured."}
+    limit = max(1, min(int(limit), HISTORY_MAX_POINTS))
+    try:
+        series, source = await _get_fx_history().get(from_currency.strip(), to_currency.strip(), interval, _fetch_history)
+        selected = _select(series, start, end, resample)
+    except ValueError as e:
+        return {"error": str(e)}
+    except httpx.HTTPStatusError as e:
+        return {"error": f"HTTP error occurred: {e.response.status_code} - {e.response.text}"}
+    except httpx.RequestError as e:
+        return {"error": f"An unexpected error occurred: {str(e)}"}
+
+    returned = selected.tail(limit)
+    return {
+        "pair": selected.pair,
+        "interval": selected.interval,
+        "points": len(returned),
+        "truncated": len(selected) > len(returned),
+        "source": source,
+        "data_age_seconds": round(series.age(), 1),
+        "columns": returned.to_columns(),
+    }
+
+@app.tool()
+async def fx_statistics(
+    pairs: List[str],
+    interval: Literal["daily", "1min", "5min", "15min", "30min", "60min"] = "daily",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    resample: Optional[Literal["weekly", "monthly", "daily", "1min", "5min", "15min", "30min", "60min"]] = None,
+) -> Dict[str, Any]:
+    """
+    Computes statistics over the historical rates of one or more currency
+    pairs (e.g. ["EUR/USD", "GBP/USD", "USD/JPY"]): total return, mean log
+    return, volatility (per period and annualized), maximum drawdown, high
+    and low, plus the correlation matrix of log returns across the pairs.
 
-    async with httpx.AsyncClient() as client:
+    Uses the same locally stored history as fx_history; `start`, `end` and
+    `resample` select and aggregate the points first.
+    """
+    if not ALPHA_VANTAGE_API_KEY:
+         return {"error": "ALPHA_VANTAGE_API_KEY is not configured."}
+    try:
+        codes = list(dict.fromkeys(_parse_pair(pair) for pair in pairs))
+    except ValueError as e:
+        return {"error": str(e)}
+    if not codes:
+        return {"error": "'pairs' must be a non-empty list such as ['EUR/USD', 'GBP/USD']."}
+    if len(codes) > HISTORY_MAX_PAIRS:
+        return {"error": f"Too many pairs: {len(codes)} (maximum is {HISTORY_MAX_PAIRS})."}
+
+    history = _history_module()
+    shared_history = _get_fx_history()
+    results = await asyncio.gather(
+        *(shared_history.get(from_code, to_code, interval, _fetch_history) for from_code, to_code in codes),
+        return_exceptions=True,
+    )
+    selected = []
+    statistics: Dict[str, Any] = {}
+    for (from_code, to_code), result in zip(codes, results):
+        pair = f"{from_code}/{to_code}"
+        if isinstance(result, BaseException):
+            if not isinstance(result, (ValueError, httpx.HTTPError)):
+                raise result
+            statistics[pair] = {"error": str(result)}
+            continue
+        series, source = result
         try:
-            # ctx.send_progress removed
-            response = await client.get(ALPHA_VANTAGE_BASE_URL, params=params)
-            response.raise_for_status()  # Raise an exception for bad status codes (4xx or 5xx)
-            data = response.json()
+            chosen = _select(series, start, end, resample)
+        except ValueError as e:
+            return {"error": str(e)}
+        selected.append(chosen)
+        statistics[pair] = {
+            **chosen.statistics(history.PERIODS_PER_YEAR[chosen.interval]),
+            "source": source,
+            "data_age_seconds": round(series.age(), 1),
+        }
+
+    return {
+        "interval": resample or interval,
+        "statistics": statistics,
+        "correlation": history.correlation_matrix(selected) if len(selected) > 1 else None,
+    }
 
-            # --- Process Alpha Vantage Response ---
-            rate_data = data.get("Realtime Currency Exchange Rate")
-            if not rate_data:
-                error_message = data.get("Error Message", "Unknown error from Alpha Vantage API.")
-                note = data.get("Note")
-                if note:
-                     error_message += f" Note: {note}"
-                return {"error": f"Could not retrieve exchange rate: {error_message}"}
-
-            exchange_rate_str = rate_data.get("5. Exchange Rate")
-            if not exchange_rate_str:
-                return {"error": "Exchange rate not found in API response."}
-
-            try:
-                exchange_rate = float(exchange_rate_str)
-            except ValueError:
-                return {"error": f"Invalid exchange rate format received: {exchange_rate_str}"}
-
-            converted_amount = exchange_rate * amount
-
-            # ctx.send_progress removed
-            return {
-                "from_currency": rate_data.get("1. From_Currency Code"),
-                "from_currency_name": rate_data.get("2. From_Currency Name"),
-                "to_currency": rate_data.get("3. To_Currency Code"),
-                "to_currency_name": rate_data.get("4. To_Currency Name"),
-                "exchange_rate": exchange_rate,
-                "last_refreshed": rate_data.get("6. Last Refreshed"),
-                "time_zone": rate_data.get("7. Time Zone"),
-                "bid_price": rate_data.get("8. Bid Price"),
-                "ask_price": rate_data.get("9. Ask Price"),
-                "input_amount": amount,
-                "converted_amount": converted_amount,
-            }
-
-        except httpx.HTTPStatusError as e:
-            return {"error": f"HTTP error occurred: {e.response.status_code} - {e.response.text}"}
-        except httpx.RequestError as e:
-            return {"error": f"An unexpected error occurred: {str(e)}"}
+# --- Quote Subscriptions ---
+# One shared poller per subscribed pair, at background priority; changed rates
+# are pushed to every subscribed session.
+def _quote_uri(from_currency: str, to_currency: str) -> str:
+    return f"fx://quote/{from_currency}/{to_currency}"
+
+def _quote_summary(quote: Quote) -> Dict[str, Any]:
+    """The fields of a quote pushed to and returned for subscribers."""
+    return {
+        "pair": f"{quote.from_currency}/{quote.to_currency}",
+        "exchange_rate": quote.rate,
+        "bid_price": _format_price(quote.bid),
+        "ask_price": _format_price(quote.ask),
+        "last_refreshed": quote.last_refreshed,
+        "time_zone": quote.time_zone,
+        "rate_source": quote.source,
+        "rate_age_seconds": round(quote.age(), 3),
+    }
 
-# --- Search Currency Code Tool ---
+async def _poll_quote(from_currency: str, to_currency: str) -> Quote:
+    return await _fetch_quote(from_currency, to_currency, Priority.BACKGROUND)
+
+async def _notify_quote(session: Any, quote: Quote) -> None:
+    """Pushes a changed rate as a resource update plus a log message carrying the quote."""
+    await session.send_resource_updated(AnyUrl(_quote_uri(quote.from_currency, quote.to_currency)))
+    await session.send_log_message(level="info", data=_quote_summary(quote), logger="fx_quotes")
+
+_quote_hub = QuoteHub(
+    fetch=_poll_quote,
+    notify=_notify_quote,
+    calls_per_minute=_scheduler.rate_per_minute,
+    quota_share=SUBSCRIPTION_QUOTA_SHARE,
+    min_interval=SUBSCRIPTION_MIN_INTERVAL,
+    max_pairs=SUBSCRIPTION_MAX_PAIRS,
+    on_quote=_rate_cache.put,
+)
+
+@app.tool()
+async def subscribe_fx_quotes(pairs: List[str], ctx: Context) -> Dict[str, Any]:
+    """
+    Subscribes this session to realtime rates of currency pairs
+    (e.g. ["EUR/USD", "USD/JPY"]) instead of polling
+    from_currency_to_target_currency.
+
+    The server polls each pair once for all subscribed clients and, when a
+    rate changes, sends a `notifications/resources/updated` for
+    fx://quote/{FROM}/{TO} and a log message (logger "fx_quotes") with the
+    new quote. Returns the current quotes where known; the others follow as
+    notifications after the first poll.
+    """
+    if not ALPHA_VANTAGE_API_KEY:
+         return {"error": "ALPHA_VANTAGE_API_KEY is not configured."}
+    try:
+        codes = list(dict.fromkeys(_parse_pair(pair) for pair in pairs))
+        if not codes:
+            return {"error": "'pairs' must be a non-empty list such as ['EUR/USD', 'USD/JPY']."}
+        _quote_hub.subscribe(ctx.session, codes)
+    except ValueError as e:
+        return {"error": str(e)}
+
+    quotes: Dict[str, Any] = {}
+    for from_code, to_code in codes:
+        quote = _quote_hub.latest((from_code, to_code))
+        if quote is None:
+            # A cached (or derived) rate answers now and postpones the first poll
+            quote = _rate_cache.lookup(from_code, to_code)
+            if quote is not None:
+                _quote_hub.seed(quote)
+        quotes[f"{from_code}/{to_code}"] = _quote_summary(quote) if quote else None
+    return {
+        "subscribed": [f"{from_code}/{to_code}" for from_code, to_code in _quote_hub.subscriptions(ctx.session)],
+        "quotes": quotes,
+        "resource_uris": [_quote_uri(from_code, to_code) for from_code, to_code in codes],
+        "poll_interval_seconds": round(_quote_hub.interval(), 1),
+    }
+
+@app.tool()
+async def unsubscribe_fx_quotes(ctx: Context, pairs: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Unsubscribes this session from the given currency pairs, or from all
+    pairs when `pairs` is omitted. Pairs nobody subscribes to stop being polled.
+    """
+    try:
+        codes = [_parse_pair(pair) for pair in pairs] if pairs is not None else None
+    except ValueError as e:
+        return {"error": str(e)}
+    removed = _quote_hub.unsubscribe(ctx.session, codes)
+    return {
+        "unsubscribed": [f"{from_code}/{to_code}" for from_code, to_code in removed],
+        "subscribed": [f"{from_code}/{to_code}" for from_code, to_code in _quote_hub.subscriptions(ctx.session)],
+    }
+
+@app.resource("fx://quote/{from_currency}/{to_currency}")
+async def fx_quote(from_currency: str, to_currency: str) -> str:
+    """Latest rate of a currency pair, as polled for subscribers (or fetched on demand)."""
+    from_currency, to_currency = from_currency.strip().upper(), to_currency.strip().upper()
+    quote = _quote_hub.latest((from_currency, to_currency))
+    if quote is None:
+        try:
+            quote = await _rate_cache.get_or_fetch(from_currency, to_currency, _fetch_quote)
+        except (ValueError, httpx.HTTPError) as e:
+            return json.dumps({"error": str(e)})
+    return json.dumps(_quote_summary(quote))
+
+@app.resource("stats://subscriptions")
+def subscription_stats() -> str:
+    """Subscribed pairs, their subscribers and polls, and notification counters."""
+    return json.dumps(_quote_hub.snapshot())
+
+@app.resource("stats://fx_history")
+def fx_history_stats() -> str:
+    """FX history series held, points, and memory/store/API counters."""
+    return json.dumps(_get_fx_history().snapshot())
+
+@app.resource("stats://rate_cache")
+def rate_cache_stats() -> str:
+    """Rate cache hits (direct, inverse, cross), misses and occupancy."""
+    return json.dumps(_rate_cache.snapshot())
+
+@app.resource("stats://scheduler")
+def scheduler_stats() -> str:
+    """Rate limiter queue depth, wait times and throttle counters."""
+    return json.dumps(_scheduler.snapshot())
+
+def create_sse_app():
+    """Starlette app serving the MCP SSE endpoints plus Prometheus metrics at /metrics."""
+    starlette_app = app.sse_app()
+    starlette_app.router.routes.append(observability.metrics_route())
+    return starlette_app
 
-# SearchCurrencyInput model removed
-#@app.tool() # Use the tool decorator from the FastMCP instance
+# --- Search Currency Code Tool ---
+@app.tool()
 async def search_currency_code(
     search_term: str,
-    currency_type: Literal["physical", "digital"] = "physical" # Default directly in signature
+    currency_type: Literal["physical", "digital", "all"] = "physical",
+    limit: int = 10,
 ) -> Dict[str, Any]:
     """
     Searches for currency codes and names based on a search term within the
-    specified currency type (physical or digital).
-    """
-    # ctx.send_progress removed
-
-    # Validate currency_type just in case (though Literal should handle it)
-    if currency_type not in ["physical", "digital"]:
-         return {"error": "Invalid currency_type. Must be 'physical' or 'digital'."}
+    specified currency type (physical, digital or all).
 
-    df = _load_currency_data(currency_type)
-
-    if df is None:
-        return {"error": f"Could not load {currency_type} currency data. Check server logs."}
+    Matches exact codes ("usd"), names in any case ("euro"), the start of a
+    code or of name words ("canad", "swiss fr"), and misspelled names
+    ("japanes yen"). Returns at most `limit` matches, best first, each with
+    its code, name, type, a score between 0 and 1 and the kind of match.
+    """
+    if currency_type not in ["physical", "digital", "all"]:
+         return {"error": "Invalid currency_type. Must be 'physical', 'digital' or 'all'."}
+    limit = max(1, min(int(limit), 100))
 
-    #search_term_lower = search_term.lower().strip()  # Normalize search term
-    # Search in both code and name columns
-    name_match_mask = df.loc[df['currency_name'] == search_term]
-    print(name_match_mask)
+    currency_types = ["physical", "digital"] if currency_type == "all" else [currency_type]
+    matches = [match for kind in currency_types for match in _currency_indexes[kind].search(search_term, limit)]
+    if currency_type == "all":
+        matches = sorted(matches, key=lambda match: -match["score"])[:limit]
 
-    # Combine the masks using logical OR and filter the DataFrame
-    #matches = df[code_match_mask | name_match_mask]
-    if name_match_mask is None:
+    if not matches:
         return {"message": f"No {currency_type} currencies found matching '{search_term}'."}
-    else:
-        # Convert matching rows to a list of dictionaries for JSON serialization
-        return {"matches": name_match_mask}
+    return {"matches": matches}
 
 if __name__ == "__main__":
     import asyncio
@@ -0,0 +1,253 @@
+# subscriptions.py
+"""
+Shared polling of subscribed exchange rates.
+
+Clients subscribe to currency pairs; each pair has one poller however many
+clients subscribe to it, so upstream calls scale with the number of distinct
+pairs rather than the number of clients. Pollers are served round-robin by a
+single background task, earliest due first.
+
+The poll interval is quota-aware: all pollers together use at most a share of
+the Alpha Vantage calls per minute, so with more pairs every pair is polled
+less often (never more often than the minimum interval). When a polled rate
+differs from the previous one, every subscriber of the pair is notified.
+
+Notifications are sent by one task per subscriber, from an outbox holding the
+latest unsent quote per pair, so the poll loop never waits on a client and a
+slow client only skips intermediate quotes. Subscribers are held by weak
+reference, and dropped when a notification fails or times out, so closed
+sessions stop costing polls.
+"""
+
+import asyncio
+import logging
+import time
+import weakref
+from dataclasses import dataclass, field, replace
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    from .rates import Quote
+except ImportError:  # loaded as a plain script
+    from rates import Quote
+
+logger = logging.getLogger(__name__)
+
+Pair = Tuple[str, str]
+# Fetcher signature: (from_currency, to_currency) -> fresh quote
+Fetcher = Callable[[str, str], Awaitable[Quote]]
+# Notifier signature: (subscriber, quote) -> None; raising drops the subscriber
+Notifier = Callable[[Any, Quote], Awaitable[None]]
+
+
+@dataclass
+class PairPoller:
+    """
+    Polling state of one subscribed pair.
+
+    Attributes:
+        pair: (from_currency, to_currency).
+        subscribers: Sessions subscribed to the pair (weakly referenced).
+        quote: Latest quote, if any was fetched or seeded.
+        due: `time.monotonic()` of the next poll.
+        polls: Upstream calls made for the pair.
+        changes: Polls that returned a different rate.
+        errors: Polls that failed.
+    """
+
+    pair: Pair
+    subscribers: "weakref.WeakSet[Any]" = field(default_factory=weakref.WeakSet)
+    quote: Optional[Quote] = None
+    due: float = 0.0
+    polls: int = 0
+    changes: int = 0
+    errors: int = 0
+
+
+@dataclass
+class _Outbox:
+    """Latest unsent quote per pair for one subscriber, and the task sending them."""
+
+    pending: Dict[Pair, Quote] = field(default_factory=dict)
+    task: Optional[asyncio.Task] = None
+
+
+def _changed(old: Optional[Quote], new: Quote) -> bool:
+    return old is None or (old.rate, old.bid, old.ask) != (new.rate, new.bid, new.ask)
+
+
+class QuoteHub:
+    """
+    One poller per subscribed pair, sharing a slice of the API quota.
+
+    Args:
+        fetch: Coroutine function returning a fresh quote for a pair.
+        notify: Coroutine function pushing a changed quote to one subscriber.
+        calls_per_minute: API calls per minute allowed by the rate limiter.
+        quota_share: Fraction of `calls_per_minute` the pollers may use.
+        min_interval: Shortest time in seconds between polls of one pair.
+        max_pairs: Most pairs polled at once.
+        notify_timeout: Seconds a subscriber may take to accept a notification.
+        on_quote: Called with every polled quote (e.g. to fill a rate cache).
+    """
+
+    def __init__(
+        self,
+        fetch: Fetcher,
+        notify: Notifier,
+        calls_per_minute: float,
+        quota_share: float = 0.5,
+        min_interval: float = 60.0,
+        max_pairs: int = 50,
+        notify_timeout: float = 10.0,
+        on_quote: Optional[Callable[[Quote], None]] = None,
+    ):
+        self.fetch = fetch
+        self.notify = notify
+        self.calls_per_minute = calls_per_minute
+        self.quota_share = quota_share
+        self.min_interval = min_interval
+        self.max_pairs = max_pairs
+        self.notify_timeout = notify_timeout
+        self.on_quote = on_quote
+        self.notifications = 0
+        self.dropped_subscribers = 0
+        self._pollers: Dict[Pair, PairPoller] = {}
+        self._outboxes: "weakref.WeakKeyDictionary[Any, _Outbox]" = weakref.WeakKeyDictionary()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def interval(self) -> float:
+        """Seconds between polls of each pair, given the number of pairs polled."""
+        budget = self.calls_per_minute * self.quota_share
+        if budget <= 0:
+            return self.min_interval
+        return max(self.min_interval, len(self._pollers) * 60.0 / budget)
+
+    def subscribe(self, subscriber: Any, pairs: Iterable[Pair]) -> List[PairPoller]:
+        """
+        Subscribe to pairs, starting a poller for each pair not polled yet.
+
+        Raises:
+            ValueError: If the new pairs would exceed `max_pairs`.
+        """
+        pairs = list(dict.fromkeys(pairs))
+        new = [pair for pair in pairs if pair not in self._pollers]
+        if len(self._pollers) + len(new) > self.max_pairs:
+            raise ValueError(f"Too many subscribed pairs: at most {self.max_pairs} can be polled.")
+        now = time.monotonic()
+        for pair in new:
+            self._pollers[pair] = PairPoller(pair, due=now)
+        pollers = [self._pollers[pair] for pair in pairs]
+        for poller in pollers:
+            poller.subscribers.add(subscriber)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        self._wakeup.set()
+        return pollers
+
+    def unsubscribe(self, subscriber: Any, pairs: Optional[Iterable[Pair]] = None) -> List[Pair]:
+        """Unsubscribe from the given pairs (all pairs if None); returns the pairs unsubscribed."""
+        removed = []
+        for pair in (self._pollers if pairs is None else pairs):
+            poller = self._pollers.get(pair)
+            if poller is not None and subscriber in poller.subscribers:
+                poller.subscribers.discard(subscriber)
+                removed.append(pair)
+        return removed
+
+    def seed(self, quote: Quote) -> None:
+        """Record a quote fetched elsewhere as the pair's latest, postponing its poll accordingly."""
+        poller = self._pollers.get((quote.from_currency, quote.to_currency))
+        if poller is not None and poller.quote is None:
+            poller.quote = quote
+            poller.due = time.monotonic() + max(0.0, self.interval() - quote.age())
+
+    def latest(self, pair: Pair) -> Optional[Quote]:
+        poller = self._pollers.get(pair)
+        return poller.quote if poller is not None else None
+
+    def subscriptions(self, subscriber: Any) -> List[Pair]:
+        return [pair for pair, poller in self._pollers.items() if subscriber in poller.subscribers]
+
+    async def _run(self) -> None:
+        while True:
+            for pair in [pair for pair, poller in self._pollers.items() if not poller.subscribers]:
+                del self._pollers[pair]
+            if not self._pollers:
+                return
+            poller = min(self._pollers.values(), key=lambda p: p.due)
+            delay = poller.due - time.monotonic()
+            if delay > 0:
+                # A new subscription may add an earlier poll, or unsubscribing remove this one
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._poll(poller)
+
+    async def _poll(self, poller: PairPoller) -> None:
+        poller.polls += 1
+        try:
+            # Keyed by the subscribed codes, whatever casing the API reports
+            quote = replace(await self.fetch(*poller.pair), from_currency=poller.pair[0], to_currency=poller.pair[1])
+        except Exception:
+            poller.errors += 1
+            logger.warning("Polling %s/%s failed", *poller.pair, exc_info=True)
+            poller.due = time.monotonic() + self.interval()
+            return
+        # Scheduled from when the call finished, so a queued call does not bunch the next one
+        poller.due = time.monotonic() + self.interval()
+        if self.on_quote is not None:
+            self.on_quote(quote)
+        changed = _changed(poller.quote, quote)
+        poller.quote = quote
+        if not changed:
+            return
+        poller.changes += 1
+        for subscriber in list(poller.subscribers):
+            self._enqueue(subscriber, quote)
+
+    def _enqueue(self, subscriber: Any, quote: Quote) -> None:
+        outbox = self._outboxes.get(subscriber)
+        if outbox is None:
+            outbox = self._outboxes[subscriber] = _Outbox()
+        # A quote still waiting for a slow subscriber is superseded by the newer one
+        outbox.pending[(quote.from_currency, quote.to_currency)] = quote
+        if outbox.task is None or outbox.task.done():
+            outbox.task = asyncio.get_running_loop().create_task(self._drain(subscriber, outbox))
+
+    async def _drain(self, subscriber: Any, outbox: _Outbox) -> None:
+        while outbox.pending:
+            quote = outbox.pending.pop(next(iter(outbox.pending)))
+            try:
+                await asyncio.wait_for(self.notify(subscriber, quote), self.notify_timeout)
+            except Exception as e:
+                logger.info("Dropping FX quote subscriber after failed notification: %r", e)
+                self.dropped_subscribers += 1
+                self.unsubscribe(subscriber)
+                outbox.pending.clear()
+                return
+            self.notifications += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Pollers, subscribers and counters suitable for JSON serialization."""
+        now = time.monotonic()
+        return {
+            "pairs": {
+                f"{poller.pair[0]}/{poller.pair[1]}": {
+                    "subscribers": len(poller.subscribers),
+                    "polls": poller.polls,
+                    "changes": poller.changes,
+                    "errors": poller.errors,
+                    "next_poll_seconds": round(max(0.0, poller.due - now), 1),
+                    "rate": poller.quote.rate if poller.quote else None,
+                }
+                for poller in self._pollers.values()
+            },
+            "poll_interval_seconds": round(self.interval(), 1),
+            "notifications": self.notifications,
+            "dropped_subscribers": self.dropped_subscribers,
+        }
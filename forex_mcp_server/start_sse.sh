@@ -15,13 +15,10 @@ else
 fi
 
 echo "Starting FOREX MCP Server with Uvicorn for SSE..."
-echo "Access SSE endpoint at http://localhost:8000/mcp"
+echo "Access SSE endpoint at http://localhost:8000/sse (Prometheus metrics at http://localhost:8000/metrics)"
 echo "Press CTRL+C to stop the server."
 
-# Run uvicorn
-# Note: If you still encounter 'FastMCP object is not callable',
-# you might need to try 'src.forex_mcp_server.server:app.app' below,
-# depending on the internal structure of FastMCP.
-uvicorn src.forex_mcp_server.server:app --host 127.0.0.1 --port 8000 --app-dir "$SCRIPT_DIR"
+# Run uvicorn with the Starlette app built by create_sse_app (FastMCP itself is not an ASGI app)
+uvicorn --factory src.forex_mcp_server.server:create_sse_app --host 127.0.0.1 --port 8000 --app-dir "$SCRIPT_DIR"
 
 echo "Server stopped."
\ No newline at end of file
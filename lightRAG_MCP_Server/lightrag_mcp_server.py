@@ -1,7 +1,9 @@
 #!/usr/bin/env python
 import anyio
 import click
+import logging
 import mcp.types as types
+import mcp_observability as observability
 from mcp.server.lowlevel import Server
 # from mcp.server.sse import SseServerTransport
 # from starlette.applications import Starlette
@@ -15,14 +17,17 @@ from lightrag.utils import EmbeddingFunc
         
 # Import the correct functions based on ollama.py structure
 from lightrag.kg.shared_storage import initialize_pipeline_status
-from lightrag.utils import setup_logger
 from lightrag.llm.ollama import ollama_model_complete, ollama_embed
 
 # TODO: Import similar functions for Gemini, Groq, OpenRouter when implementing support
 # from lightrag.llm.gemini import gemini_model_complete, gemini_embed # Example
 # from lightrag.llm.groq import groq_model_complete, groq_embed # Example
 
-setup_logger("lightrag ollama MCP server", level="INFO")
+# JSON records to stderr from a background thread, never stdout (the stdio transport uses it)
+observability.configure_logging("lightrag-mcp-server", level=logging.INFO)
+# LightRAG's own logger does not propagate by default; send it through the shared handler
+logging.getLogger("lightrag").propagate = True
+logger = logging.getLogger(__name__)
 
 # --- Configuration via Environment Variables ---
 LIGHTRAG_LLM_PROVIDER = os.getenv("LIGHTRAG_LLM_PROVIDER", "ollama").lower()  # ollama, gemini, groq, openrouter
@@ -66,7 +71,8 @@ class FunctionWrapperWithDim:
         # The wrapper needs to be awaitable if LightRAG awaits it.
         # Let's assume LightRAG handles awaiting the underlying function correctly.
         # If errors occur, we might need to make this explicitly async.
-        print(f"Calling wrapped embedding function with args: {args}, kwargs: {kwargs}")
+        # Only the batch size: the texts themselves can be whole documents
+        logger.debug("Calling wrapped embedding function for %d texts", len(args[0]) if args else 0)
         # Check if self._func is awaitable (like the original ollama_embed)
         if asyncio.iscoroutinefunction(self._func) or asyncio.iscoroutine(self._func):
             return await self._func(*args, **kwargs)
@@ -79,8 +85,9 @@ def get_embedding_func():
     if LIGHTRAG_EMBEDDING_PROVIDER == "ollama":
         # TODO: Make embedding_dim configurable or detect automatically
         embedding_dim = 768  # Default for nomic-embed-text
-        print(
-            f"Configuring ollama_embed wrapper with model: {LIGHTRAG_EMBEDDING_MODEL_NAME}, host: {LIGHTRAG_OLLAMA_BASE_URL}, dim: {embedding_dim}"
+        logger.info(
+            "Configuring ollama_embed wrapper with model: %s, host: %s, dim: %s",
+            LIGHTRAG_EMBEDDING_MODEL_NAME, LIGHTRAG_OLLAMA_BASE_URL, embedding_dim,
         )
         # Create the partial function first
         partial_func = functools.partial(
@@ -101,19 +108,37 @@ def get_embedding_func():
             f"Unsupported Embedding provider: {LIGHTRAG_EMBEDDING_PROVIDER}"
         )
 
+# --- Instrumented Ollama calls (latency is exported as upstream request metrics) ---
+async def ollama_complete_observed(*args, **kwargs):
+    with observability.upstream_request("ollama_llm") as call:
+        result = await ollama_model_complete(*args, **kwargs)
+        call.status = "ok"
+    return result
+
+async def ollama_embed_observed(texts):
+    with observability.upstream_request("ollama_embed") as call:
+        embeddings = await ollama_embed(
+            texts, embed_model=LIGHTRAG_EMBEDDING_MODEL_NAME, host=LIGHTRAG_OLLAMA_BASE_URL
+        )
+        call.status = "ok"
+    return embeddings
+
 async def initialize_lightrag():
     global lightrag_instance
     if not os.path.exists(LIGHTRAG_WORKING_DIR):
         os.makedirs(LIGHTRAG_WORKING_DIR)
 
-    print(f"Initializing LightRAG with LLM: {LIGHTRAG_LLM_PROVIDER} ({LIGHTRAG_MODEL_NAME}), Embedding: {LIGHTRAG_EMBEDDING_PROVIDER} ({LIGHTRAG_EMBEDDING_MODEL_NAME})")
+    logger.info(
+        "Initializing LightRAG with LLM: %s (%s), Embedding: %s (%s)",
+        LIGHTRAG_LLM_PROVIDER, LIGHTRAG_MODEL_NAME, LIGHTRAG_EMBEDDING_PROVIDER, LIGHTRAG_EMBEDDING_MODEL_NAME,
+    )
     #llm_func = get_llm_model_func()
     #embed_func = get_embedding_func()
 
     # Initialize LightRAG with Ollama model
     lightrag_instance = LightRAG(
         working_dir=LIGHTRAG_WORKING_DIR,
-        llm_model_func=ollama_model_complete,
+        llm_model_func=ollama_complete_observed,
         llm_model_name=LIGHTRAG_MODEL_NAME,
         llm_model_max_async=4,
         llm_model_max_token_size=32768,
@@ -124,34 +149,30 @@ async def initialize_lightrag():
         embedding_func=EmbeddingFunc(
             embedding_dim=768,
             max_token_size=8192,
-            func=lambda texts: ollama_embed(
-                texts, embed_model=LIGHTRAG_EMBEDDING_MODEL_NAME, host=LIGHTRAG_OLLAMA_BASE_URL
-            ),
+            func=ollama_embed_observed,
         ),
     )
     
     await lightrag_instance.initialize_storages()
-    print("LightRAG storages initialized.")
+    logger.info("LightRAG storages initialized.")
     await initialize_pipeline_status()
-    print("LightRAG pipeline initialized.")
+    logger.info("LightRAG pipeline initialized.")
 
     # Load data if path is provided
     if LIGHTRAG_DATA_PATH and os.path.exists(LIGHTRAG_DATA_PATH):
-        print(f"Loading data from: {LIGHTRAG_DATA_PATH}")
+        logger.info("Loading data from: %s", LIGHTRAG_DATA_PATH)
         try:
             with open(LIGHTRAG_DATA_PATH, "r", encoding="utf-8") as f:
                 content = f.read()
                 # Call the asynchronous ainsert method directly
                 await lightrag_instance.ainsert(content)
-                print(f"Successfully inserted data from {LIGHTRAG_DATA_PATH}")
+                logger.info("Successfully inserted data from %s", LIGHTRAG_DATA_PATH)
         except Exception as e:
-            print(f"Error loading or inserting data from {LIGHTRAG_DATA_PATH}: {e}")
+            logger.exception("Error loading or inserting data from %s: %s", LIGHTRAG_DATA_PATH, e)
     elif LIGHTRAG_DATA_PATH:
-        print(
-            f"Warning: LIGHTRAG_DATA_PATH specified but file not found: {LIGHTRAG_DATA_PATH}"
-        )
+        logger.warning("LIGHTRAG_DATA_PATH specified but file not found: %s", LIGHTRAG_DATA_PATH)
     else:
-        print("No LIGHTRAG_DATA_PATH specified, skipping data loading.")
+        logger.info("No LIGHTRAG_DATA_PATH specified, skipping data loading.")
 
 # --- Global LightRAG Instance ---
 # Initialized asynchronously in startup
@@ -174,17 +195,17 @@ async def perform_lightrag_search(tool_name: str, query: str) -> str:
     if not search_mode:
         raise ValueError(f"Unknown search tool mapped: {tool_name}")
 
-    print(f"Performing LightRAG query (mode: {search_mode}) for: {query}")
+    logger.info("Performing LightRAG query (mode: %s) for: %s", search_mode, query)
     # TODO: Check if rag.query needs to be awaited if llm_model_func is async
     # Assuming rag.query handles async internally or the llm_func is sync wrapper
     try:
         # The query method might return complex objects, convert to string for now
         result = await lightrag_instance.query(query, param=QueryParam(mode=search_mode))
-        print(f"LightRAG query result type: {type(result)}")
+        logger.debug("LightRAG query result type: %s", type(result))
         # Convert result to string representation for MCP text content
         return str(result)
     except Exception as e:
-        print(f"Error during LightRAG query: {e}")
+        logger.error("Error during LightRAG query: %s", e)
         raise  # Re-raise the exception to be caught by the tool handler
 
 
@@ -193,10 +214,11 @@ async def perform_lightrag_search(tool_name: str, query: str) -> str:
 @click.option("--transport",type=click.Choice(["stdio", "sse"]),default="stdio",help="Transport type",)
 def main(port: int, transport: str) -> int:
     app = Server("lightrag-mcp-server")
+    observability.configure_tracing("lightrag-mcp-server")
 
     @app.call_tool()
     async def handle_search_tool(name: str, arguments: dict) -> list[types.TextContent | types.ImageContent | types.EmbeddedResource]:
-        print(f"Received call_tool request for: {name} with args: {arguments}")
+        logger.info("Received call_tool request for: %s with args: %s", name, arguments)
         valid_tools = ["naive_search", "local_search", "global_search", "hybrid_search"]
         if name not in valid_tools:
             raise ValueError(f"Unknown tool: {name}")
@@ -207,11 +229,12 @@ def main(port: int, transport: str) -> int:
 
         query = arguments["query"]
         try:
-            search_result = await perform_lightrag_search(name, query)
+            with observability.tool_call(name):
+                search_result = await perform_lightrag_search(name, query)
             return [types.TextContent(type="text", text=search_result)]
         except Exception as e:
             error_message = f"Error during {name}: {e}"
-            print(f"Error: {error_message}")
+            logger.error("Error: %s", error_message)
             # Return error information as content with isError flag
             return [types.TextContent(type="text", text=error_message)]
             # Note: Consider setting isError=True in the response if the SDK supports it directly
@@ -220,7 +243,7 @@ def main(port: int, transport: str) -> int:
 
     @app.list_tools()
     async def list_search_tools() -> list[types.Tool]:
-        print("Received list_tools request")
+        logger.debug("Received list_tools request")
         query_input_schema = {
             "type": "object",
             "required": ["query"],
@@ -270,14 +293,16 @@ def main(port: int, transport: str) -> int:
             routes=[
                 Route("/sse", endpoint=handle_sse),
                 Mount("/messages/", app=sse.handle_post_message),
+                observability.metrics_route(),
             ],
         )
         uvicorn.run(starlette_app, host="0.0.0.0", port=port)
     else: 
         from mcp.server.stdio import stdio_server       
+        observability.start_metrics_server()
                     
         async def arun(): 
-            print(f"Initialize LightRAG instance")            
+            logger.info("Initialize LightRAG instance")
             async with stdio_server() as streams:
                 await app.run(streams[0], streams[1], app.create_initialization_options())
         anyio.run(arun)
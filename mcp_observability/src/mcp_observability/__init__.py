@@ -0,0 +1,34 @@
+"""Logging, metrics, tracing and request scheduling shared by the MCP servers in this repository."""
+
+from .log import configure_logging
+from .metrics import (
+    COMPUTE_SECONDS,
+    PARSE_SECONDS,
+    metrics_route,
+    register_cache,
+    render,
+    start_metrics_server,
+    timed,
+    tool_call,
+    upstream_request,
+)
+from .scheduler import Priority, RateLimitError, RequestScheduler
+from .tracing import configure_tracing, span
+
+__all__ = [
+    "COMPUTE_SECONDS",
+    "PARSE_SECONDS",
+    "Priority",
+    "RateLimitError",
+    "RequestScheduler",
+    "configure_logging",
+    "configure_tracing",
+    "metrics_route",
+    "register_cache",
+    "render",
+    "span",
+    "start_metrics_server",
+    "timed",
+    "tool_call",
+    "upstream_request",
+]
@@ -0,0 +1,242 @@
+# log.py
+"""
+Structured logging for the MCP servers.
+
+`configure_logging` sends every record through a bounded in-memory queue to a
+background thread that formats it and writes it to stderr. stdout is never
+used, because it carries the MCP stream for the stdio transport. The calling
+task only pays for:
+
+- the level check and the sampling decision,
+- a bounded `reprlib` rendering of container arguments (dicts, lists, ...)
+  and a capped `str()` of other objects. Large payloads cannot be turned into
+  huge strings, and later mutations cannot change what gets logged.
+
+Everything else, including %-style message formatting and the JSON encoding,
+happens on the logging thread. Use %-style arguments (`logger.debug("x=%s", x)`)
+rather than f-strings, so nothing is formatted for records that are
+filtered out.
+
+Environment variables:
+
+- MCP_LOG_LEVEL: root level (default: the level passed by the server, usually INFO).
+- MCP_LOG_FORMAT: "json" (default) or "text".
+- MCP_LOG_SAMPLE_DEBUG, MCP_LOG_SAMPLE_INFO: share of DEBUG and INFO records
+  kept (default 1.0). WARNING and above are always kept.
+- MCP_LOG_MAX_CHARS: maximum length of a message (default 2000). Tracebacks
+  may be four times as long.
+- MCP_LOG_QUEUE_SIZE: records buffered before new ones are dropped (default 10000).
+
+Dropped records are counted in mcp_log_records_dropped_total{reason}.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import reprlib
+import sys
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from prometheus_client import Counter
+
+LOG_RECORDS_DROPPED = Counter(
+    "mcp_log_records_dropped_total", "Log records not written, by reason (sampled or queue_full).", ["reason"]
+)
+
+# Attributes every LogRecord has; anything else was passed with `extra=`
+_RECORD_ATTRIBUTES = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+_listener: Optional["_Listener"] = None
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _cap(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    return f"{text[:max_chars]}... [{len(text) - max_chars} more chars]"
+
+
+class _BoundedRepr(reprlib.Repr):
+    """reprlib limits sized for log records."""
+
+    def __init__(self, max_chars: int):
+        super().__init__()
+        self.maxstring = max_chars
+        self.maxother = max(max_chars // 4, 80)
+        self.maxdict = self.maxlist = self.maxtuple = self.maxset = self.maxfrozenset = self.maxdeque = 20
+        self.maxlevel = 4
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a share of the records per level.
+
+    Args:
+        rates: Share of records kept (0.0 to 1.0) by level; levels that are not
+            listed are always kept.
+    """
+
+    def __init__(self, rates: Dict[int, float]):
+        super().__init__()
+        self.rates = {level: rate for level, rate in rates.items() if rate < 1.0}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = self.rates.get(record.levelno)
+        if rate is None or random.random() < rate:
+            return True
+        LOG_RECORDS_DROPPED.labels("sampled").inc()
+        return False
+
+
+class QueueingHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to a bounded queue without blocking or formatting them.
+
+    Container arguments are replaced by bounded reprs and other objects by
+    their capped string, so the record cannot grow without limit or change
+    before it is written; scalar arguments are formatted later by the
+    logging thread.
+    """
+
+    _SCALARS = (str, int, float, bool, type(None))
+    _CONTAINERS = (dict, list, tuple, set, frozenset, deque)
+
+    def __init__(self, log_queue: queue.Queue, max_chars: int):
+        super().__init__(log_queue)
+        self.max_chars = max_chars
+        self._repr = _BoundedRepr(max_chars)
+
+    def _freeze(self, value: Any) -> Any:
+        if isinstance(value, str):
+            return _cap(value, self.max_chars)
+        if isinstance(value, self._SCALARS):
+            return value
+        if isinstance(value, self._CONTAINERS):
+            return self._repr.repr(value)
+        return _cap(str(value), self.max_chars)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(vars(record))
+        if record.args:
+            if isinstance(record.args, dict) and "%(" in str(record.msg):
+                record.args = {key: self._freeze(value) for key, value in record.args.items()}
+            elif isinstance(record.args, dict):
+                # A single dict argument, e.g. logger.debug("result %s", result)
+                record.args = (self._freeze(record.args),)
+            else:
+                record.args = tuple(self._freeze(value) for value in record.args)
+        if not isinstance(record.msg, str):
+            record.msg = self._freeze(record.msg)
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not isinstance(value, self._SCALARS):
+                setattr(record, key, self._freeze(value))
+        if record.exc_info:
+            # Traceback objects keep whole frames alive; render them now
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.labels("queue_full").inc()
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line: time, level, logger, message, `extra` fields
+    and the traceback, with the message and traceback length capped.
+    """
+
+    def __init__(self, service: str, max_chars: int = 2000):
+        super().__init__()
+        self.service = service
+        self.max_chars = max_chars
+
+    def format(self, record: logging.LogRecord) -> str:
+        try:
+            message = record.getMessage()
+        except Exception as e:
+            message = f"{record.msg!r} (formatting failed: {e})"
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "service": self.service,
+            "msg": _cap(message, self.max_chars),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key not in entry:
+                entry[key] = value
+        if record.exc_text:
+            entry["exc"] = _cap(record.exc_text, self.max_chars * 4)
+        return json.dumps(entry, default=lambda value: _cap(str(value), self.max_chars))
+
+
+class _Listener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # Wait for room instead of failing when the queue is full at exit
+        self.queue.put(self._sentinel)
+
+
+class _TextFormatter(logging.Formatter):
+    def __init__(self, max_chars: int):
+        super().__init__("%(asctime)s - %(name)s - %(levelname)s - %(message)s", "%Y-%m-%d %H:%M:%S")
+        self.max_chars = max_chars
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        record.message = _cap(record.message, self.max_chars)
+        return super().formatMessage(record)
+
+
+def configure_logging(service_name: str, level: int = logging.INFO) -> None:
+    """
+    Route all logging through the background queue to stderr.
+
+    Replaces the root logger's handlers; calling it again only updates the
+    level. Records still queued at exit are written before the process ends.
+
+    Args:
+        service_name: Reported as "service" in every JSON record.
+        level: Root level, unless MCP_LOG_LEVEL is set.
+    """
+    global _listener
+    root = logging.getLogger()
+    root.setLevel(os.getenv("MCP_LOG_LEVEL", "").upper() or level)
+    if _listener is not None:
+        return
+
+    max_chars = int(_env_float("MCP_LOG_MAX_CHARS", 2000))
+    if os.getenv("MCP_LOG_FORMAT", "json").lower() == "text":
+        formatter: logging.Formatter = _TextFormatter(max_chars)
+    else:
+        formatter = JsonFormatter(service_name, max_chars)
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(formatter)
+
+    log_queue: queue.Queue = queue.Queue(maxsize=int(_env_float("MCP_LOG_QUEUE_SIZE", 10_000)))
+    handler = QueueingHandler(log_queue, max_chars)
+    handler.addFilter(SamplingFilter({
+        logging.DEBUG: _env_float("MCP_LOG_SAMPLE_DEBUG", 1.0),
+        logging.INFO: _env_float("MCP_LOG_SAMPLE_INFO", 1.0),
+    }))
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+
+    _listener = _Listener(log_queue, output)
+    _listener.start()
+    atexit.register(_listener.stop)
@@ -0,0 +1,183 @@
+# metrics.py
+"""
+Prometheus metrics shared by the MCP servers.
+
+All servers record into the default `prometheus_client` registry under the
+same metric names, so one dashboard covers every server:
+
+- mcp_tool_call_duration_seconds{tool, status}: latency of `call_tool` handlers.
+- mcp_tool_calls_in_flight{tool}: tool calls currently running.
+- mcp_upstream_request_duration_seconds{upstream, status}: latency of calls to
+  upstream services (AlphaVantage, DuckDuckGo, Ollama) by HTTP status, or
+  "error" when no response was received.
+- mcp_upstream_requests_in_flight{upstream}: upstream calls currently running.
+- mcp_parse_duration_seconds{payload}: time spent decoding upstream payloads.
+- mcp_compute_duration_seconds{task}: time spent in CPU-bound work such as
+  indicator computations.
+- mcp_cache_hit_ratio{cache} and mcp_cache_lookups_total{cache, result}: read
+  from the caches' own counters when the registry is scraped.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Gauge, Histogram, generate_latest, start_http_server
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from . import tracing
+
+# Buckets for work that usually takes microseconds to milliseconds
+FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# Buckets for requests that include network round trips
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+TOOL_CALL_SECONDS = Histogram(
+    "mcp_tool_call_duration_seconds", "Latency of MCP tool calls.", ["tool", "status"], buckets=REQUEST_BUCKETS
+)
+TOOL_CALLS_IN_FLIGHT = Gauge("mcp_tool_calls_in_flight", "MCP tool calls currently running.", ["tool"])
+UPSTREAM_SECONDS = Histogram(
+    "mcp_upstream_request_duration_seconds",
+    "Latency of requests to upstream services.",
+    ["upstream", "status"],
+    buckets=REQUEST_BUCKETS,
+)
+UPSTREAM_IN_FLIGHT = Gauge("mcp_upstream_requests_in_flight", "Upstream requests currently running.", ["upstream"])
+PARSE_SECONDS = Histogram(
+    "mcp_parse_duration_seconds", "Time spent decoding upstream payloads.", ["payload"], buckets=FAST_BUCKETS
+)
+COMPUTE_SECONDS = Histogram(
+    "mcp_compute_duration_seconds", "Time spent in CPU-bound computations.", ["task"], buckets=FAST_BUCKETS
+)
+
+
+class UpstreamCall:
+    """Outcome of one upstream request; set `status` once the response is known."""
+
+    def __init__(self) -> None:
+        self.status: Optional[str] = None
+
+
+@contextmanager
+def tool_call(tool: str) -> Iterator[None]:
+    """Time a tool call, count it as in flight and wrap it in a trace span."""
+    in_flight = TOOL_CALLS_IN_FLIGHT.labels(tool)
+    in_flight.inc()
+    status = "error"
+    start = time.perf_counter()
+    try:
+        with tracing.span(f"tools/call {tool}", {"mcp.tool.name": tool}):
+            yield
+        status = "ok"
+    finally:
+        in_flight.dec()
+        TOOL_CALL_SECONDS.labels(tool, status).observe(time.perf_counter() - start)
+
+
+@contextmanager
+def upstream_request(upstream: str) -> Iterator[UpstreamCall]:
+    """
+    Time a request to an upstream service.
+
+    The caller sets `call.status` (e.g. the HTTP status code) on the yielded
+    object; requests that raise before that are recorded as "error".
+    """
+    call = UpstreamCall()
+    in_flight = UPSTREAM_IN_FLIGHT.labels(upstream)
+    in_flight.inc()
+    start = time.perf_counter()
+    try:
+        with tracing.span(f"upstream {upstream}", {"peer.service": upstream}):
+            yield call
+    finally:
+        in_flight.dec()
+        UPSTREAM_SECONDS.labels(upstream, call.status or "error").observe(time.perf_counter() - start)
+
+
+@contextmanager
+def timed(histogram: Histogram, *labels: str) -> Iterator[None]:
+    """Observe the duration of the block in a histogram, e.g. `timed(PARSE_SECONDS, "intraday")`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.labels(*labels).observe(time.perf_counter() - start)
+
+
+class _CacheCollector:
+    """Exports hit ratios and lookup counters from cache `snapshot()` dicts."""
+
+    # Snapshot keys counted as lookups, and the result label they are reported under
+    RESULTS = {"hits": "hit", "stale_hits": "stale_hit", "misses": "miss"}
+
+    def __init__(self) -> None:
+        self.caches: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+    def collect(self):
+        ratio = GaugeMetricFamily("mcp_cache_hit_ratio", "Share of cache lookups served from the cache.", labels=["cache"])
+        lookups = CounterMetricFamily("mcp_cache_lookups", "Cache lookups by result.", labels=["cache", "result"])
+        for name, snapshot in list(self.caches.items()):
+            stats = snapshot()
+            counts = {result: stats[key] for key, result in self.RESULTS.items() if key in stats}
+            for result, count in counts.items():
+                lookups.add_metric([name, result], count)
+            total = sum(counts.values())
+            hits = total - counts.get("miss", 0)
+            ratio.add_metric([name], stats.get("hit_ratio", hits / total if total else 0.0))
+        yield ratio
+        yield lookups
+
+
+_caches = _CacheCollector()
+REGISTRY.register(_caches)
+
+
+def register_cache(name: str, snapshot: Callable[[], Dict[str, Any]]) -> None:
+    """
+    Export a cache's counters.
+
+    Args:
+        name: Value of the "cache" label.
+        snapshot: Returns the cache counters; "hits", "stale_hits" and
+            "misses" are reported as lookups, "hit_ratio" (if present) as the
+            hit ratio.
+    """
+    _caches.caches[name] = snapshot
+
+
+def render() -> bytes:
+    """The metrics in Prometheus text format."""
+    return generate_latest(REGISTRY)
+
+
+def metrics_route(path: str = "/metrics"):
+    """A Starlette route serving the metrics, for the SSE apps."""
+    from starlette.responses import Response
+    from starlette.routing import Route
+
+    async def endpoint(request) -> Response:
+        return Response(render(), media_type=CONTENT_TYPE_LATEST)
+
+    return Route(path, endpoint=endpoint)
+
+
+_metrics_port: Optional[int] = None
+
+
+def start_metrics_server() -> Optional[int]:
+    """
+    Serve the metrics on a separate HTTP port (for stdio servers) when
+    MCP_METRICS_PORT is set. Calling it again is a no-op.
+
+    Returns:
+        The port, or None when disabled.
+    """
+    global _metrics_port
+    if _metrics_port is None:
+        port = int(os.getenv("MCP_METRICS_PORT", "0"))
+        if port <= 0:
+            return None
+        start_http_server(port, addr=os.getenv("MCP_METRICS_ADDR", "127.0.0.1"))
+        _metrics_port = port
+    return _metrics_port
@@ -0,0 +1,243 @@
+# scheduler.py
+"""
+Rate limiting and prioritization for upstream API requests.
+
+Every request to the API first acquires a token from a token bucket. When no
+token is available, callers queue in priority lanes: interactive tool calls
+are always served before background work such as cache revalidation or rate
+polling. When the API answers with a throttle payload ("Note" or
+"Information"), the scheduler stops handing out tokens for an exponentially
+growing backoff period. A queued request can be moved to a higher lane with
+`promote()`, e.g. when an interactive call joins a background fetch.
+
+The bucket lives in one process. An API key's quota is not shared between
+processes, so every server process using the same key must be given its own
+part of it with `share` (the shares of all processes summing to at most 1).
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from enum import IntEnum
+from typing import Any, Deque, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """Request priority lanes; lower values are served first."""
+
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+class RateLimitError(ValueError):
+    """Raised when the API keeps answering with throttle responses."""
+
+
+class LaneStats:
+    """Queue and wait-time figures for one priority lane."""
+
+    def __init__(self) -> None:
+        self.granted = 0
+        self.queued = 0
+        self.max_queued = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record_wait(self, wait: float) -> None:
+        self.granted += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "granted": self.granted,
+            "queue_depth": self.queued,
+            "max_queue_depth": self.max_queued,
+            "avg_wait": self.total_wait / self.granted if self.granted else 0.0,
+            "max_wait": self.max_wait,
+        }
+
+
+class RequestScheduler:
+    """
+    Token bucket with priority lanes and throttle backoff.
+
+    Args:
+        rate_per_minute: Sustained number of requests per minute allowed for the API key.
+        burst: Maximum number of tokens that can accumulate.
+        backoff_initial: Pause in seconds after the first throttle response.
+        backoff_max: Upper bound for the exponentially growing pause.
+        share: Fraction of `rate_per_minute` and `burst` this process may use.
+        upstream: API name used in log messages.
+    """
+
+    def __init__(
+        self,
+        rate_per_minute: float,
+        burst: int,
+        backoff_initial: float = 15.0,
+        backoff_max: float = 120.0,
+        share: float = 1.0,
+        upstream: str = "AlphaVantage",
+    ):
+        if not 0 < share <= 1:
+            raise ValueError(f"Quota share must be in (0, 1], got {share}")
+        self.share = share
+        self.upstream = upstream
+        self.rate = rate_per_minute * share / 60.0
+        self.burst = max(1, int(burst * share))
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.throttles = 0
+        self.promotions = 0
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._backoff = 0.0
+        self._lanes: Dict[Priority, Deque[asyncio.Future]] = {p: deque() for p in Priority}
+        self._stats: Dict[Priority, LaneStats] = {p: LaneStats() for p in Priority}
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._queued: Dict[Hashable, Tuple[Priority, asyncio.Future]] = {}
+
+    async def acquire(self, priority: Priority = Priority.INTERACTIVE, key: Optional[Hashable] = None) -> None:
+        """
+        Wait until a request of the given priority may be sent.
+
+        Args:
+            priority: Lane to queue in while no token is available.
+            key: Identifies the request for `promote()` while it is queued.
+        """
+        start = time.monotonic()
+        if not self._has_waiters() and self._take_token(start):
+            self._stats[priority].record_wait(0.0)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        lane = self._lanes[priority]
+        lane.append(future)
+        self._record_queued(priority)
+        if key is not None:
+            self._queued[key] = (priority, future)
+        self._ensure_dispatcher()
+        try:
+            await future
+        finally:
+            if not future.done():
+                future.cancel()
+            if key is not None and self._queued.get(key, (None, None))[1] is future:
+                # The lane it was granted from, if it was promoted meanwhile
+                priority = self._queued.pop(key)[0]
+        wait = time.monotonic() - start
+        self._stats[priority].record_wait(wait)
+        if wait > 1.0:
+            logger.info("%s request waited %.1fs for a %s slot.", self.upstream, wait, priority.name.lower())
+
+    def promote(self, key: Hashable, priority: Priority = Priority.INTERACTIVE) -> bool:
+        """
+        Move the request queued with `key` to a higher-priority lane.
+
+        Returns:
+            True if the request was queued in a lower lane and has been moved.
+        """
+        queued = self._queued.get(key)
+        if queued is None or queued[0] <= priority or queued[1].done():
+            return False
+        current, future = queued
+        self._lanes[current].remove(future)
+        self._stats[current].queued = len(self._lanes[current])
+        self._lanes[priority].append(future)
+        self._record_queued(priority)
+        self._queued[key] = (priority, future)
+        self.promotions += 1
+        return True
+
+    def report_throttle(self) -> None:
+        """Back off after the API returned a throttle response."""
+        self.throttles += 1
+        self._backoff = min(self.backoff_max, self._backoff * 2 if self._backoff else self.backoff_initial)
+        self._paused_until = time.monotonic() + self._backoff
+        self._tokens = 0.0
+        logger.warning("%s throttle response received. Pausing requests for %.0fs.", self.upstream, self._backoff)
+
+    def report_success(self) -> None:
+        """Reset the backoff after a successful response."""
+        self._backoff = 0.0
+
+    @property
+    def rate_per_minute(self) -> float:
+        """Requests per minute this process may send."""
+        return self.rate * 60.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Queue depth, wait times and throttle counters for JSON serialization."""
+        now = time.monotonic()
+        self._refill(now)
+        return {
+            "tokens": round(self._tokens, 3),
+            "rate_per_minute": self.rate_per_minute,
+            "burst": self.burst,
+            "share": self.share,
+            "throttles": self.throttles,
+            "promotions": self.promotions,
+            "paused_for": max(0.0, self._paused_until - now),
+            "lanes": {p.name.lower(): self._stats[p].as_dict() for p in Priority},
+        }
+
+    def _record_queued(self, priority: Priority) -> None:
+        stats = self._stats[priority]
+        stats.queued = len(self._lanes[priority])
+        stats.max_queued = max(stats.max_queued, stats.queued)
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _take_token(self, now: float) -> bool:
+        if now < self._paused_until:
+            return False
+        self._refill(now)
+        if self._tokens >= 1.0:
+            self._tokens -= 1.0
+            return True
+        return False
+
+    def _has_waiters(self) -> bool:
+        return any(self._lanes.values())
+
+    def _next_waiter(self) -> Optional[asyncio.Future]:
+        for priority in Priority:
+            lane = self._lanes[priority]
+            while lane and lane[0].done():  # drop cancelled waiters
+                lane.popleft()
+            self._stats[priority].queued = len(lane)
+            if lane:
+                return lane[0]
+        return None
+
+    def _ensure_dispatcher(self) -> None:
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.get_running_loop().create_task(self._dispatch())
+
+    async def _dispatch(self) -> None:
+        while True:
+            waiter = self._next_waiter()
+            if waiter is None:
+                return
+            now = time.monotonic()
+            if self._take_token(now):
+                for priority in Priority:
+                    lane = self._lanes[priority]
+                    if lane and lane[0] is waiter:
+                        lane.popleft()
+                        self._stats[priority].queued = len(lane)
+                        break
+                waiter.set_result(None)
+                continue
+            if now < self._paused_until:
+                delay = self._paused_until - now
+            else:
+                delay = (1.0 - self._tokens) / self.rate if self.rate > 0 else 1.0
+            await asyncio.sleep(max(delay, 0.001))
@@ -0,0 +1,61 @@
+# tracing.py
+"""
+Optional OpenTelemetry tracing.
+
+Spans are created through the OpenTelemetry API and cost next to nothing
+until an SDK is configured. `configure_tracing` installs the SDK with an OTLP
+exporter when the standard OTEL_EXPORTER_OTLP_ENDPOINT (or
+OTEL_EXPORTER_OTLP_TRACES_ENDPOINT) variable is set and the `otlp` extra is
+installed.
+"""
+
+import logging
+import os
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from opentelemetry import trace
+
+logger = logging.getLogger(__name__)
+
+_tracer = trace.get_tracer("mcp_observability")
+_configured = False
+
+
+@contextmanager
+def span(name: str, attributes: Optional[Dict[str, Any]] = None) -> Iterator[None]:
+    """Run the block in a span; exceptions are recorded on the span and re-raised."""
+    with _tracer.start_as_current_span(name, attributes=attributes):
+        yield
+
+
+def configure_tracing(service_name: str) -> bool:
+    """
+    Export spans over OTLP/HTTP if an OTLP endpoint is configured.
+
+    Args:
+        service_name: Service name reported with the spans, unless
+            OTEL_SERVICE_NAME is set.
+
+    Returns:
+        Whether spans are exported.
+    """
+    global _configured
+    if _configured:
+        return True
+    if not (os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT") or os.getenv("OTEL_EXPORTER_OTLP_TRACES_ENDPOINT")):
+        return False
+    try:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import SERVICE_NAME, Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError:
+        logger.warning("An OTLP endpoint is set but the OpenTelemetry SDK is missing; install mcp-observability[otlp].")
+        return False
+    provider = TracerProvider(resource=Resource.create({SERVICE_NAME: os.getenv("OTEL_SERVICE_NAME", service_name)}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(provider)
+    _configured = True
+    logger.info("Exporting trace spans over OTLP for %s", service_name)
+    return True
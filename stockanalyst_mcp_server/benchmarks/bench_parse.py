@@ -0,0 +1,97 @@
+# bench_parse.py
+"""
+Micro-benchmark of the intraday payload parse paths.
+
+Compares the original `response.json()` + `DataFrame.from_dict` conversion
+with every decoder available in `stockanalyst_mcp_tool.parsing`, on either a
+synthetic payload or recorded AlphaVantage responses, e.g.:
+
+    curl -o full.json "https://www.alphavantage.co/query?function=TIME_SERIES_INTRADAY&symbol=IBM&interval=1min&outputsize=full&apikey=$ALPHAVANTAGE_API_KEY"
+    python -m benchmarks.bench_parse --fixture full.json
+
+Run from the stockanalyst_mcp_server directory (or with the package installed).
+"""
+
+import argparse
+import json
+import statistics
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from stockanalyst_mcp_tool import parsing
+
+
+def synthetic_payload(bars: int, interval: str = "1min", seed: int = 0) -> bytes:
+    """An intraday response with `bars` random-walk bars, newest first."""
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 0.05, bars))
+    stamps = pd.date_range("2025-01-02 04:00", periods=bars, freq=interval)
+    series = {}
+    for i in range(bars - 1, -1, -1):
+        series[stamps[i].strftime("%Y-%m-%d %H:%M:%S")] = {
+            "1. open": f"{close[i] - 0.01:.4f}",
+            "2. high": f"{close[i] + 0.05:.4f}",
+            "3. low": f"{close[i] - 0.05:.4f}",
+            "4. close": f"{close[i]:.4f}",
+            "5. volume": str(int(rng.integers(100, 100_000))),
+        }
+    payload = {
+        "Meta Data": {"1. Information": "Synthetic intraday prices", "2. Symbol": "TEST", "4. Interval": interval},
+        f"Time Series ({interval})": series,
+    }
+    return json.dumps(payload).encode()
+
+
+def legacy_parse(body: bytes, interval: str) -> pd.DataFrame:
+    """The conversion used before the compact bar representation."""
+    data = json.loads(body)
+    df = pd.DataFrame.from_dict(data[f"Time Series ({interval})"], orient="index")
+    df.index = pd.to_datetime(df.index)
+    df = df.sort_index()
+    df.columns = [col.split(". ")[1] for col in df.columns]
+    for col in df.columns:
+        df[col] = pd.to_numeric(df[col])
+    return df
+
+
+def parse_paths(interval: str) -> Dict[str, Callable[[bytes], pd.DataFrame]]:
+    paths = {"legacy (json + from_dict)": lambda body: legacy_parse(body, interval)}
+    for decoder in parsing.available_decoders():
+        paths[decoder] = lambda body, decoder=decoder: parsing.decode_intraday(body, interval, decoder).bars
+    return paths
+
+
+def run(name: str, body: bytes, interval: str, repeat: int) -> None:
+    print(f"\n{name}: {len(body) / 1024:.0f} KiB")
+    print(f"{'path':<28}{'min ms':>10}{'median ms':>12}{'frame KiB':>12}")
+    for path, parse in parse_paths(interval).items():
+        timings: List[float] = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            df = parse(body)
+            timings.append(time.perf_counter() - start)
+        size = df.memory_usage(index=True, deep=True).sum() / 1024
+        print(f"{path:<28}{min(timings) * 1000:>10.1f}{statistics.median(timings) * 1000:>12.1f}{size:>12.0f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--fixture", action="append", default=[], help="Recorded intraday response (repeatable)")
+    parser.add_argument("--bars", type=int, default=20_000, help="Bars in the synthetic payload (default: 20000)")
+    parser.add_argument("--interval", default="1min", help="Interval of the payloads (default: 1min)")
+    parser.add_argument("--repeat", type=int, default=10, help="Runs per parse path (default: 10)")
+    args = parser.parse_args()
+
+    if args.fixture:
+        for path in args.fixture:
+            with open(path, "rb") as f:
+                run(path, f.read(), args.interval, args.repeat)
+    else:
+        run(f"synthetic ({args.bars} bars)", synthetic_payload(args.bars, args.interval), args.interval, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
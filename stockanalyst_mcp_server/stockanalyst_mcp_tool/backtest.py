@@ -0,0 +1,224 @@
+# backtest.py
+"""
+Vectorized backtests of the `analyze_stock` scoring rules.
+
+For every bar the moving average direction, the earliest MA crossover within
+the last `panel.CROSSOVER_LOOKBACK` values and the RSI are combined into the
+same signal strength the tools report. The strategy is long while the
+strength is at least `threshold`, short (or flat when shorting is disabled)
+while it is at most -`threshold`, and flat otherwise. Positions are taken at
+the close of the signal bar and held over the next bar, so no future data is
+used.
+
+Each (symbol, configuration) pair is evaluated with a handful of NumPy passes
+over the history. Moving averages and RSI series are computed once per
+symbol and shared by all configurations using them. Parameter grids are split
+into chunks that can be fanned out to a process pool.
+"""
+
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from . import scoring, signals
+from .executor import process_context
+from .indicators import rolling_mean, rsi_series
+from .panel import CROSSOVER_LOOKBACK
+
+# Columns of the per-configuration results
+METRICS = ["trades", "hit_rate", "total_return", "max_drawdown", "exposure"]
+
+
+@dataclass(frozen=True)
+class Config:
+    """One point of a parameter grid."""
+
+    short_period: int = 20
+    long_period: int = 50
+    rsi_period: int = 14
+    threshold: float = 0.5
+
+
+def parameter_grid(
+    short_periods: Iterable[int],
+    long_periods: Iterable[int],
+    rsi_periods: Iterable[int],
+    thresholds: Iterable[float],
+) -> List[Config]:
+    """All combinations with a short window below the long window."""
+    return [
+        Config(short, long, rsi, float(threshold))
+        for short, long, rsi, threshold in itertools.product(
+            sorted(set(short_periods)), sorted(set(long_periods)), sorted(set(rsi_periods)), sorted(set(thresholds))
+        )
+        if 0 < short < long and rsi > 0 and threshold > 0
+    ]
+
+
+def chunked(configs: Sequence[Config], size: int) -> List[Sequence[Config]]:
+    """Split a grid into chunks of at most `size` configurations."""
+    return [configs[i:i + size] for i in range(0, len(configs), size)]
+
+
+def crossover_series(short_ma: np.ndarray, long_ma: np.ndarray, lookback: int = CROSSOVER_LOOKBACK) -> np.ndarray:
+    """
+    Crossover signal at every bar: +1/-1 for the earliest golden/death cross
+    among the last `lookback` MA values, 0 for none.
+    """
+    n = short_ma.shape[0]
+    up, down = signals.crossing_masks(short_ma - long_ma)
+    transitions = np.zeros(n, dtype=np.int8)
+    transitions[1:] = up.astype(np.int8) - down.astype(np.int8)
+    crossover = np.zeros(n, dtype=np.int8)
+    # Walk from the latest transition to the earliest so the earliest one wins
+    for offset in range(lookback - 1):
+        shifted = np.zeros(n, dtype=np.int8)
+        shifted[offset:] = transitions[:n - offset]
+        crossover = np.where(shifted != 0, shifted, crossover)
+    return crossover
+
+
+def evaluate(
+    closes: np.ndarray, strength: np.ndarray, threshold: float, cost_bps: float = 0.0, allow_short: bool = True
+) -> Dict[str, float]:
+    """
+    Trade a signal strength series and measure the result.
+
+    Args:
+        closes: Close prices.
+        strength: Signal strength at each bar.
+        threshold: Minimum absolute strength to hold a position.
+        cost_bps: Cost per unit of position change, in basis points.
+        allow_short: Go short on bearish signals instead of staying flat.
+
+    Returns:
+        Number of trades, share of profitable trades, compounded total
+        return, maximum drawdown of the equity curve and share of bars spent
+        in the market.
+    """
+    n = closes.shape[0]
+    returns = np.zeros(n)
+    returns[1:] = closes[1:] / closes[:-1] - 1.0
+    position = np.where(strength >= threshold, 1, np.where(strength <= -threshold, -1 if allow_short else 0, 0))
+    held = np.zeros(n, dtype=np.int8)
+    held[1:] = position[:-1]
+    changes = np.diff(held, prepend=np.int8(0))
+    pnl = held * returns - np.abs(changes) * cost_bps / 10_000
+
+    log_growth = np.log1p(pnl)
+    equity = np.exp(np.cumsum(log_growth))
+    drawdown = 1.0 - equity / np.maximum.accumulate(equity)
+
+    # A trade is a run of bars holding the same non-zero position
+    starts = np.flatnonzero(changes != 0)
+    trade_returns = np.array([])
+    if starts.size:
+        run_returns = np.expm1(np.add.reduceat(log_growth, starts))
+        trade_returns = run_returns[held[starts] != 0]
+
+    return {
+        "trades": int(trade_returns.size),
+        "hit_rate": float((trade_returns > 0).mean()) if trade_returns.size else float("nan"),
+        "total_return": float(equity[-1] - 1.0) if n else 0.0,
+        "max_drawdown": float(drawdown.max()) if n else 0.0,
+        "exposure": float((held != 0).mean()) if n else 0.0,
+    }
+
+
+def backtest_symbol(
+    closes: np.ndarray, configs: Sequence[Config], cost_bps: float = 0.0, allow_short: bool = True
+) -> List[Dict[str, Any]]:
+    """
+    Backtest every configuration on one close series.
+
+    Returns:
+        One dict per configuration with its parameters and METRICS.
+    """
+    closes = np.asarray(closes, dtype=np.float64)
+    moving_averages: Dict[int, np.ndarray] = {}
+    rsis: Dict[int, np.ndarray] = {}
+    crossovers: Dict[tuple, np.ndarray] = {}
+    results = []
+    for config in configs:
+        for window in (config.short_period, config.long_period):
+            if window not in moving_averages:
+                moving_averages[window] = rolling_mean(closes, window)
+        if config.rsi_period not in rsis:
+            rsis[config.rsi_period] = rsi_series(closes, config.rsi_period)
+        short_ma = moving_averages[config.short_period]
+        long_ma = moving_averages[config.long_period]
+        pair = (config.short_period, config.long_period)
+        if pair not in crossovers:
+            crossovers[pair] = crossover_series(short_ma, long_ma)
+        with np.errstate(invalid="ignore"):
+            direction = np.nan_to_num(np.sign(short_ma - long_ma), nan=0.0)
+        strength = scoring.signal_strength(direction, crossovers[pair], rsis[config.rsi_period])
+        results.append({**asdict(config), **evaluate(closes, strength, config.threshold, cost_bps, allow_short)})
+    return results
+
+
+def run(
+    histories: Mapping[str, np.ndarray],
+    configs: Sequence[Config],
+    cost_bps: float = 0.0,
+    allow_short: bool = True,
+    workers: Optional[int] = None,
+    chunk_size: int = 250,
+) -> pd.DataFrame:
+    """
+    Backtest a grid on several symbols, fanned out over a process pool.
+
+    Args:
+        histories: Close series keyed by symbol.
+        configs: The parameter grid.
+        cost_bps: Cost per unit of position change, in basis points.
+        allow_short: Go short on bearish signals instead of staying flat.
+        workers: Pool size (default: CPU count); 1 runs in this process.
+        chunk_size: Configurations per task.
+
+    Returns:
+        One row per (symbol, configuration).
+    """
+    tasks = [(symbol, chunk) for symbol in histories for chunk in chunked(configs, chunk_size)]
+    if workers == 1 or len(tasks) <= 1:
+        outputs = [backtest_symbol(histories[symbol], chunk, cost_bps, allow_short) for symbol, chunk in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=process_context()) as pool:
+            futures = [
+                pool.submit(backtest_symbol, histories[symbol], chunk, cost_bps, allow_short) for symbol, chunk in tasks
+            ]
+            outputs = [future.result() for future in futures]
+    return results_frame([symbol for symbol, _ in tasks], outputs)
+
+
+def results_frame(symbols: Sequence[str], outputs: Sequence[List[Dict[str, Any]]]) -> pd.DataFrame:
+    """Combine per-task results into one frame with a "symbol" column."""
+    rows = [{"symbol": symbol, **row} for symbol, output in zip(symbols, outputs) for row in output]
+    return pd.DataFrame(rows, columns=["symbol", *Config.__dataclass_fields__, *METRICS])
+
+
+def summarize(results: pd.DataFrame, top: Optional[int] = None) -> pd.DataFrame:
+    """
+    Aggregate per-symbol results by configuration, best mean return first.
+
+    Returns:
+        Per configuration: symbols tested, total trades, mean hit rate, mean
+        and worst total return, and worst drawdown.
+    """
+    summary = (
+        results.groupby(list(Config.__dataclass_fields__), as_index=False)
+        .agg(
+            symbols=("symbol", "nunique"),
+            trades=("trades", "sum"),
+            hit_rate=("hit_rate", "mean"),
+            mean_return=("total_return", "mean"),
+            worst_return=("total_return", "min"),
+            max_drawdown=("max_drawdown", "max"),
+        )
+        .sort_values("mean_return", ascending=False, kind="stable")
+    )
+    return summary.head(top) if top else summary
@@ -0,0 +1,218 @@
+# bars.py
+"""
+Helpers for working with intraday OHLCV bar frames.
+
+Bar frames are pandas DataFrames indexed by bar timestamp (ascending) with
+"open", "high", "low", "close" and "volume" columns. To keep the cache
+footprint small, prices are stored as float32 and volume as uint32 by
+default; the index is a DatetimeIndex, i.e. int64 epoch nanoseconds.
+float32 only holds about 7 significant digits, so frames whose prices it
+cannot represent at quote precision (e.g. above about $1,000) keep float64.
+"""
+
+import os
+from itertools import chain
+from operator import itemgetter
+from typing import Mapping, Sequence
+
+import numpy as np
+import pandas as pd
+
+PRICE_COLUMNS = ("open", "high", "low", "close")
+VOLUME_COLUMN = "volume"
+
+# Storage dtypes (e.g. STOCKANALYST_PRICE_DTYPE=float64 for full precision,
+# STOCKANALYST_VOLUME_DTYPE=uint64 for very large volumes)
+PRICE_DTYPE = np.dtype(os.getenv("STOCKANALYST_PRICE_DTYPE", "float32"))
+VOLUME_DTYPE = np.dtype(os.getenv("STOCKANALYST_VOLUME_DTYPE", "uint32"))
+
+# Intraday intervals supported by AlphaVantage, in minutes
+INTERVAL_MINUTES = {"1min": 1, "5min": 5, "15min": 15, "30min": 30, "60min": 60}
+
+# AlphaVantage quotes prices with 4 decimals; float32 values are rounded back
+# to that precision when reported (see `price_dtype_for`).
+PRICE_DECIMALS = 4
+
+# Field names of a bar in a TIME_SERIES_INTRADAY payload, in column order
+BAR_FIELD_NAMES = ("1. open", "2. high", "3. low", "4. close", "5. volume")
+BAR_FIELDS = itemgetter(*BAR_FIELD_NAMES)
+
+
+def frame_from_columns(
+    stamps: np.ndarray,
+    columns: Sequence[np.ndarray],
+    price_dtype: np.dtype = PRICE_DTYPE,
+    volume_dtype: np.dtype = VOLUME_DTYPE,
+) -> pd.DataFrame:
+    """
+    Build a compact bar frame from parsed column arrays.
+
+    Values are written into preallocated arrays of the storage dtypes, sorted
+    by timestamp only if they are not already in ascending order.
+
+    Args:
+        stamps: datetime64[ns] bar timestamps.
+        columns: open, high, low, close and volume arrays, aligned with `stamps`.
+        price_dtype: dtype of the price columns; float64 is used instead if it
+            would lose quote precision (see `price_dtype_for`).
+        volume_dtype: dtype of the volume column.
+
+    Returns:
+        The bars indexed by timestamp in ascending order.
+    """
+    n = stamps.shape[0]
+    price_dtype = price_dtype_for(columns[: len(PRICE_COLUMNS)], price_dtype)
+    order = None
+    if n > 1 and not (stamps[1:] > stamps[:-1]).all():
+        order = np.argsort(stamps, kind="stable")
+        stamps = stamps[order]
+
+    frame = {}
+    for name, values in zip(PRICE_COLUMNS + (VOLUME_COLUMN,), columns):
+        column = np.empty(n, dtype=volume_dtype if name == VOLUME_COLUMN else price_dtype)
+        column[:] = values if order is None else values[order]
+        frame[name] = column
+    return pd.DataFrame(frame, index=pd.DatetimeIndex(stamps), copy=False)
+
+
+def price_dtype_for(columns: Sequence[np.ndarray], dtype: np.dtype = PRICE_DTYPE) -> np.dtype:
+    """
+    Return `dtype` if it holds every price at quote precision, float64 otherwise.
+
+    A float32 price is exact to 4 decimals only up to about $1,000 (and to
+    cents up to about $100,000), so the values are round-tripped through
+    `dtype` and compared after rounding to `PRICE_DECIMALS`.
+    """
+    dtype = np.dtype(dtype)
+    if dtype.kind != "f" or dtype.itemsize >= 8:
+        return dtype
+    for values in columns:
+        values = np.asarray(values, dtype=np.float64)
+        stored = values.astype(dtype).astype(np.float64)
+        if not np.array_equal(np.round(stored, PRICE_DECIMALS), np.round(values, PRICE_DECIMALS), equal_nan=True):
+            return np.dtype(np.float64)
+    return dtype
+
+
+def frame_from_time_series(
+    time_series: Mapping[str, Mapping[str, str]],
+    price_dtype: np.dtype = PRICE_DTYPE,
+    volume_dtype: np.dtype = VOLUME_DTYPE,
+) -> pd.DataFrame:
+    """
+    Build a compact bar frame from a "Time Series (...)" mapping.
+
+    All values are parsed in one vectorized NumPy conversion and written into
+    preallocated column arrays, without intermediate per-column DataFrames.
+
+    Args:
+        time_series: Mapping of "YYYY-MM-DD HH:MM:SS" to bar fields, as
+            returned by the API (newest first).
+        price_dtype: dtype of the price columns.
+        volume_dtype: dtype of the volume column.
+
+    Returns:
+        The bars indexed by timestamp in ascending order.
+    """
+    n = len(time_series)
+    # The API lists bars newest first; reversing usually yields sorted bars.
+    stamps = np.array(list(reversed(time_series.keys())), dtype="datetime64[ns]")
+    values = np.array(
+        list(chain.from_iterable(map(BAR_FIELDS, reversed(time_series.values())))),
+        dtype=np.float64,
+    ).reshape(n, 5)
+    return frame_from_columns(stamps, values.T, price_dtype, volume_dtype)
+
+
+def resample_bars(df: pd.DataFrame, interval: str) -> pd.DataFrame:
+    """
+    Aggregate bars into a coarser interval (e.g. 1min into 15min).
+
+    Bars are bucketed by their timestamp floored to the interval (so hourly
+    bars start on the hour, like AlphaVantage's own), and each bucket is
+    reduced in one vectorized pass: first open, highest high, lowest low,
+    last close and summed volume. Buckets without bars are omitted.
+
+    Args:
+        df: Bars indexed by timestamp in ascending order.
+        interval: Target interval, one of INTERVAL_MINUTES.
+
+    Returns:
+        The resampled bars, labelled with the start of each bucket.
+    """
+    if interval not in INTERVAL_MINUTES:
+        raise ValueError(f"Unsupported interval: {interval}")
+    if df.empty:
+        return df.copy()
+    step = INTERVAL_MINUTES[interval] * 60 * 1_000_000_000
+    stamps = df.index.as_unit("ns").asi8
+    buckets = stamps - stamps % step
+    starts = np.flatnonzero(np.concatenate(([True], buckets[1:] != buckets[:-1])))
+    ends = np.append(starts[1:], stamps.shape[0]) - 1
+    volume = df[VOLUME_COLUMN].to_numpy()
+    return pd.DataFrame(
+        {
+            "open": df["open"].to_numpy()[starts],
+            "high": np.maximum.reduceat(df["high"].to_numpy(), starts),
+            "low": np.minimum.reduceat(df["low"].to_numpy(), starts),
+            "close": df["close"].to_numpy()[ends],
+            # Sum in 64 bits; a bucket may exceed the per-bar volume dtype
+            VOLUME_COLUMN: np.add.reduceat(volume.astype(np.promote_types(volume.dtype, np.uint64)), starts),
+        },
+        index=pd.DatetimeIndex(buckets[starts].astype("datetime64[ns]")),
+    )
+
+
+def price_value(value) -> float:
+    """Convert a stored price to a float rounded to quote precision."""
+    return round(float(value), PRICE_DECIMALS)
+
+
+def overlaps(history: pd.DataFrame, delta: pd.DataFrame) -> bool:
+    """
+    Check whether `delta` can be merged into `history` without leaving a gap.
+
+    A delta is mergeable when its oldest bar is not newer than the newest bar
+    already in the history, i.e. the two ranges touch or overlap.
+
+    Args:
+        history: Cached bars.
+        delta: Recently fetched bars.
+
+    Returns:
+        True if the delta connects to the end of the history.
+    """
+    if history.empty or delta.empty:
+        return False
+    return delta.index[0] <= history.index[-1]
+
+
+def merge_bars(history: pd.DataFrame, delta: pd.DataFrame) -> pd.DataFrame:
+    """
+    Append recently fetched bars to a cached history.
+
+    Bars present in both frames are taken from `delta`, since the most
+    recent bar may still have been forming when the history was fetched.
+    Neither input frame is modified.
+
+    Args:
+        history: Cached bars.
+        delta: Recently fetched bars.
+
+    Returns:
+        A new frame with the union of both, sorted by timestamp.
+    """
+    if history.empty:
+        return delta.copy()
+    if delta.empty:
+        return history.copy()
+    columns = list(delta.columns)
+    older = history.loc[history.index < delta.index[0], columns]
+    if not older.dtypes.equals(delta.dtypes):
+        # e.g. a history stored before the compact dtypes were configured
+        older = older.astype(delta.dtypes.to_dict())
+    merged = pd.concat([older, delta])
+    merged = merged[~merged.index.duplicated(keep="last")]
+    if not merged.index.is_monotonic_increasing:
+        merged = merged.sort_index()
+    return merged
@@ -0,0 +1,385 @@
+# cache.py
+"""
+Bounded, TTL-aware cache for intraday market data.
+
+Entries are kept in least-recently-used order and evicted once the combined
+memory footprint of the cached DataFrames exceeds a byte budget. Every entry
+expires according to a per-interval TTL measured from `MarketData.last_updated`.
+Expired entries are still served for a grace period while a background task
+refreshes them (stale-while-revalidate), so hot symbols never block on the
+AlphaVantage API.
+"""
+
+import asyncio
+import logging
+from collections import OrderedDict
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional, Set
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Set to True while a background refresh task is running its loader, so the
+# loader can tell interactive fetches apart from revalidation fetches.
+background_refresh: ContextVar[bool] = ContextVar("background_refresh", default=False)
+
+
+@dataclass
+class MarketData:
+    """
+    Dataclass to hold cached market data for a specific symbol and interval.
+
+    Attributes:
+        symbol: The stock ticker symbol (e.g., "IBM").
+        interval: The data interval (e.g., "1min", "5min").
+        data: A pandas DataFrame containing the time series data.
+        last_updated: The timestamp when the data was last fetched.
+        derived: Entries derived from this one (e.g. resampled bars) by
+            interval; they are counted in the cache budget and dropped with it.
+    """
+
+    symbol: str
+    interval: str
+    data: pd.DataFrame
+    last_updated: datetime
+    derived: Dict[str, "MarketData"] = field(default_factory=dict, repr=False, compare=False)
+
+
+@dataclass
+class CacheStats:
+    """
+    Counters describing cache effectiveness.
+
+    Attributes:
+        hits: Lookups served from a fresh entry.
+        stale_hits: Lookups served from an expired entry while it was revalidated.
+        misses: Lookups that had to wait for the loader.
+        coalesced: Misses and refreshes that joined a load already in flight for the key.
+        evictions: Entries dropped to stay within the byte budget.
+        refreshes: Background refreshes that completed successfully.
+        refresh_failures: Background refreshes that raised an exception.
+    """
+
+    hits: int = 0
+    stale_hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    evictions: int = 0
+    refreshes: int = 0
+    refresh_failures: int = 0
+
+
+# Loader signature: (symbol, interval, previous entry or None) -> fresh DataFrame
+Loader = Callable[[str, str, Optional[MarketData]], Awaitable[pd.DataFrame]]
+
+
+class MarketDataCache:
+    """
+    LRU cache of `MarketData` entries bounded by DataFrame memory usage.
+
+    Args:
+        max_bytes: Memory budget for all cached DataFrames combined.
+        ttls: Time-to-live in seconds per interval (e.g., {"1min": 60}).
+        default_ttl: TTL used for intervals missing from `ttls`.
+        stale_grace: How long past its TTL an entry may still be served while
+            a background refresh runs. Older entries are reloaded in the
+            foreground.
+        promote: Called with (symbol, interval) when a foreground caller joins
+            a load started in the background, so that the loader's queued
+            requests can be moved ahead.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        ttls: Mapping[str, float],
+        default_ttl: float = 60.0,
+        stale_grace: float = 900.0,
+        promote: Optional[Callable[[str, str], None]] = None,
+    ):
+        self.max_bytes = max_bytes
+        self.ttls = dict(ttls)
+        self.default_ttl = default_ttl
+        self.stale_grace = stale_grace
+        self.promote = promote
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[str, MarketData]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._total_bytes = 0
+        self._refresh_tasks: Dict[str, asyncio.Task] = {}
+        self._load_tasks: Dict[str, asyncio.Task] = {}
+        self._background_loads: Set[str] = set()
+
+    @staticmethod
+    def make_key(symbol: str, interval: str) -> str:
+        """Build the cache key for a symbol and interval, e.g. "IBM_1min"."""
+        return f"{symbol}_{interval}"
+
+    @staticmethod
+    def frame_bytes(df: pd.DataFrame) -> int:
+        """Memory used by a DataFrame, including its index."""
+        return int(df.memory_usage(index=True, deep=True).sum())
+
+    def ttl_for(self, interval: str) -> float:
+        """TTL in seconds for the given interval."""
+        return self.ttls.get(interval, self.default_ttl)
+
+    @staticmethod
+    def age(entry: MarketData) -> float:
+        """Seconds elapsed since the entry was last updated."""
+        return (datetime.now() - entry.last_updated).total_seconds()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def peek(self, symbol: str, interval: str) -> Optional[MarketData]:
+        """Return an entry without touching LRU order, TTLs or counters."""
+        return self._entries.get(self.make_key(symbol, interval))
+
+    def put(self, entry: MarketData) -> None:
+        """Insert or replace an entry, evicting least recently used ones if needed."""
+        key = self.make_key(entry.symbol, entry.interval)
+        self._discard(key)
+        size = self.frame_bytes(entry.data) + sum(self.frame_bytes(d.data) for d in entry.derived.values())
+        self._entries[key] = entry
+        self._sizes[key] = size
+        self._total_bytes += size
+        if size > self.max_bytes:
+            logger.warning(
+                "Cache entry %s (%d bytes) exceeds the cache budget of %d bytes.",
+                key, size, self.max_bytes,
+            )
+        self._evict()
+
+    def pop(self, symbol: str, interval: str) -> Optional[MarketData]:
+        """Remove and return an entry."""
+        key = self.make_key(symbol, interval)
+        entry = self._entries.get(key)
+        self._discard(key)
+        return entry
+
+    async def get_or_fetch(self, symbol: str, interval: str, loader: Loader) -> MarketData:
+        """
+        Return cached market data, loading or revalidating it as needed.
+
+        Fresh entries are returned directly. Entries within the stale grace
+        period are returned immediately and refreshed in the background.
+        Missing or too-old entries are loaded in the foreground; the previous
+        entry (if any) is handed to the loader so it can update incrementally.
+
+        Args:
+            symbol: The stock ticker symbol.
+            interval: The data interval.
+            loader: Coroutine function producing a fresh DataFrame.
+
+        Returns:
+            The cached or freshly loaded MarketData entry.
+        """
+        key = self.make_key(symbol, interval)
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = self.age(entry)
+            ttl = self.ttl_for(interval)
+            if age <= ttl:
+                self.stats.hits += 1
+                self._entries.move_to_end(key)
+                logger.debug("Cache hit for %s (age %.1fs).", key, age)
+                return entry
+            if age <= ttl + self.stale_grace:
+                self.stats.stale_hits += 1
+                self._entries.move_to_end(key)
+                logger.debug("Stale cache hit for %s (age %.1fs). Refreshing in background.", key, age)
+                self._schedule_refresh(key, entry, loader)
+                return entry
+
+        self.stats.misses += 1
+        if key not in self._load_tasks:
+            logger.info("Cache miss for %s. Fetching new data.", key)
+        # Shielded: one caller being cancelled must not cancel the others' load
+        return await asyncio.shield(self._start_load(key, symbol, interval, entry, loader))
+
+    async def refresh(self, symbol: str, interval: str, loader: Loader) -> MarketData:
+        """
+        Reload an entry in the foreground regardless of its age.
+
+        The current entry (if any) is handed to the loader so it can update
+        incrementally; a load already in flight for the entry is joined
+        instead. Used by callers that keep entries warm ahead of demand.
+        """
+        key = self.make_key(symbol, interval)
+        fresh = await asyncio.shield(self._start_load(key, symbol, interval, self._entries.get(key), loader))
+        self.stats.refreshes += 1
+        return fresh
+
+    def attach_derived(self, base: MarketData, interval: str, df: pd.DataFrame) -> MarketData:
+        """
+        Store a frame derived from `base` on it and return it as an entry.
+
+        The frame is counted in the byte budget of `base`, so it is evicted
+        together with it; a refreshed base starts without derived frames. If
+        `base` is no longer the cached entry the frame is returned unstored.
+        """
+        derived = MarketData(symbol=base.symbol, interval=interval, data=df, last_updated=base.last_updated)
+        key = self.make_key(base.symbol, base.interval)
+        if self._entries.get(key) is not base:
+            return derived
+        previous = base.derived.get(interval)
+        size = self.frame_bytes(df) - (self.frame_bytes(previous.data) if previous is not None else 0)
+        base.derived[interval] = derived
+        self._sizes[key] += size
+        self._total_bytes += size
+        self._evict()
+        return derived
+
+    def derived_entries(self) -> List[MarketData]:
+        """All derived entries stored on cached base entries."""
+        return [derived for entry in self._entries.values() for derived in entry.derived.values()]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Counters and occupancy figures suitable for JSON serialization."""
+        lookups = self.stats.hits + self.stats.stale_hits + self.stats.misses
+        return {
+            **asdict(self.stats),
+            "hit_ratio": (self.stats.hits + self.stats.stale_hits) / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "refreshing": len(self._refresh_tasks),
+            "loading": len(self._load_tasks),
+        }
+
+    async def aclose(self) -> None:
+        """Cancel pending background refreshes."""
+        tasks = list(self._refresh_tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._refresh_tasks.clear()
+
+    def _discard(self, key: str) -> None:
+        if key in self._entries:
+            del self._entries[key]
+            self._total_bytes -= self._sizes.pop(key)
+
+    def _evict(self) -> None:
+        # Never evict the most recently inserted entry, even if it alone is over budget.
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            key, _ = self._entries.popitem(last=False)
+            self._total_bytes -= self._sizes.pop(key)
+            self.stats.evictions += 1
+            logger.info("Evicted %s from market data cache.", key)
+
+    def _start_load(
+        self, key: str, symbol: str, interval: str, entry: Optional[MarketData], loader: Loader
+    ) -> asyncio.Task:
+        """Start a load for `key`, or return the one already in flight."""
+        task = self._load_tasks.get(key)
+        if task is not None:
+            self.stats.coalesced += 1
+            if key in self._background_loads and not background_refresh.get():
+                self._background_loads.discard(key)
+                if self.promote is not None:
+                    self.promote(symbol, interval)
+            return task
+        task = asyncio.get_running_loop().create_task(self._load(symbol, interval, entry, loader))
+        self._load_tasks[key] = task
+        if background_refresh.get():
+            self._background_loads.add(key)
+
+        def finish(_: asyncio.Task) -> None:
+            self._load_tasks.pop(key, None)
+            self._background_loads.discard(key)
+
+        task.add_done_callback(finish)
+        return task
+
+    async def _load(self, symbol: str, interval: str, entry: Optional[MarketData], loader: Loader) -> MarketData:
+        df = await loader(symbol, interval, entry)
+        fresh = MarketData(symbol=symbol, interval=interval, data=df, last_updated=datetime.now())
+        current = self._entries.get(self.make_key(symbol, interval))
+        if current is not None and current is not entry:
+            # A background refresh or a direct put stored newer data meanwhile
+            logger.debug("Discarding load of %s (%s): entry was replaced.", symbol, interval)
+            return current
+        self.put(fresh)
+        return fresh
+
+    def _schedule_refresh(self, key: str, entry: MarketData, loader: Loader) -> None:
+        if key in self._refresh_tasks:
+            return
+        task = asyncio.get_running_loop().create_task(self._refresh(entry, loader))
+        self._refresh_tasks[key] = task
+        task.add_done_callback(lambda _: self._refresh_tasks.pop(key, None))
+
+    async def _refresh(self, entry: MarketData, loader: Loader) -> None:
+        token = background_refresh.set(True)
+        try:
+            df = await loader(entry.symbol, entry.interval, entry)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.stats.refresh_failures += 1
+            logger.exception("Background refresh failed for %s (%s).", entry.symbol, entry.interval)
+            return
+        finally:
+            background_refresh.reset(token)
+        if self._entries.get(self.make_key(entry.symbol, entry.interval)) is not entry:
+            # A foreground refresh or a direct put stored newer data meanwhile
+            logger.debug("Discarding background refresh of %s (%s): entry was replaced.", entry.symbol, entry.interval)
+            return
+        self.put(MarketData(symbol=entry.symbol, interval=entry.interval, data=df, last_updated=datetime.now()))
+        self.stats.refreshes += 1
+        logger.info("Background refresh completed for %s (%s).", entry.symbol, entry.interval)
+
+
+class DerivedBarCache:
+    """
+    Bars derived from a cached base entry, e.g. 15min bars resampled from 1min.
+
+    Derived frames are stored on the base entry (see
+    `MarketDataCache.attach_derived`): they count towards the cache's byte
+    budget, are evicted with the base, and are recomputed once the base is
+    refreshed. The derived entries carry the base entry's `last_updated`, so
+    their age is the age of the underlying data.
+
+    Args:
+        cache: The cache holding the base entries.
+    """
+
+    def __init__(self, cache: MarketDataCache):
+        self.cache = cache
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, base: MarketData, interval: str) -> Optional[MarketData]:
+        """Return the derived entry for `base` if one was computed."""
+        found = base.derived.get(interval)
+        if found is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return found
+
+    def put(self, base: MarketData, interval: str, df: pd.DataFrame) -> MarketData:
+        """Store a frame derived from `base` and return it as an entry."""
+        return self.cache.attach_derived(base, interval, df)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Counters suitable for JSON serialization."""
+        derived = self.cache.derived_entries()
+        return {
+            "entries": len(derived),
+            "hits": self.hits,
+            "misses": self.misses,
+            "bytes": sum(MarketDataCache.frame_bytes(entry.data) for entry in derived),
+        }
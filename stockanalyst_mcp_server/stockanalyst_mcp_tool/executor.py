@@ -0,0 +1,272 @@
+# executor.py
+"""
+Executor for CPU-bound work such as indicator cold starts and panel scoring.
+
+Running NumPy/pandas passes over long histories directly in a tool handler
+blocks the event loop, stalling every other session on the same worker. The
+`ComputeExecutor` runs such functions in one of three modes:
+
+- "thread": a thread pool (NumPy releases the GIL for most array work).
+- "process": a process pool. Large array arguments are copied once into
+  shared memory instead of being pickled through the pool's pipe, and results
+  are pickled in the worker.
+- "inline": directly on the event loop (useful for debugging).
+
+A semaphore bounds the number of queued and running tasks; callers beyond
+that wait for a free slot (backpressure). A task keeps its slot, and its
+shared memory, until the pool has finished it, even if the caller is
+cancelled first. Queue wait and run latency are
+recorded per task name, and run latency is exported as the
+mcp_compute_duration_seconds metric.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import pickle
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, Deque, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from mcp_observability import COMPUTE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+MODES = ("inline", "thread", "process")
+
+
+class _SharedArray(NamedTuple):
+    """Handle of an array argument placed in shared memory."""
+
+    name: str
+    shape: Tuple[int, ...]
+    dtype: str
+
+
+def process_context() -> multiprocessing.context.BaseContext:
+    """
+    Start method for worker processes.
+
+    Forking a process that runs threads (uvicorn, anyio workers, the logging
+    listener, httpx pools) is unsafe, so forkserver is used where available
+    and spawn otherwise.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def _share(array: np.ndarray) -> Tuple[_SharedArray, SharedMemory]:
+    """Copy an array into a new shared memory segment."""
+    segment = SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=segment.buf)[...] = array
+    return _SharedArray(segment.name, array.shape, array.dtype.str), segment
+
+
+def _run_shared(fn: Callable[..., Any], args: Tuple[Any, ...]) -> bytes:
+    """Worker side: attach shared arrays, call `fn` and pickle its result."""
+    segments: List[SharedMemory] = []
+    resolved: List[Any] = []
+    try:
+        for arg in args:
+            if isinstance(arg, _SharedArray):
+                segment = SharedMemory(name=arg.name)
+                segments.append(segment)
+                resolved.append(np.ndarray(arg.shape, dtype=np.dtype(arg.dtype), buffer=segment.buf))
+            else:
+                resolved.append(arg)
+        # Pickle here so the result cannot keep views into the segments
+        return pickle.dumps(fn(*resolved), protocol=pickle.HIGHEST_PROTOCOL)
+    finally:
+        resolved.clear()
+        for segment in segments:
+            try:
+                segment.close()
+            except BufferError:
+                # A view is still referenced (e.g. by a traceback); the mapping
+                # is released when it is garbage collected.
+                pass
+
+
+def _release(segments: List[SharedMemory]) -> None:
+    for segment in segments:
+        segment.close()
+        segment.unlink()
+
+
+async def _unpickle(future: "asyncio.Future[bytes]") -> Any:
+    return pickle.loads(await future)
+
+
+class TaskStats:
+    """Latency counters for one task name."""
+
+    # Number of recent run latencies kept for percentiles
+    SAMPLES = 1024
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.errors = 0
+        self.total_wait = 0.0
+        self.total_run = 0.0
+        self.max_run = 0.0
+        self.recent: Deque[float] = deque(maxlen=self.SAMPLES)
+
+    def record(self, wait: float, run: float, failed: bool) -> None:
+        self.count += 1
+        self.errors += int(failed)
+        self.total_wait += wait
+        self.total_run += run
+        self.max_run = max(self.max_run, run)
+        self.recent.append(run)
+
+    def snapshot(self) -> Dict[str, Any]:
+        recent = np.asarray(self.recent) * 1000
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "mean_wait_ms": round(self.total_wait / self.count * 1000, 3) if self.count else 0.0,
+            "mean_ms": round(self.total_run / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(float(np.percentile(recent, 50)), 3) if recent.size else 0.0,
+            "p95_ms": round(float(np.percentile(recent, 95)), 3) if recent.size else 0.0,
+            "max_ms": round(self.max_run * 1000, 3),
+        }
+
+
+class ComputeExecutor:
+    """
+    Runs CPU-bound functions off the event loop with bounded concurrency.
+
+    Functions and arguments must be picklable in "process" mode, i.e.
+    module-level functions (or classmethods) and plain data.
+
+    Args:
+        mode: "thread", "process" or "inline".
+        max_workers: Pool size.
+        max_pending: Maximum number of queued and running tasks; defaults to
+            four per worker.
+        shared_memory_min_bytes: In "process" mode, NumPy array arguments at
+            least this large are transferred through shared memory.
+    """
+
+    def __init__(
+        self,
+        mode: str = "thread",
+        max_workers: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        shared_memory_min_bytes: int = 1024 * 1024,
+    ):
+        if mode not in MODES:
+            raise ValueError(f"Unknown executor mode {mode!r} (expected one of {', '.join(MODES)})")
+        self.mode = mode
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.max_pending = max_pending or self.max_workers * 4
+        self.shared_memory_min_bytes = shared_memory_min_bytes
+        self.shared_transfers = 0
+        self.waiting = 0
+        self.in_flight = 0
+        self.stats: Dict[str, TaskStats] = {}
+        self._pool: Optional[Executor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            if self.mode == "process":
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=process_context())
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="compute")
+        return self._pool
+
+    async def run(self, name: str, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run `fn(*args)` in the executor and return its result.
+
+        Args:
+            name: Task name under which latency is reported.
+            fn: The function to run.
+            *args: Positional arguments for `fn`.
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+        queued = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        started = time.perf_counter()
+        self.in_flight += 1
+        try:
+            future = self._dispatch(fn, args)
+        except BaseException:
+            self._finish(name, queued, started, None)
+            raise
+        if future.done():  # inline
+            self._finish(name, queued, started, future)
+            return future.result()
+        # The slot is released when the job is done, not when the caller stops waiting
+        future.add_done_callback(lambda done: self._finish(name, queued, started, done))
+        return await asyncio.shield(future)
+
+    def _finish(self, name: str, queued: float, started: float, future: Optional[asyncio.Future]) -> None:
+        self.in_flight -= 1
+        self._slots.release()
+        # Also marks the exception as retrieved when every caller was cancelled
+        failed = future is None or future.cancelled() or future.exception() is not None
+        elapsed = time.perf_counter() - started
+        self.stats.setdefault(name, TaskStats()).record(started - queued, elapsed, failed)
+        COMPUTE_SECONDS.labels(name).observe(elapsed)
+
+    def _dispatch(self, fn: Callable[..., Any], args: Tuple[Any, ...]) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        if self.mode == "inline":
+            future = loop.create_future()
+            try:
+                future.set_result(fn(*args))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        if self.mode == "thread":
+            return loop.run_in_executor(self._get_pool(), fn, *args)
+
+        segments: List[SharedMemory] = []
+        shared_args = []
+        try:
+            for arg in args:
+                if isinstance(arg, np.ndarray) and arg.nbytes >= self.shared_memory_min_bytes:
+                    handle, segment = _share(arg)
+                    segments.append(segment)
+                    shared_args.append(handle)
+                else:
+                    shared_args.append(arg)
+            if not segments:
+                return loop.run_in_executor(self._get_pool(), fn, *args)
+            pooled = loop.run_in_executor(self._get_pool(), _run_shared, fn, tuple(shared_args))
+        except BaseException:
+            _release(segments)
+            raise
+        self.shared_transfers += len(segments)
+        # Unlinked only once the worker is done with them
+        pooled.add_done_callback(lambda _: _release(segments))
+        return loop.create_task(_unpickle(pooled))
+
+    def shutdown(self) -> None:
+        """Stop the pool; queued tasks are cancelled."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Counters suitable for JSON serialization."""
+        return {
+            "mode": self.mode,
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "shared_memory_transfers": self.shared_transfers,
+            "tasks": {name: stats.snapshot() for name, stats in self.stats.items()},
+        }
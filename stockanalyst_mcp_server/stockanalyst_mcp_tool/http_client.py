@@ -0,0 +1,79 @@
+# http_client.py
+"""
+Process-wide HTTP client for AlphaVantage requests.
+
+A single `httpx.AsyncClient` is shared by every request so that connections
+(DNS, TCP and TLS setup) are pooled and kept alive between calls. The client
+is opened when the server starts and closed when it shuts down; if it is used
+outside that lifecycle (e.g. from a script) it is created lazily.
+
+Pool limits, timeouts and HTTP/2 can be configured through environment
+variables.
+"""
+
+import importlib.util
+import logging
+import os
+from typing import Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "MCP Server (github.com/modelcontextprotocol/python-sdk)"
+
+HTTP2 = os.getenv("ALPHAVANTAGE_HTTP2", "true").lower() in ("1", "true", "yes")
+MAX_CONNECTIONS = int(os.getenv("ALPHAVANTAGE_MAX_CONNECTIONS", "20"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("ALPHAVANTAGE_MAX_KEEPALIVE_CONNECTIONS", "10"))
+KEEPALIVE_EXPIRY = float(os.getenv("ALPHAVANTAGE_KEEPALIVE_EXPIRY", "60"))
+TIMEOUT = float(os.getenv("ALPHAVANTAGE_TIMEOUT", "30"))
+CONNECT_TIMEOUT = float(os.getenv("ALPHAVANTAGE_CONNECT_TIMEOUT", "10"))
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def create_client() -> httpx.AsyncClient:
+    """Build a new AsyncClient from the configured limits and timeouts."""
+    http2 = HTTP2
+    if http2 and importlib.util.find_spec("h2") is None:
+        logger.warning("HTTP/2 requested but the 'h2' package is not installed. Falling back to HTTP/1.1.")
+        http2 = False
+    return httpx.AsyncClient(
+        http2=http2,
+        follow_redirects=True,
+        headers={"User-Agent": USER_AGENT},
+        limits=httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(TIMEOUT, connect=CONNECT_TIMEOUT),
+    )
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared client, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_client()
+    return _client
+
+
+async def open_client() -> httpx.AsyncClient:
+    """Create the shared client at server startup."""
+    client = get_client()
+    logger.info(
+        "Opened shared HTTP client (max_connections=%d, max_keepalive_connections=%d).",
+        MAX_CONNECTIONS,
+        MAX_KEEPALIVE_CONNECTIONS,
+    )
+    return client
+
+
+async def close_client() -> None:
+    """Close the shared client and release its pooled connections."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        logger.info("Closed shared HTTP client.")
@@ -0,0 +1,428 @@
+# indicators.py
+"""
+Incremental technical indicator engine.
+
+Indicators are kept as running state per (symbol, interval, indicator,
+parameters). The first request for a key builds the state with a vectorized
+NumPy pass over the cached closes; subsequent requests only feed the bars that
+arrived since the last call, so each new bar costs O(1). The cached bar frames
+are only read, never modified.
+
+The latest bars a state has consumed are compared with the frame on every
+call: when a merge has rewritten any of them except the last one (which may
+simply have been a forming bar), the state is rebuilt.
+"""
+
+import math
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Hashable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Number of trailing indicator values kept for crossover checks
+DEFAULT_HISTORY = 5
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Simple moving average over a 1-D array using cumulative sums.
+
+    Args:
+        values: Input series.
+        window: Number of values per average.
+
+    Returns:
+        Array of the same length; the first `window - 1` entries are NaN.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(values.shape[0], np.nan)
+    if window <= 0 or values.shape[0] < window:
+        return out
+    csum = np.cumsum(np.concatenate(([0.0], values)))
+    out[window - 1:] = (csum[window:] - csum[:-window]) / window
+    return out
+
+
+def rsi_series(closes: np.ndarray, period: int) -> np.ndarray:
+    """
+    RSI (simple smoothing) at every bar of a 1-D close series.
+
+    Args:
+        closes: Close prices.
+        period: Number of price changes per average.
+
+    Returns:
+        Array of the same length; entries before the first full window are NaN.
+    """
+    closes = np.asarray(closes, dtype=np.float64)
+    out = np.full(closes.shape[0], np.nan)
+    if closes.shape[0] < 2:
+        return out
+    delta = np.diff(closes)
+    avg_gain = rolling_mean(np.where(delta > 0, delta, 0.0), period)
+    avg_loss = rolling_mean(np.where(delta < 0, -delta, 0.0), period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out[1:] = np.where(
+            avg_loss == 0,
+            np.where(avg_gain == 0, 50.0, 100.0),
+            100.0 - 100.0 / (1.0 + avg_gain / avg_loss),
+        )
+    # Keep incomplete windows undefined
+    out[1:][np.isnan(avg_gain)] = np.nan
+    return out
+
+
+def rsi_from_averages(avg_gain: float, avg_loss: float) -> float:
+    """RSI from average gain and loss; 100 when there were no losses."""
+    if math.isnan(avg_gain) or math.isnan(avg_loss):
+        return math.nan
+    if avg_loss == 0:
+        return 50.0 if avg_gain == 0 else 100.0
+    return 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+
+
+class RollingMean:
+    """
+    Simple moving average with O(1) updates.
+
+    Attributes:
+        window: Number of values per average.
+        recent: The last few average values, oldest first (NaN until the
+            window is filled).
+    """
+
+    # Re-sum the buffer periodically to avoid floating point drift.
+    _RESYNC_EVERY = 1024
+
+    def __init__(self, window: int, history: int = DEFAULT_HISTORY):
+        self.window = window
+        self.recent: Deque[float] = deque(maxlen=history)
+        self._buffer: Deque[float] = deque(maxlen=window)
+        self._sum = 0.0
+        self._updates = 0
+
+    @classmethod
+    def from_values(cls, values: np.ndarray, window: int, history: int = DEFAULT_HISTORY) -> "RollingMean":
+        """Build the state from a full series in one vectorized pass."""
+        state = cls(window, history)
+        means = rolling_mean(values, window)
+        state.recent.extend(means[-history:].tolist())
+        tail = np.asarray(values[-window:], dtype=np.float64)
+        state._buffer.extend(tail.tolist())
+        state._sum = math.fsum(state._buffer)
+        return state
+
+    @property
+    def value(self) -> float:
+        return self.recent[-1] if self.recent else math.nan
+
+    def update(self, value: float) -> float:
+        """Add a new value and return the updated average."""
+        if len(self._buffer) == self.window:
+            self._sum -= self._buffer[0]
+        self._buffer.append(value)
+        self._sum += value
+        self._updates += 1
+        if self._updates % self._RESYNC_EVERY == 0:
+            self._sum = math.fsum(self._buffer)
+        mean = self._sum / self.window if len(self._buffer) == self.window else math.nan
+        self.recent.append(mean)
+        return mean
+
+    def revise(self, value: float) -> bool:
+        """
+        Replace the most recent value (e.g. a bar that was still forming).
+
+        Returns:
+            False if there is no value to replace.
+        """
+        if not self._buffer:
+            return False
+        self._sum += value - self._buffer[-1]
+        self._buffer[-1] = value
+        self.recent[-1] = self._sum / self.window if len(self._buffer) == self.window else math.nan
+        return True
+
+
+class RollingRSI:
+    """
+    Relative Strength Index with O(1) updates.
+
+    With "simple" smoothing the average gain and loss are plain means over the
+    last `period` price changes. With "wilder" smoothing they use Wilder's
+    recursive moving average.
+
+    Attributes:
+        period: Number of price changes per average.
+        smoothing: "simple" or "wilder".
+        recent: The last few RSI values, oldest first.
+    """
+
+    def __init__(self, period: int, smoothing: str = "simple", history: int = DEFAULT_HISTORY):
+        if smoothing not in ("simple", "wilder"):
+            raise ValueError(f"Unknown RSI smoothing: {smoothing}")
+        self.period = period
+        self.smoothing = smoothing
+        self.recent: Deque[float] = deque(maxlen=history)
+        self._gains = RollingMean(period, history=1)
+        self._losses = RollingMean(period, history=1)
+        self._avg_gain = math.nan
+        self._avg_loss = math.nan
+        self._prev_avg: Tuple[float, float] = (math.nan, math.nan)
+        self._changes = 0
+        self._last_close = math.nan
+        self._prev_close = math.nan
+
+    @classmethod
+    def from_values(
+        cls, closes: np.ndarray, period: int, smoothing: str = "simple", history: int = DEFAULT_HISTORY
+    ) -> "RollingRSI":
+        """Build the state from a full close series."""
+        state = cls(period, smoothing, history)
+        closes = np.asarray(closes, dtype=np.float64)
+        if closes.shape[0] < 2:
+            for close in closes.tolist():
+                state.update(close)
+            return state
+        delta = np.diff(closes)
+        gains = np.where(delta > 0, delta, 0.0)
+        losses = np.where(delta < 0, -delta, 0.0)
+        state._last_close = float(closes[-1])
+        state._prev_close = float(closes[-2])
+        state._changes = delta.shape[0]
+        state._gains = RollingMean.from_values(gains, period, history=1)
+        state._losses = RollingMean.from_values(losses, period, history=1)
+        if smoothing == "simple":
+            avg_gain = rolling_mean(gains[-(period + history):], period)[-history:]
+            avg_loss = rolling_mean(losses[-(period + history):], period)[-history:]
+            if delta.shape[0] < period + history:
+                # Too few changes for the trimmed windows; use the full series.
+                avg_gain = rolling_mean(gains, period)[-history:]
+                avg_loss = rolling_mean(losses, period)[-history:]
+            values = [rsi_from_averages(gain, loss) for gain, loss in zip(avg_gain.tolist(), avg_loss.tolist())]
+        else:
+            # Wilder smoothing is recursive: seed with the simple average of the
+            # first `period` changes, then smooth one change at a time.
+            values = [math.nan] * min(period - 1, delta.shape[0])
+            if delta.shape[0] >= period:
+                avg_gain = float(gains[:period].mean())
+                avg_loss = float(losses[:period].mean())
+                values.append(rsi_from_averages(avg_gain, avg_loss))
+                for gain, loss in zip(gains[period:].tolist(), losses[period:].tolist()):
+                    state._prev_avg = (avg_gain, avg_loss)
+                    avg_gain = (avg_gain * (period - 1) + gain) / period
+                    avg_loss = (avg_loss * (period - 1) + loss) / period
+                    values.append(rsi_from_averages(avg_gain, avg_loss))
+                state._avg_gain, state._avg_loss = avg_gain, avg_loss
+        # The first bar has no price change, hence no RSI.
+        if len(values) < history:
+            values = [math.nan] + values
+        state.recent.extend(values[-history:])
+        return state
+
+    @property
+    def value(self) -> float:
+        return self.recent[-1] if self.recent else math.nan
+
+    def update(self, close: float) -> float:
+        """Add a new close and return the updated RSI."""
+        if math.isnan(self._last_close):
+            self._last_close = close
+            self.recent.append(math.nan)
+            return math.nan
+        self._prev_close, self._last_close = self._last_close, close
+        rsi = self._apply_change(close - self._prev_close)
+        self.recent.append(rsi)
+        return rsi
+
+    def revise(self, close: float) -> bool:
+        """
+        Replace the most recent close (e.g. a bar that was still forming).
+
+        Returns:
+            False if the state cannot be revised and must be rebuilt.
+        """
+        if math.isnan(self._prev_close):
+            self._last_close = close
+            return True
+        change = close - self._prev_close
+        gain, loss = max(change, 0.0), max(-change, 0.0)
+        if self.smoothing == "simple":
+            if not (self._gains.revise(gain) and self._losses.revise(loss)):
+                return False
+            avg_gain, avg_loss = self._gains.value, self._losses.value
+        else:
+            prev_gain, prev_loss = self._prev_avg
+            if math.isnan(prev_gain):
+                # The last change is still part of the seed average.
+                return False
+            avg_gain = (prev_gain * (self.period - 1) + gain) / self.period
+            avg_loss = (prev_loss * (self.period - 1) + loss) / self.period
+            self._avg_gain, self._avg_loss = avg_gain, avg_loss
+        self._last_close = close
+        self.recent[-1] = rsi_from_averages(avg_gain, avg_loss)
+        return True
+
+    def _apply_change(self, change: float) -> float:
+        gain, loss = max(change, 0.0), max(-change, 0.0)
+        self._changes += 1
+        if self.smoothing == "simple":
+            return rsi_from_averages(self._gains.update(gain), self._losses.update(loss))
+        # Wilder: collect the first `period` changes for the seed average.
+        if self._changes <= self.period:
+            self._gains.update(gain)
+            self._losses.update(loss)
+            if self._changes < self.period:
+                return math.nan
+            self._avg_gain, self._avg_loss = self._gains.value, self._losses.value
+            return rsi_from_averages(self._avg_gain, self._avg_loss)
+        self._prev_avg = (self._avg_gain, self._avg_loss)
+        self._avg_gain = (self._avg_gain * (self.period - 1) + gain) / self.period
+        self._avg_loss = (self._avg_loss * (self.period - 1) + loss) / self.period
+        return rsi_from_averages(self._avg_gain, self._avg_loss)
+
+
+class _Tracked:
+    """Indicator state plus the latest bars (timestamps and closes) it has consumed."""
+
+    __slots__ = ("state", "timestamps", "closes")
+
+    def __init__(self, state, timestamps: np.ndarray, closes: np.ndarray):
+        self.state = state
+        self.timestamps = timestamps
+        self.closes = closes
+
+
+class IndicatorEngine:
+    """
+    Registry of running indicator states.
+
+    Args:
+        max_states: Maximum number of states kept; least recently used ones
+            are dropped and rebuilt on demand.
+        max_incremental: Largest number of new bars applied one by one; longer
+            gaps are handled by rebuilding the state in one vectorized pass.
+        history: Number of trailing indicator values kept per state.
+        verify_bars: Number of consumed bars compared with the frame on each
+            call to detect rewritten history (a compact merge replaces at
+            most the latest 100 bars).
+    """
+
+    def __init__(
+        self,
+        max_states: int = 4096,
+        max_incremental: int = 1000,
+        history: int = DEFAULT_HISTORY,
+        verify_bars: int = 100,
+    ):
+        self.max_states = max_states
+        self.max_incremental = max_incremental
+        self.history = history
+        self.verify_bars = max(1, verify_bars)
+        self.rebuilds = 0
+        self.cold_starts = 0
+        self.incremental_updates = 0
+        self._states: "OrderedDict[Hashable, _Tracked]" = OrderedDict()
+
+    def sma(self, symbol: str, interval: str, bars: pd.DataFrame, window: int) -> RollingMean:
+        """Simple moving average of closes, brought up to date with `bars`."""
+        return self._advance(
+            self.sma_key(symbol, interval, window),
+            bars,
+            lambda closes: RollingMean.from_values(closes, window, self.history),
+        )
+
+    def rsi(self, symbol: str, interval: str, bars: pd.DataFrame, period: int, smoothing: str = "simple") -> RollingRSI:
+        """RSI of closes, brought up to date with `bars`."""
+        return self._advance(
+            self.rsi_key(symbol, interval, period, smoothing),
+            bars,
+            lambda closes: RollingRSI.from_values(closes, period, smoothing, self.history),
+        )
+
+    @staticmethod
+    def sma_key(symbol: str, interval: str, window: int) -> Hashable:
+        return (symbol, interval, "sma", window)
+
+    @staticmethod
+    def rsi_key(symbol: str, interval: str, period: int, smoothing: str = "simple") -> Hashable:
+        return (symbol, interval, "rsi", period, smoothing)
+
+    def advance(self, key: Hashable, bars: pd.DataFrame):
+        """
+        Bring an existing state up to date with `bars` without rebuilding it.
+
+        Together with `seed` this lets callers build cold states elsewhere,
+        e.g. in a worker pool, with `RollingMean.from_values` or
+        `RollingRSI.from_values` over the full close series.
+
+        Returns:
+            The state, or None if it has to be (re)built from the full series,
+            e.g. because bars it has already consumed were rewritten.
+        """
+        if len(bars.index) == 0:
+            raise ValueError("No bars available to compute indicators")
+        tracked = self._states.get(key)
+        if tracked is None:
+            return None
+        index = bars.index
+        closes = bars["close"].to_numpy(dtype=np.float64)
+        last_ts = tracked.timestamps[-1]
+        pos = index.searchsorted(last_ts)
+        if pos >= len(index) or index[pos] != last_ts or len(index) - pos - 1 > self.max_incremental:
+            return None
+        # Bars consumed before the last one must be unchanged
+        start = pos + 1 - len(tracked.closes)
+        if start < 0 or not (
+            np.array_equal(index[start:pos + 1].to_numpy(), tracked.timestamps)
+            and np.array_equal(closes[start:pos], tracked.closes[:-1])
+        ):
+            self.rebuilds += 1
+            return None
+        revised = float(closes[pos])
+        if revised != tracked.closes[-1] and not tracked.state.revise(revised):
+            return None
+        new_values = closes[pos + 1:].tolist()
+        for value in new_values:
+            tracked.state.update(value)
+        if new_values:
+            self.incremental_updates += 1
+        self._track(tracked, index, closes)
+        self._states.move_to_end(key)
+        return tracked.state
+
+    def seed(self, key: Hashable, bars: pd.DataFrame, state):
+        """Register a state built from the full close series of `bars`."""
+        tracked = _Tracked(state, np.empty(0), np.empty(0))
+        self._track(tracked, bars.index, bars["close"].to_numpy(dtype=np.float64))
+        self._states[key] = tracked
+        self._states.move_to_end(key)
+        self.cold_starts += 1
+        while len(self._states) > self.max_states:
+            self._states.popitem(last=False)
+        return state
+
+    def discard(self, symbol: str, interval: Optional[str] = None) -> None:
+        """Drop all states for a symbol (and optionally a single interval)."""
+        for key in [k for k in self._states if k[0] == symbol and (interval is None or k[1] == interval)]:
+            del self._states[key]
+
+    def snapshot(self) -> Dict[str, int]:
+        """Counters suitable for JSON serialization."""
+        return {
+            "states": len(self._states),
+            "cold_starts": self.cold_starts,
+            "incremental_updates": self.incremental_updates,
+            "rebuilds": self.rebuilds,
+        }
+
+    def _track(self, tracked: _Tracked, index: pd.Index, closes: np.ndarray) -> None:
+        tracked.timestamps = index[-self.verify_bars:].to_numpy()
+        tracked.closes = closes[-self.verify_bars:].copy()
+
+    def _advance(self, key: Hashable, bars: pd.DataFrame, build):
+        state = self.advance(key, bars)
+        if state is None:
+            state = self.seed(key, bars, build(bars["close"].to_numpy(dtype=np.float64)))
+        return state
@@ -0,0 +1,115 @@
+# panel.py
+"""
+Vectorized indicator computation over many symbols at once.
+
+Close prices of several symbols are right-aligned into a 2-D array (one row
+per symbol, most recent bar in the last column) so that moving averages,
+crossovers, RSI and the recommendation score are computed for every symbol in
+a single NumPy pass. Only as many trailing bars as the longest indicator
+window needs are included.
+"""
+
+from typing import Dict, List, Mapping, Tuple
+
+import numpy as np
+import pandas as pd
+
+from . import scoring, signals
+
+# Number of trailing bars checked for a moving average crossover
+CROSSOVER_LOOKBACK = 5
+
+
+def align_closes(frames: Mapping[str, pd.DataFrame], length: int) -> Tuple[List[str], np.ndarray]:
+    """
+    Stack the last `length` closes of each frame into a right-aligned panel.
+
+    Args:
+        frames: Bar frames keyed by symbol.
+        length: Number of trailing bars per symbol.
+
+    Returns:
+        The symbols (row order) and a (symbols, length) float64 array, NaN
+        padded on the left for symbols with shorter histories.
+    """
+    symbols = list(frames)
+    panel = np.full((len(symbols), length), np.nan)
+    for row, symbol in enumerate(symbols):
+        closes = frames[symbol]["close"].to_numpy(dtype=np.float64)[-length:]
+        if closes.shape[0]:
+            panel[row, -closes.shape[0]:] = closes
+    return symbols, panel
+
+
+def rolling_mean_rows(panel: np.ndarray, window: int) -> np.ndarray:
+    """Row-wise simple moving average; NaN where the window is incomplete."""
+    out = np.full(panel.shape, np.nan)
+    if panel.shape[1] < window:
+        return out
+    pad = np.zeros((panel.shape[0], 1))
+    valid = ~np.isnan(panel)
+    csum = np.cumsum(np.concatenate([pad, np.where(valid, panel, 0.0)], axis=1), axis=1)
+    count = np.cumsum(np.concatenate([pad, valid], axis=1), axis=1)
+    full = (count[:, window:] - count[:, :-window]) == window
+    out[:, window - 1:] = np.where(full, (csum[:, window:] - csum[:, :-window]) / window, np.nan)
+    return out
+
+
+def panel_signals(
+    panel: np.ndarray, short_period: int = 20, long_period: int = 50, rsi_period: int = 14
+) -> Dict[str, np.ndarray]:
+    """
+    Compute the `analyze_stock` signals for every row of a close panel.
+
+    Args:
+        panel: Right-aligned closes as returned by `align_closes`.
+        short_period: Short moving average window.
+        long_period: Long moving average window.
+        rsi_period: RSI window.
+
+    Returns:
+        Arrays (one value per row) for "current_price", "short_ma", "long_ma",
+        "ma_direction" (+1/-1/0), "crossover" (+1 golden, -1 death, 0 none),
+        "rsi" and "signal_strength".
+    """
+    short_ma = rolling_mean_rows(panel, short_period)
+    long_ma = rolling_mean_rows(panel, long_period)
+    diff = short_ma[:, -CROSSOVER_LOOKBACK:] - long_ma[:, -CROSSOVER_LOOKBACK:]
+
+    # Same rules as the scalar check: the first crossover within the lookback wins.
+    golden, death = signals.crossing_masks(diff)
+    events = golden | death
+    first = np.argmax(events, axis=1)
+    rows = np.arange(panel.shape[0])
+    crossover = np.where(events.any(axis=1), np.where(golden[rows, first], 1, -1), 0)
+
+    delta = np.diff(panel[:, -(rsi_period + 1):], axis=1)
+    avg_gain = np.where(delta > 0, delta, 0.0).mean(axis=1)
+    avg_loss = np.where(delta < 0, -delta, 0.0).mean(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = np.where(
+            avg_loss == 0,
+            np.where(avg_gain == 0, 50.0, 100.0),
+            100.0 - 100.0 / (1.0 + avg_gain / avg_loss),
+        )
+    # Rows with too little history have NaN deltas; keep their RSI undefined.
+    rsi = np.where(np.isnan(delta).any(axis=1) | (delta.shape[1] < rsi_period), np.nan, rsi)
+
+    with np.errstate(invalid="ignore"):
+        ma_direction = np.sign(short_ma[:, -1] - long_ma[:, -1])
+    ma_direction = np.nan_to_num(ma_direction, nan=0.0)
+
+    return {
+        "current_price": panel[:, -1],
+        "short_ma": short_ma[:, -1],
+        "long_ma": long_ma[:, -1],
+        "ma_direction": ma_direction,
+        "crossover": crossover,
+        "rsi": rsi,
+        "signal_strength": scoring.signal_strength(ma_direction, crossover, rsi),
+    }
+
+
+def panel_length(short_period: int, long_period: int, rsi_period: int) -> int:
+    """Number of trailing bars needed by `panel_signals`."""
+    return max(short_period, long_period, rsi_period + 1) + CROSSOVER_LOOKBACK - 1
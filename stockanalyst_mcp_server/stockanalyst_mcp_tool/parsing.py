@@ -0,0 +1,174 @@
+# parsing.py
+"""
+Decoding of AlphaVantage TIME_SERIES_INTRADAY payloads into bar frames.
+
+Three decoders are supported, fastest first:
+
+- "msgspec": decodes the payload against a typed schema, so the bar values
+  are converted from strings to numbers while parsing and copied straight
+  into column arrays.
+- "orjson": fast generic decoding followed by `bars.frame_from_time_series`.
+- "json": the standard library, always available.
+
+msgspec and orjson are optional dependencies (`pip install ".[fast-json]"`).
+The decoder is chosen with STOCKANALYST_JSON_DECODER ("auto" picks the
+fastest one installed). Payloads larger than STOCKANALYST_PARSE_THREAD_MIN_KB
+are decoded in a worker thread so the event loop keeps serving other
+sessions meanwhile.
+"""
+
+import json
+import logging
+import os
+from functools import lru_cache
+from operator import attrgetter
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import anyio
+import numpy as np
+import pandas as pd
+from mcp_observability import PARSE_SECONDS, timed
+
+from . import bars
+
+try:
+    import msgspec
+except ImportError:  # optional dependency
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+DECODERS = ("msgspec", "orjson", "json")
+
+JSON_DECODER = os.getenv("STOCKANALYST_JSON_DECODER", "auto").lower()
+PARSE_THREAD_MIN_BYTES = int(float(os.getenv("STOCKANALYST_PARSE_THREAD_MIN_KB", "256")) * 1024)
+
+
+class IntradayPayload(NamedTuple):
+    """A decoded intraday response."""
+
+    # Top-level fields other than the time series ("Meta Data", "Error Message", "Note", ...)
+    data: Dict[str, Any]
+    # The bars, or None if the payload carries no time series
+    bars: Optional[pd.DataFrame]
+
+
+def available_decoders() -> List[str]:
+    """Decoders that can be used in this environment, fastest first."""
+    installed = {"msgspec": msgspec is not None, "orjson": orjson is not None, "json": True}
+    return [name for name in DECODERS if installed[name]]
+
+
+def resolve_decoder(name: str) -> str:
+    """Map a configured decoder name (or "auto") to an available decoder."""
+    available = available_decoders()
+    if name == "auto":
+        return available[0]
+    if name not in DECODERS:
+        raise ValueError(f"Unknown JSON decoder {name!r} (expected one of {', '.join(DECODERS)} or auto)")
+    if name not in available:
+        logger.warning("JSON decoder %r is not installed. Falling back to %r.", name, available[0])
+        return available[0]
+    return name
+
+
+default_decoder = resolve_decoder(JSON_DECODER)
+
+
+if msgspec is not None:
+
+    class _Bar(msgspec.Struct):
+        open: float = msgspec.field(name="1. open")
+        high: float = msgspec.field(name="2. high")
+        low: float = msgspec.field(name="3. low")
+        close: float = msgspec.field(name="4. close")
+        volume: float = msgspec.field(name="5. volume")
+
+    _BAR_ATTRIBUTES = [attrgetter(name) for name in ("open", "high", "low", "close", "volume")]
+    _generic_decoder = msgspec.json.Decoder()
+
+    @lru_cache(maxsize=None)
+    def _typed_decoder(time_series_key: str):
+        """Decoder for an intraday payload whose series is under `time_series_key`."""
+        payload_type = msgspec.defstruct(
+            "IntradayResponse",
+            [
+                ("meta", Optional[Dict[str, Any]], msgspec.field(default=None, name="Meta Data")),
+                ("series", Optional[Dict[str, _Bar]], msgspec.field(default=None, name=time_series_key)),
+                ("error", Optional[str], msgspec.field(default=None, name="Error Message")),
+                ("note", Optional[str], msgspec.field(default=None, name="Note")),
+                ("information", Optional[str], msgspec.field(default=None, name="Information")),
+            ],
+        )
+        # strict=False lets msgspec convert the quoted numbers while decoding
+        return msgspec.json.Decoder(payload_type, strict=False)
+
+
+def _decode_msgspec(body: bytes, time_series_key: str) -> IntradayPayload:
+    try:
+        payload = _typed_decoder(time_series_key).decode(body)
+    except msgspec.ValidationError:
+        # Unexpected shape (e.g. an error payload); let the generic path report it.
+        logger.debug("Typed decoding failed, falling back to generic decoding", exc_info=True)
+        return _decode_generic(_generic_decoder.decode(body), time_series_key)
+    except msgspec.DecodeError as e:
+        raise ValueError(f"Invalid JSON in AlphaVantage response: {e}") from e
+
+    if payload.series is None:
+        # Error and throttle responses are small; keep every field for logging.
+        return IntradayPayload(_generic_decoder.decode(body), None)
+
+    series = payload.series
+    n = len(series)
+    # The API lists bars newest first; reversing usually yields sorted bars.
+    stamps = np.array(list(reversed(series.keys())), dtype="datetime64[ns]")
+    values = list(reversed(series.values()))
+    columns = [np.fromiter(map(getter, values), dtype=np.float64, count=n) for getter in _BAR_ATTRIBUTES]
+    data = {"Meta Data": payload.meta} if payload.meta is not None else {}
+    return IntradayPayload(data, bars.frame_from_columns(stamps, columns))
+
+
+def _decode_generic(data: Any, time_series_key: str) -> IntradayPayload:
+    if not isinstance(data, dict):
+        raise ValueError(f"Unexpected AlphaVantage response: {data!r}")
+    series = data.pop(time_series_key, None)
+    if series is None:
+        return IntradayPayload(data, None)
+    return IntradayPayload(data, bars.frame_from_time_series(series))
+
+
+def decode_intraday(body: bytes, interval: str, decoder: Optional[str] = None) -> IntradayPayload:
+    """
+    Decode an intraday response body.
+
+    Args:
+        body: Raw response body.
+        interval: The requested interval, used to locate the time series.
+        decoder: Decoder to use; defaults to the configured one.
+
+    Returns:
+        The payload's top-level fields and its bars.
+
+    Raises:
+        ValueError: If the body is not valid JSON.
+    """
+    time_series_key = f"Time Series ({interval})"
+    decoder = default_decoder if decoder is None else resolve_decoder(decoder)
+    with timed(PARSE_SECONDS, "intraday"):
+        if decoder == "msgspec":
+            return _decode_msgspec(body, time_series_key)
+        if decoder == "orjson":
+            return _decode_generic(orjson.loads(body), time_series_key)
+        return _decode_generic(json.loads(body), time_series_key)
+
+
+async def parse_intraday(body: bytes, interval: str, decoder: Optional[str] = None) -> IntradayPayload:
+    """Decode an intraday response, off the event loop if the body is large."""
+    if len(body) < PARSE_THREAD_MIN_BYTES:
+        return decode_intraday(body, interval, decoder)
+    return await anyio.to_thread.run_sync(decode_intraday, body, interval, decoder)
@@ -0,0 +1,67 @@
+# scoring.py
+"""
+Signal scoring rules shared by single-symbol, batch and historical analysis.
+
+All functions accept either scalars or NumPy arrays so the same rules can be
+applied to one symbol, a panel of symbols or a full history at once.
+"""
+
+import numpy as np
+
+# Contribution of each signal to the overall strength (max 4.5 in either direction)
+MA_WEIGHT = 1.0
+CROSSOVER_WEIGHT = 2.0
+RSI_WEIGHT = 1.5
+
+RSI_OVERSOLD = 30.0
+RSI_OVERBOUGHT = 70.0
+
+MAX_SIGNAL_STRENGTH = MA_WEIGHT + CROSSOVER_WEIGHT + RSI_WEIGHT
+
+# Recommendation labels indexed by `recommendation_code(...) + 2`
+RECOMMENDATIONS = ("STRONG SELL", "SELL", "HOLD", "BUY", "STRONG BUY")
+# Risk labels indexed by `risk_code(...)`
+RISK_LEVELS = ("LOW", "MEDIUM", "HIGH")
+
+
+def signal_strength(ma_direction, crossover, rsi):
+    """
+    Combine indicator signals into a signed strength score.
+
+    Args:
+        ma_direction: +1 if the short MA is above the long MA, -1 if below, 0 otherwise.
+        crossover: +1 for a recent golden cross, -1 for a death cross, 0 for none.
+        rsi: Latest RSI value (NaN counts as neutral).
+
+    Returns:
+        Positive values are bullish, negative values bearish.
+    """
+    rsi = np.asarray(rsi, dtype=np.float64)
+    rsi_score = np.where(rsi < RSI_OVERSOLD, RSI_WEIGHT, np.where(rsi > RSI_OVERBOUGHT, -RSI_WEIGHT, 0.0))
+    return MA_WEIGHT * np.sign(ma_direction) + CROSSOVER_WEIGHT * np.sign(crossover) + rsi_score
+
+
+def recommendation_code(strength):
+    """Map strength to -2 (strong sell) ... +2 (strong buy)."""
+    strength = np.asarray(strength, dtype=np.float64)
+    return np.select(
+        [strength >= 2, strength > 0, strength <= -2, strength < 0],
+        [2, 1, -2, -1],
+        default=0,
+    )
+
+
+def recommendation(strength: float) -> str:
+    """Recommendation label for a single strength value."""
+    return RECOMMENDATIONS[int(recommendation_code(strength)) + 2]
+
+
+def risk_code(strength):
+    """Map strength to 0 (low), 1 (medium) or 2 (high) risk."""
+    magnitude = np.abs(np.asarray(strength, dtype=np.float64))
+    return np.select([magnitude > 3, magnitude < 1], [0, 2], default=1)
+
+
+def risk_level(strength: float) -> str:
+    """Risk label for a single strength value; strong signals carry less risk."""
+    return RISK_LEVELS[int(risk_code(strength))]
@@ -4,37 +4,48 @@ MCP Server for Stock Analysis using AlphaVantage API.
 
 This server provides tools and prompts for fetching stock data, calculating
 technical indicators (MACD, Moving Averages, RSI), and generating trading
-recommendations. It uses an in-memory cache for intraday data to minimize
-API calls. The AlphaVantage API key is loaded from a .env file.
+recommendations. Intraday data is kept in a bounded, TTL-aware in-memory cache
+that is refreshed in the background to minimize API calls and latency. The
+AlphaVantage API key is loaded from a .env file.
 """
 
+import asyncio
 import json
 import logging  # Import logging module
 import os
-from dataclasses import dataclass
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import Any, Dict
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
 
 import anyio
 import click
 import httpx
 import mcp.types as types
+import mcp_observability as observability
+import numpy as np
 import pandas as pd
 
 # from mcp.server.fastmcp import FastMCP
 from dotenv import load_dotenv
 from mcp.server.lowlevel import Server
+from mcp_observability import Priority, RateLimitError, RequestScheduler
 from pydantic import FileUrl
 
+from . import backtest, bars, http_client, panel, parsing, scoring, signals, technicals
+from .cache import DerivedBarCache, MarketData, MarketDataCache, background_refresh
+from .executor import ComputeExecutor
+from .indicators import IndicatorEngine, RollingMean, RollingRSI
+from .singleflight import SingleFlight
+from .store import BarStore
+from .streaming import PartialResults
+from .watchlist import WatchlistWarmer
+
 # Load environment variables from .env file
 load_dotenv()
 
 # --- Logging Setup ---
-logging.basicConfig(
-    level=logging.INFO,  # Set default logging level
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-)
+# JSON records to stderr from a background thread; see mcp_observability.log
+observability.configure_logging("stockanalyst", level=logging.INFO)
 logger = logging.getLogger(__name__) # Get logger for this module
 
 # # Create the MCP server (Assuming low-level Server is used based on imports)
@@ -49,27 +60,80 @@ if not API_KEY:
         "ALPHAVANTAGE_API_KEY environment variable not set. Please create a .env file with the key."
     )
 
+# Query endpoint; can point at a mirror or a local fake server for benchmarks
+ALPHAVANTAGE_BASE_URL = os.getenv("ALPHAVANTAGE_BASE_URL", "https://www.alphavantage.co/query")
+
 SAMPLE_RESOURCES = {
     "help": "This server provides implementation of AlphaAdvantage API.",
     "about": "This is the MCP server implementation of AlphaAdvantage API.",
 }
 
-@dataclass
-class MarketData:
-    """
-    Dataclass to hold cached market data for a specific symbol and interval.
-
-    Attributes:
-        symbol: The stock ticker symbol (e.g., "IBM").
-        interval: The data interval (e.g., "1min", "5min").
-        data: A pandas DataFrame containing the time series data.
-        last_updated: The timestamp when the data was last fetched.
-    """
+# Cache configuration (overridable through environment variables)
+CACHE_MAX_BYTES = int(float(os.getenv("STOCKANALYST_CACHE_MAX_MB", "256")) * 1024 * 1024)
+CACHE_STALE_GRACE = float(os.getenv("STOCKANALYST_CACHE_STALE_GRACE", "900"))
+CACHE_TTLS = {
+    interval: float(os.getenv(f"STOCKANALYST_CACHE_TTL_{interval.upper()}", default))
+    for interval, default in {
+        "1min": 60,
+        "5min": 300,
+        "15min": 900,
+        "30min": 1800,
+        "60min": 3600,
+    }.items()
+}
 
-    symbol: str
-    interval: str
-    data: pd.DataFrame
-    last_updated: datetime
+# AlphaVantage quota (free tier: 5 calls per minute)
+RATE_LIMIT_PER_MINUTE = float(os.getenv("ALPHAVANTAGE_CALLS_PER_MINUTE", "5"))
+RATE_LIMIT_BURST = int(os.getenv("ALPHAVANTAGE_BURST", "5"))
+# The token bucket is per process: every process using the same API key needs its own share
+RATE_LIMIT_SHARE = float(os.getenv("ALPHAVANTAGE_QUOTA_SHARE", "1"))
+THROTTLE_BACKOFF_INITIAL = float(os.getenv("ALPHAVANTAGE_BACKOFF_INITIAL", "15"))
+THROTTLE_BACKOFF_MAX = float(os.getenv("ALPHAVANTAGE_BACKOFF_MAX", "120"))
+THROTTLE_RETRIES = int(os.getenv("ALPHAVANTAGE_THROTTLE_RETRIES", "2"))
+
+# Refresh cached histories with "compact" (last 100 bars) deltas instead of full downloads
+INCREMENTAL_UPDATES = os.getenv("STOCKANALYST_INCREMENTAL_UPDATES", "true").lower() in ("1", "true", "yes")
+
+# Build 5min-60min bars from the cached 1min history instead of separate API calls
+RESAMPLE_FROM_1MIN = os.getenv("STOCKANALYST_RESAMPLE_FROM_1MIN", "true").lower() in ("1", "true", "yes")
+# Maximum number of trailing bars reported by compute_indicators
+INDICATOR_LOOKBACK_MAX = int(os.getenv("STOCKANALYST_INDICATOR_LOOKBACK_MAX", "500"))
+
+# Partial results for trade_recommendation: "progress" (when the client sends a
+# progress token), "always" or "off"
+PARTIAL_RESULTS = os.getenv("STOCKANALYST_PARTIAL_RESULTS", "progress").lower()
+
+# Largest parameter grid accepted by backtest_strategy, and configurations per executor task
+BACKTEST_MAX_CONFIGS = int(os.getenv("STOCKANALYST_BACKTEST_MAX_CONFIGS", "5000"))
+BACKTEST_CHUNK_SIZE = int(os.getenv("STOCKANALYST_BACKTEST_CHUNK_SIZE", "250"))
+
+# Largest watchlist accepted by trade_recommendation_batch
+BATCH_MAX_SYMBOLS = int(os.getenv("STOCKANALYST_BATCH_MAX_SYMBOLS", "50"))
+# Maximum number of events returned by signal_events
+SIGNAL_EVENTS_MAX = int(os.getenv("STOCKANALYST_SIGNAL_EVENTS_MAX", "500"))
+
+# Watchlist whose recommendations are precomputed in the background (comma separated)
+WATCHLIST = os.getenv("STOCKANALYST_WATCHLIST", "")
+WATCHLIST_REFRESH_INTERVAL = float(os.getenv("STOCKANALYST_WATCHLIST_REFRESH_INTERVAL", "300"))
+# Share of the AlphaVantage quota the watchlist refreshes may use
+WATCHLIST_QUOTA_SHARE = float(os.getenv("STOCKANALYST_WATCHLIST_QUOTA_SHARE", "0.5"))
+WATCHLIST_MAX_SYMBOLS = int(os.getenv("STOCKANALYST_WATCHLIST_MAX_SYMBOLS", "100"))
+# Precomputed results based on older data are recomputed in the request path
+WATCHLIST_MAX_AGE = float(os.getenv("STOCKANALYST_WATCHLIST_MAX_AGE", "900"))
+
+# Coalesces concurrent identical AlphaVantage downloads
+intraday_fetches = SingleFlight()
+# Lane each in-flight download waits in, keyed like `intraday_fetches`
+intraday_priorities: Dict[Tuple[str, str, str], Priority] = {}
+
+# Shared token bucket and priority queue in front of every AlphaVantage call
+alphavantage_scheduler = RequestScheduler(
+    rate_per_minute=RATE_LIMIT_PER_MINUTE,
+    burst=RATE_LIMIT_BURST,
+    backoff_initial=THROTTLE_BACKOFF_INITIAL,
+    backoff_max=THROTTLE_BACKOFF_MAX,
+    share=RATE_LIMIT_SHARE,
+)
 
 class AlphaVantageAPI:
     """
@@ -79,7 +143,10 @@ class AlphaVantageAPI:
 
     @staticmethod
     async def get_intraday_data(
-        symbol: str, interval: str = "1min", outputsize: str = "compact"
+        symbol: str,
+        interval: str = "1min",
+        outputsize: str = "compact",
+        priority: Priority = Priority.INTERACTIVE,
     ) -> pd.DataFrame:
         """
         Fetch intraday time series data from the AlphaVantage API.
@@ -88,69 +155,371 @@ class AlphaVantageAPI:
             symbol: The stock ticker symbol.
             interval: The time interval between data points (e.g., "1min", "5min", "15min", "30min", "60min").
             outputsize: The number of data points ("compact" for 100, "full" for full history).
+            priority: Scheduler lane used while waiting for rate limit capacity.
 
         Returns:
             A pandas DataFrame containing the intraday data, indexed by datetime.
 
         Raises:
             ValueError: If the API returns an error or no data is found.
+            RateLimitError: If the API keeps returning throttle responses.
             httpx.HTTPStatusError: If the API request fails.
-        """
-        url = f"https://www.alphavantage.co/query?function=TIME_SERIES_INTRADAY&symbol={symbol}&interval={interval}&outputsize={outputsize}&apikey={API_KEY}"
 
-        logger.info(f"Fetching data from AlphaVantage API for {symbol} with interval {interval}...")
+        Concurrent calls with the same (symbol, interval, outputsize) share a
+        single download. The returned DataFrame is shared between those
+        callers and must not be modified in place. An interactive call joining
+        a background download moves it to the interactive lane.
+        """
+        key = (symbol, interval, outputsize)
+        queued = intraday_priorities.setdefault(key, priority)
+        if priority < queued:
+            intraday_priorities[key] = priority
+            alphavantage_scheduler.promote(key, priority)
+        return await intraday_fetches.do(
+            key,
+            lambda: AlphaVantageAPI._fetch_intraday_data(symbol, interval, outputsize),
+        )
 
-        headers = {
-            "User-Agent": "MCP Server (github.com/modelcontextprotocol/python-sdk)"
+    @staticmethod
+    async def _fetch_intraday_data(symbol: str, interval: str, outputsize: str) -> pd.DataFrame:
+        """Perform the AlphaVantage request behind `get_intraday_data`."""
+        params = {
+            "function": "TIME_SERIES_INTRADAY",
+            "symbol": symbol,
+            "interval": interval,
+            "outputsize": outputsize,
+            "apikey": API_KEY,
         }
+
+        logger.info("Fetching data from AlphaVantage API for %s with interval %s...", symbol, interval)
+
+        key = (symbol, interval, outputsize)
         try:
-            async with httpx.AsyncClient(follow_redirects=True, headers=headers) as client:
-                response = await client.get(url)
+            for attempt in range(THROTTLE_RETRIES + 1):
+                # Read on every attempt: a joining caller may have raised the priority
+                await alphavantage_scheduler.acquire(intraday_priorities.get(key, Priority.INTERACTIVE), key)
+                with observability.upstream_request("alphavantage") as call:
+                    response = await http_client.get_client().get(ALPHAVANTAGE_BASE_URL, params=params)
+                    call.status = str(response.status_code)
                 response.raise_for_status() # Raise exception for bad status codes
-                data = response.json()
+                # Large (outputsize=full) payloads are decoded in a worker thread
+                payload = await parsing.parse_intraday(response.content, interval)
+                data = payload.data
 
                 # Check for error responses
                 if "Error Message" in data:
-                    logger.error(f"AlphaVantage API Error for {symbol}: {data['Error Message']}")
+                    logger.error("AlphaVantage API Error for %s: %s", symbol, data['Error Message'])
                     raise ValueError(f"API Error: {data['Error Message']}")
-                if "Note" in data:
-                    logger.info(f"API Note for {symbol}: {data['Note']}") # Log API notes
-
-                # Extract time series data
-                time_series_key = f"Time Series ({interval})"
-                if time_series_key not in data:
-                    logger.error(f"No time series data found for {symbol} with interval {interval}. API Response: {data}")
-                    raise ValueError(
-                        f"No time series data found for {symbol} with interval {interval}"
-                    )
-
-                time_series = data[time_series_key]
-
-                # Convert to DataFrame
-                df = pd.DataFrame.from_dict(time_series, orient="index")
-                df.index = pd.to_datetime(df.index)
-                df = df.sort_index()
-
-                # Rename columns and convert to numeric
-                df.columns = [col.split(". ")[1] for col in df.columns]
-                for col in df.columns:
-                    df[col] = pd.to_numeric(df[col])
-
-                logger.info(f"Successfully fetched data for {symbol} ({interval}). Shape: {df.shape}")
-                return df
+
+                # "Note"/"Information" without data means we were throttled
+                throttle_message = data.get("Note") or data.get("Information")
+                if throttle_message and payload.bars is None:
+                    alphavantage_scheduler.report_throttle()
+                    logger.warning("AlphaVantage throttled request for %s (attempt %s): %s", symbol, attempt + 1, throttle_message)
+                    continue
+                alphavantage_scheduler.report_success()
+                break
+            else:
+                raise RateLimitError(f"AlphaVantage rate limit reached while fetching {symbol}: {throttle_message}")
+
+            # Extract time series data
+            if payload.bars is None:
+                logger.error("No time series data found for %s with interval %s. Response keys: %s", symbol, interval, list(data))
+                raise ValueError(
+                    f"No time series data found for {symbol} with interval {interval}"
+                )
+
+            # Compact DataFrame (float32 prices unless that loses precision, integer volume)
+            df = payload.bars
+
+            logger.info("Successfully fetched data for %s (%s). Shape: %s", symbol, interval, df.shape)
+            return df
         except httpx.HTTPStatusError as e:
-            logger.exception(f"HTTP error fetching data for {symbol}: {e.response.status_code}")
+            logger.exception("HTTP error fetching data for %s: %s", symbol, e.response.status_code)
             raise
         except Exception as e:
-            logger.exception(f"Unexpected error fetching data for {symbol}")
+            logger.exception("Unexpected error fetching data for %s", symbol)
             raise
+        finally:
+            intraday_priorities.pop(key, None)
+
+def _promote_intraday(symbol: str, interval: str) -> None:
+    """Move queued background downloads for a symbol to the interactive lane."""
+    for key, priority in list(intraday_priorities.items()):
+        if key[:2] == (symbol, interval) and priority > Priority.INTERACTIVE:
+            intraday_priorities[key] = Priority.INTERACTIVE
+            alphavantage_scheduler.promote(key)
+
+# In-memory cache for market data, keyed "SYMBOL_INTERVAL"
+market_data_cache = MarketDataCache(
+    max_bytes=CACHE_MAX_BYTES,
+    ttls=CACHE_TTLS,
+    stale_grace=CACHE_STALE_GRACE,
+    promote=_promote_intraday,
+)
+
+# Running indicator state per (symbol, interval, indicator, parameters)
+indicator_engine = IndicatorEngine()
+
+# Coarser bars resampled from cached 1min histories
+resampled_bars = DerivedBarCache(market_data_cache)
+
+# Background warmer for frequently queried symbols
+watchlist = WatchlistWarmer(
+    symbols=WATCHLIST.split(","),
+    refresh_interval=WATCHLIST_REFRESH_INTERVAL,
+    calls_per_minute=alphavantage_scheduler.rate_per_minute * WATCHLIST_QUOTA_SHARE,
+    max_symbols=WATCHLIST_MAX_SYMBOLS,
+    max_age=WATCHLIST_MAX_AGE,
+)
+
+# Pool for CPU-bound indicator work, so long computations do not stall other sessions
+EXECUTOR_MODE = os.getenv("STOCKANALYST_EXECUTOR", "thread").lower()
+EXECUTOR_WORKERS = int(os.getenv("STOCKANALYST_EXECUTOR_WORKERS", "0")) or None
+EXECUTOR_MAX_PENDING = int(os.getenv("STOCKANALYST_EXECUTOR_MAX_PENDING", "0")) or None
+EXECUTOR_SHM_MIN_BYTES = int(float(os.getenv("STOCKANALYST_EXECUTOR_SHM_MIN_KB", "1024")) * 1024)
+compute_executor = ComputeExecutor(
+    mode=EXECUTOR_MODE,
+    max_workers=EXECUTOR_WORKERS,
+    max_pending=EXECUTOR_MAX_PENDING,
+    shared_memory_min_bytes=EXECUTOR_SHM_MIN_BYTES,
+)
+
+async def _indicator_state(key, data: pd.DataFrame, build: Callable[..., Any], *params: Any):
+    """
+    Return the running indicator state for `key`, brought up to date with `data`.
+
+    Incremental updates are cheap and applied inline; building a state from
+    the full history (first use, or after a gap) runs in the compute executor
+    via `build(closes, *params, history)`.
+    """
+    with observability.timed(observability.COMPUTE_SECONDS, f"{key[2]}_update"):
+        state = indicator_engine.advance(key, data)
+    if state is None:
+        closes = data["close"].to_numpy(dtype=np.float64)
+        # Keys are (symbol, interval, indicator, *parameters)
+        state = await compute_executor.run(
+            f"{key[2]}_cold_start", build, closes, *params, indicator_engine.history
+        )
+        indicator_engine.seed(key, data, state)
+    return state
+
+# How cache loads were satisfied
+load_stats: Dict[str, int] = {"full": 0, "incremental": 0, "incremental_fallbacks": 0, "from_store": 0}
+
+# Persistent bar store (disabled when STOCKANALYST_BAR_STORE_DIR is empty or pyarrow is missing)
+BAR_STORE_DIR = os.getenv("STOCKANALYST_BAR_STORE_DIR", "~/.stockanalyst/bars")
+BAR_STORE_WARM_LIMIT = int(os.getenv("STOCKANALYST_BAR_STORE_WARM_LIMIT", "50"))
+bar_store: Optional[BarStore] = BarStore(BAR_STORE_DIR) if BAR_STORE_DIR else None
+if bar_store is not None and not bar_store.available:
+    bar_store = None
+
+# Background writes to the bar store still in progress
+_pending_writes: set[asyncio.Task] = set()
+
+def _persist_bars(symbol: str, interval: str, df: pd.DataFrame, since: Optional[pd.Timestamp] = None) -> None:
+    """Write bars to the store in a worker thread without blocking the caller."""
+    if bar_store is None:
+        return
 
-# In-memory cache for market data
-market_data_cache: Dict[
-    str, MarketData
-] = {}  # Cache format: {"SYMBOL_INTERVAL": MarketData}
+    async def write() -> None:
+        try:
+            await anyio.to_thread.run_sync(bar_store.write, symbol, interval, df, since)
+        except Exception:
+            logger.exception("Failed to persist bars for %s (%s)", symbol, interval)
+
+    task = asyncio.get_running_loop().create_task(write())
+    _pending_writes.add(task)
+    task.add_done_callback(_pending_writes.discard)
+
+async def _load_intraday(symbol: str, interval: str, previous: Optional[MarketData]) -> pd.DataFrame:
+    """
+    Cache loader: fetch the intraday history for a symbol.
+
+    When a previous history is available (from the cache or the on-disk bar
+    store), only the latest "compact" bars are fetched and merged into it.
+    The full history is downloaded when there is nothing to merge into, or
+    when the compact bars do not connect to the stored ones (e.g. after a
+    long pause). Fetched bars are written back to the bar store.
+    """
+    priority = Priority.BACKGROUND if background_refresh.get() else Priority.INTERACTIVE
+    history = previous.data if previous is not None else None
+    if history is None and bar_store is not None:
+        history = await anyio.to_thread.run_sync(bar_store.read, symbol, interval)
+        if history is not None:
+            load_stats["from_store"] += 1
+    if INCREMENTAL_UPDATES and history is not None and not history.empty:
+        delta = await AlphaVantageAPI.get_intraday_data(symbol, interval, outputsize="compact", priority=priority)
+        if bars.overlaps(history, delta):
+            load_stats["incremental"] += 1
+            merged = bars.merge_bars(history, delta)
+            _persist_bars(symbol, interval, merged, since=delta.index[0])
+            return merged
+        load_stats["incremental_fallbacks"] += 1
+        logger.info("Compact update for %s (%s) does not overlap cached history. Fetching full history.", symbol, interval)
+    load_stats["full"] += 1
+    df = await AlphaVantageAPI.get_intraday_data(symbol, interval, outputsize="full", priority=priority)
+    if history is not None and not history.empty and bars.overlaps(history, df):
+        # Keep stored days that are older than what the API still returns
+        df = bars.merge_bars(history, df)
+    _persist_bars(symbol, interval, df)
+    return df
+
+async def get_market_data(symbol: str, interval: str = "1min") -> MarketData:
+    """
+    Return market data for a symbol from the cache, fetching it if necessary.
+    """
+    return await market_data_cache.get_or_fetch(symbol, interval, _load_intraday)
+
+async def get_bars(symbol: str, interval: str = "1min") -> MarketData:
+    """
+    Return bars for any supported interval.
 
-@click.command()
+    Coarser intervals are resampled from the cached 1min history (and the
+    result cached until that history is refreshed), so all intervals share a
+    single AlphaVantage download per symbol.
+    """
+    if interval not in bars.INTERVAL_MINUTES:
+        raise ValueError(f"Unsupported interval: {interval} (expected one of {', '.join(bars.INTERVAL_MINUTES)})")
+    if interval == "1min" or not RESAMPLE_FROM_1MIN:
+        return await get_market_data(symbol, interval)
+    base = await get_market_data(symbol, "1min")
+    derived = resampled_bars.get(base, interval)
+    if derived is None:
+        df = await compute_executor.run("resample", bars.resample_bars, base.data, interval)
+        derived = resampled_bars.put(base, interval, df)
+    return derived
+
+async def load_closes(
+    symbols: List[str], interval: str = "1min", offline: bool = False
+) -> Tuple[Dict[str, np.ndarray], Dict[str, str]]:
+    """
+    Collect close histories for backtesting.
+
+    Args:
+        symbols: The ticker symbols.
+        interval: The bar interval.
+        offline: Only read the on-disk bar store, never call AlphaVantage.
+
+    Returns:
+        Close arrays keyed by symbol, and error messages for symbols without data.
+    """
+    closes: Dict[str, np.ndarray] = {}
+    errors: Dict[str, str] = {}
+
+    async def load(symbol: str) -> None:
+        try:
+            if offline:
+                df = None
+                if bar_store is not None:
+                    source = "1min" if RESAMPLE_FROM_1MIN else interval
+                    df = await anyio.to_thread.run_sync(bar_store.read, symbol, source)
+                    if df is not None and source != interval:
+                        df = bars.resample_bars(df, interval)
+            else:
+                df = (await get_bars(symbol, interval)).data
+        except Exception as e:
+            logger.warning("Could not load bars for %s (%s) for backtest: %s", symbol, interval, e)
+            errors[symbol] = str(e)
+            return
+        if df is None or df.empty:
+            errors[symbol] = "No data available"
+        else:
+            closes[symbol] = df["close"].to_numpy(dtype=np.float64)
+
+    await asyncio.gather(*(load(symbol) for symbol in symbols))
+    return {symbol: closes[symbol] for symbol in symbols if symbol in closes}, errors
+
+async def last_known_price(symbol: str, interval: str = "1min") -> Dict[str, Any]:
+    """
+    Latest close already available locally (cache or bar store), without
+    calling AlphaVantage. The data may be stale; its age is reported.
+    """
+    entry = market_data_cache.peek(symbol, interval)
+    df, age = None, None
+    if entry is not None and not entry.data.empty:
+        df, age = entry.data, market_data_cache.age(entry)
+    elif bar_store is not None:
+        days = await anyio.to_thread.run_sync(bar_store.days, symbol, interval)
+        if days:
+            df = await anyio.to_thread.run_sync(bar_store.read, symbol, interval, days[-1])
+            modified = bar_store.last_modified(symbol, interval)
+            age = (datetime.now() - modified).total_seconds() if modified is not None else None
+    if df is None or df.empty:
+        return {"symbol": symbol, "price": None, "status": "fetching"}
+    return {
+        "symbol": symbol,
+        "price": bars.price_value(df["close"].iloc[-1]),
+        "as_of": df.index[-1].isoformat(),
+        "data_age_seconds": round(age, 1) if age is not None else None,
+        "status": "cached",
+    }
+
+async def _precompute(symbol: str, analyze: Callable[[str], Awaitable[Dict[str, Any]]]) -> Tuple[Dict[str, Any], datetime]:
+    """Watchlist refresher: bring the 1min bars of a symbol up to date and analyze them."""
+    entry = market_data_cache.peek(symbol, "1min")
+    if entry is None or market_data_cache.age(entry) > market_data_cache.ttl_for("1min"):
+        entry = await market_data_cache.refresh(symbol, "1min", _load_intraday)
+    return await analyze(symbol), entry.last_updated
+
+def _warm_cache_from_store() -> int:
+    """Load the most recently stored histories into the cache (runs in a worker thread)."""
+    warmed = 0
+    for symbol, interval, modified in bar_store.series()[:BAR_STORE_WARM_LIMIT]:
+        df = bar_store.read(symbol, interval)
+        if df is None or df.empty:
+            continue
+        market_data_cache.put(MarketData(symbol=symbol, interval=interval, data=df, last_updated=modified))
+        warmed += 1
+        if market_data_cache.total_bytes >= market_data_cache.max_bytes:
+            break
+    return warmed
+
+@asynccontextmanager
+async def server_lifespan(
+    analyze: Optional[Callable[[str], Awaitable[Dict[str, Any]]]] = None,
+) -> AsyncIterator[None]:
+    """
+    Process-wide startup and shutdown: warms the cache from the bar store,
+    opens the shared HTTP client and, given the analysis coroutine, starts
+    the watchlist warmer. On exit the warmer is stopped and the HTTP client
+    released, together with pending cache refreshes and bar store writes.
+    """
+    if bar_store is not None:
+        warmed = await anyio.to_thread.run_sync(_warm_cache_from_store)
+        logger.info("Warmed market data cache with %s stored histories from %s", warmed, bar_store.root)
+    await http_client.open_client()
+    if analyze is not None:
+        watchlist.start(lambda symbol: _precompute(symbol, analyze))
+        if watchlist.symbols:
+            logger.info("Precomputing recommendations for %s watchlist symbols", len(watchlist.symbols))
+    try:
+        yield
+    finally:
+        await watchlist.aclose()
+        await market_data_cache.aclose()
+        if _pending_writes:
+            await asyncio.gather(*_pending_writes, return_exceptions=True)
+        await http_client.close_client()
+        compute_executor.shutdown()
+
+# Runtime statistics exposed as JSON resources: {"name": callable returning a dict}
+STATS_RESOURCES: Dict[str, Callable[[], Dict[str, Any]]] = {
+    "cache_stats": market_data_cache.snapshot,
+    "fetch_stats": intraday_fetches.snapshot,
+    "scheduler_stats": alphavantage_scheduler.snapshot,
+    "load_stats": lambda: dict(load_stats),
+    "indicator_stats": indicator_engine.snapshot,
+    "executor_stats": compute_executor.snapshot,
+    "resample_stats": resampled_bars.snapshot,
+    "watchlist_stats": watchlist.snapshot,
+}
+
+# Cache hit ratios exported as Prometheus metrics
+observability.register_cache("market_data", market_data_cache.snapshot)
+observability.register_cache("resampled_bars", resampled_bars.snapshot)
+
+@click.group(invoke_without_command=True)
 @click.option("--port", default=8008, help="Port to listen on for SSE")
 @click.option(
     "--transport",
@@ -158,9 +527,21 @@ market_data_cache: Dict[
     default="stdio",
     help="Transport type",
 )
-def main(port: int, transport: str) -> int:
-    logger.info(f"Starting Stock Analyst MCP Server (Transport: {transport}, Port: {port if transport == 'sse' else 'N/A'})")
+@click.pass_context
+def main(ctx: click.Context, port: int, transport: str) -> int:
+    # Subcommands (e.g. `backtest`) run instead of the server
+    if ctx.invoked_subcommand is not None:
+        return 0
+    logger.info("Starting Stock Analyst MCP Server (Transport: %s, Port: %s)", transport, port if transport == 'sse' else 'N/A')
     app = Server("stock-analyst")
+    observability.configure_tracing("stock-analyst")
+
+    def current_request_context():
+        """The MCP request being handled, or None outside a request."""
+        try:
+            return app.request_context
+        except LookupError:
+            return None
 
     # --- MCP Resources ---
     @app.list_resources()
@@ -174,16 +555,26 @@ def main(port: int, transport: str) -> int:
                 mimeType="text/plain",
             )
             for name in SAMPLE_RESOURCES.keys()
+        ] + [
+            types.Resource(
+                uri=FileUrl(f"file:///{name}.json"),
+                name=name,
+                description=f"Runtime statistics: {name}",
+                mimeType="application/json",
+            )
+            for name in STATS_RESOURCES.keys()
         ]
 
     @app.read_resource()
     async def read_resource(uri: FileUrl) -> str | bytes:
         """Provides static configuration data for the application."""
-        logger.debug(f"Reading resource: {uri}")
+        logger.debug("Reading resource: %s", uri)
         # "config://app"
-        name = uri.path.replace(".txt", "").lstrip("/")
+        name = uri.path.replace(".txt", "").replace(".json", "").lstrip("/")
+        if name in STATS_RESOURCES:
+            return json.dumps(STATS_RESOURCES[name]())
         if name not in SAMPLE_RESOURCES:
-            logger.warning(f"Attempted to read unknown resource: {uri}")
+            logger.warning("Attempted to read unknown resource: %s", uri)
             raise ValueError(f"Unknown resource: {uri}")
 
         return SAMPLE_RESOURCES[name]
@@ -208,6 +599,114 @@ def main(port: int, transport: str) -> int:
                     },
                 },
             ),
+            types.Tool(
+                name="trade_recommendation_batch",
+                description="Provide trade recommendations for several ticker symbols at once, ranked from most bullish to most bearish",
+                inputSchema={
+                    "type": "object",
+                    "required": ["symbols"],
+                    "properties": {
+                        "symbols": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": f"The ticker symbols to analyze (at most {BATCH_MAX_SYMBOLS})",
+                        },
+                    },
+                },
+            ),
+            types.Tool(
+                name="compute_indicators",
+                description="Compute technical indicators (SMA, EMA, MACD, Bollinger Bands, ATR, VWAP, RSI) with custom parameters on one or more intraday intervals",
+                inputSchema={
+                    "type": "object",
+                    "required": ["symbol", "indicators"],
+                    "properties": {
+                        "symbol": {
+                            "type": "string",
+                            "description": "The ticker symbol to analyze",
+                        },
+                        "intervals": {
+                            "type": "array",
+                            "items": {"type": "string", "enum": list(bars.INTERVAL_MINUTES)},
+                            "default": ["1min"],
+                            "description": "Bar intervals; coarser ones are built from the cached 1min bars",
+                        },
+                        "indicators": {
+                            "type": "array",
+                            "description": "Indicator specs, e.g. {\"name\": \"sma\", \"window\": 20}. Parameters and defaults: "
+                            + "; ".join(
+                                f"{name}({', '.join(f'{key}={value}' for key, value in technicals.parameters(name).items())})"
+                                for name in technicals.INDICATORS
+                            ),
+                            "items": {
+                                "type": "object",
+                                "required": ["name"],
+                                "properties": {"name": {"type": "string", "enum": list(technicals.INDICATORS)}},
+                            },
+                        },
+                        "lookback": {
+                            "type": "integer",
+                            "minimum": 1,
+                            "default": 1,
+                            "description": f"Number of most recent bars to report values for (at most {INDICATOR_LOOKBACK_MAX})",
+                        },
+                    },
+                },
+            ),
+            types.Tool(
+                name="backtest_strategy",
+                description="Backtest the trade_recommendation scoring rules (MA direction, crossover, RSI) over the cached history of one or more symbols for a grid of parameters; reports hit rate, return and drawdown per configuration",
+                inputSchema={
+                    "type": "object",
+                    "required": ["symbols"],
+                    "properties": {
+                        "symbols": {"type": "array", "items": {"type": "string"}, "description": f"The ticker symbols to test (at most {BATCH_MAX_SYMBOLS})"},
+                        "interval": {"type": "string", "enum": list(bars.INTERVAL_MINUTES), "default": "1min", "description": "Bar interval"},
+                        "short_periods": {"type": "array", "items": {"type": "integer", "minimum": 1}, "default": [20], "description": "Short moving average windows"},
+                        "long_periods": {"type": "array", "items": {"type": "integer", "minimum": 2}, "default": [50], "description": "Long moving average windows"},
+                        "rsi_periods": {"type": "array", "items": {"type": "integer", "minimum": 1}, "default": [14], "description": "RSI windows"},
+                        "thresholds": {"type": "array", "items": {"type": "number", "exclusiveMinimum": 0}, "default": [0.5], "description": f"Minimum absolute signal strength (max {scoring.MAX_SIGNAL_STRENGTH}) to hold a position"},
+                        "cost_bps": {"type": "number", "minimum": 0, "default": 0, "description": "Cost per position change in basis points"},
+                        "allow_short": {"type": "boolean", "default": True, "description": "Go short on bearish signals instead of staying flat"},
+                        "top": {"type": "integer", "minimum": 1, "default": 10, "description": "Number of best configurations to return"},
+                    },
+                },
+            ),
+            types.Tool(
+                name="watchlist",
+                description="Show or change the watchlist of symbols whose trade recommendations are precomputed in the background, with the age of each result",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "action": {"type": "string", "enum": ["list", "add", "remove", "set"], "default": "list", "description": "List the watchlist, add or remove symbols, or replace it"},
+                        "symbols": {"type": "array", "items": {"type": "string"}, "description": f"The ticker symbols to add, remove or set (at most {WATCHLIST_MAX_SYMBOLS} on the watchlist)"},
+                    },
+                },
+            ),
+            types.Tool(
+                name="signal_events",
+                description="List moving average crossovers and RSI threshold crossings with their timestamps, e.g. to find when the last golden cross happened",
+                inputSchema={
+                    "type": "object",
+                    "required": ["symbol"],
+                    "properties": {
+                        "symbol": {
+                            "type": "string",
+                            "description": "The ticker symbol to scan",
+                        },
+                        "short_period": {"type": "integer", "minimum": 1, "default": 20, "description": "Short moving average window"},
+                        "long_period": {"type": "integer", "minimum": 1, "default": 50, "description": "Long moving average window"},
+                        "rsi_period": {"type": "integer", "minimum": 1, "default": 14, "description": "RSI window"},
+                        "lookback": {"type": "integer", "minimum": 2, "description": "Only scan the last N bars (default: the whole cached history)"},
+                        "events": {
+                            "type": "array",
+                            "items": {"type": "string", "enum": list(signals.EVENT_TYPES)},
+                            "description": "Event types to report (default: all)",
+                        },
+                        "limit": {"type": "integer", "minimum": 1, "default": 50, "description": f"Maximum number of most recent events returned (at most {SIGNAL_EVENTS_MAX})"},
+                    },
+                },
+            ),
         ]
 
     async def calculate_moving_averages(
@@ -216,35 +715,21 @@ def main(port: int, transport: str) -> int:
         """
         Calculate short and long moving averages for a symbol
         """
-        logger.debug(f"calculate_moving_averages called for {symbol} ({short_period}/{long_period})")
-        # Use a consistent cache key format
-        cache_key = f"{symbol}_1min"
-
-        # Check cache first, fetch if necessary
-        if cache_key not in market_data_cache:
-            logger.info(f"Cache miss for {cache_key}. Fetching new data.")
-            # Fetch full data for calculations
-            df = await AlphaVantageAPI.get_intraday_data(symbol, "1min", outputsize="full")
-            market_data_cache[cache_key] = MarketData(
-                symbol=symbol,
-                interval="1min",
-                data=df,
-                last_updated=datetime.now(),  # Store fetch time
-            )
-        else:
-            logger.debug(f"Cache hit for {cache_key}.")
+        logger.debug("calculate_moving_averages called for %s (%s/%s)", symbol, short_period, long_period)
+        market_data = await get_market_data(symbol, "1min")
 
-        data = market_data_cache[cache_key].data
+        data = market_data.data
 
-        # Calculate moving averages
-        data[f"SMA{short_period}"] = data["close"].rolling(window=short_period).mean()
-        data[f"SMA{long_period}"] = data["close"].rolling(window=long_period).mean()
+        # Bring the running moving averages up to date (the cached frame is not modified)
+        short_sma, long_sma = await asyncio.gather(
+            _indicator_state(IndicatorEngine.sma_key(symbol, "1min", short_period), data, RollingMean.from_values, short_period),
+            _indicator_state(IndicatorEngine.sma_key(symbol, "1min", long_period), data, RollingMean.from_values, long_period),
+        )
 
         # Get latest values
-        latest = data.iloc[-1]
-        current_price = latest["close"]
-        short_ma = latest[f"SMA{short_period}"]
-        long_ma = latest[f"SMA{long_period}"]
+        current_price = bars.price_value(data["close"].iloc[-1])
+        short_ma = short_sma.value
+        long_ma = long_sma.value
 
         # Determine signal
         if short_ma > long_ma:
@@ -254,32 +739,10 @@ def main(port: int, transport: str) -> int:
         else:
             signal = "NEUTRAL (MAs are equal)"
 
-        # Check for crossover in the last 5 periods
-        last_5 = data.iloc[-5:]
-        crossover = False
-        crossover_type = ""
-
-        for i in range(1, len(last_5)):
-            prev = last_5.iloc[i - 1]
-            curr = last_5.iloc[i]
-
-            # Golden Cross (short crosses above long)
-            if (
-                prev[f"SMA{short_period}"] <= prev[f"SMA{long_period}"]
-                and curr[f"SMA{short_period}"] > curr[f"SMA{long_period}"]
-            ):
-                crossover = True
-                crossover_type = "GOLDEN CROSS (Bullish)"
-                break
-
-            # Death Cross (short crosses below long)
-            if (
-                prev[f"SMA{short_period}"] >= prev[f"SMA{long_period}"]
-                and curr[f"SMA{short_period}"] < curr[f"SMA{long_period}"]
-            ):
-                crossover = True
-                crossover_type = "DEATH CROSS (Bearish)"
-                break
+        # Check for a crossover in the last 5 periods (the earliest one wins)
+        direction = signals.first_crossover(short_sma.recent, long_sma.recent)
+        crossover = direction != 0
+        crossover_type = "GOLDEN CROSS (Bullish)" if direction > 0 else "DEATH CROSS (Bearish)" if direction < 0 else ""
 
         return {
             "symbol": symbol,
@@ -313,47 +776,14 @@ def main(port: int, transport: str) -> int:
         """
         Calculate Relative Strength Index (RSI) for a symbol
         """
-        logger.debug(f"calculate_rsi called for {symbol} (period {period})")
-        # Use a consistent cache key format
-        cache_key = f"{symbol}_1min"
-
-        # Check cache first, fetch if necessary
-        if cache_key not in market_data_cache:
-            logger.info(f"Cache miss for {cache_key}. Fetching new data.")
-            # Fetch full data for calculations
-            df = await AlphaVantageAPI.get_intraday_data(symbol, "1min", outputsize="full")
-            market_data_cache[cache_key] = MarketData(
-                symbol=symbol,
-                interval="1min",
-                data=df,
-                last_updated=datetime.now(),  # Store fetch time
-            )
-        else:
-            logger.debug(f"Cache hit for {cache_key}.")
-
-        data = market_data_cache[cache_key].data.copy()
-
-        # Calculate price changes
-        delta = data["close"].diff()
-
-        # Create gain and loss series
-        gain = delta.copy()
-        loss = delta.copy()
-        gain[gain < 0] = 0
-        loss[loss > 0] = 0
-        loss = abs(loss)
-
-        # Calculate average gain and loss
-        avg_gain = gain.rolling(window=period).mean()
-        avg_loss = loss.rolling(window=period).mean()
+        logger.debug("calculate_rsi called for %s (period %s)", symbol, period)
+        market_data = await get_market_data(symbol, "1min")
 
-        # Calculate RS and RSI
-        # Avoid division by zero if avg_loss is 0
-        rs = avg_gain / avg_loss if avg_loss.iloc[-1] != 0 else 0
-        rsi = 100 - (100 / (1 + rs))
-
-        # Get latest RSI
-        latest_rsi = rsi.iloc[-1]
+        # Bring the running RSI up to date (no copy of the cached frame is needed)
+        rsi_state = await _indicator_state(
+            IndicatorEngine.rsi_key(symbol, "1min", period), market_data.data, RollingRSI.from_values, period, "simple"
+        )
+        latest_rsi = rsi_state.value
 
         # Determine signal
         if latest_rsi < 30:
@@ -377,14 +807,28 @@ def main(port: int, transport: str) -> int:
             }""",
         }
 
-    async def analyze_stock(symbol: str, period: int = 14) -> Dict[str, Any]:
+    async def analyze_stock(symbol: str, period: int = 14, partial: Optional[PartialResults] = None) -> Dict[str, Any]:
         """
         Combines MA and RSI for a recommendation.
+
+        If `partial` is given, the MA and RSI results are published as
+        intermediate stages before the recommendation is scored.
         """
-        logger.debug(f"analyze_stock called for {symbol} (period {period})")
-        # Calculate individual indicators
-        ma_data = await calculate_moving_averages(symbol)
-        rsi_data = await calculate_rsi(symbol)
+        logger.debug("analyze_stock called for %s (period %s)", symbol, period)
+        # Calculate individual indicators (concurrently; cold starts run in the compute executor)
+        ma_task = asyncio.ensure_future(calculate_moving_averages(symbol))
+        rsi_task = asyncio.ensure_future(calculate_rsi(symbol))
+        try:
+            ma_data = await ma_task
+            if partial is not None:
+                await partial.publish("moving_averages", {k: v for k, v in ma_data.items() if k != "analysis"})
+            rsi_data = await rsi_task
+            if partial is not None:
+                await partial.publish("rsi", {k: v for k, v in rsi_data.items() if k != "analysis"})
+        finally:
+            # Do not leave the other computation running if one of them failed
+            for task in (ma_task, rsi_task):
+                task.cancel()
 
         # Extract signals
         ma_signal = ma_data["signal"]
@@ -394,45 +838,15 @@ def main(port: int, transport: str) -> int:
         rsi_signal = rsi_data["signal"]
 
         # Determine overall signal strength
-        signal_strength = 0
-
-        # MA contribution
-        if "BULLISH" in ma_signal:
-            signal_strength += 1
-        elif "BEARISH" in ma_signal:
-            signal_strength -= 1
-
-        # Crossover contribution
+        ma_direction = 1 if "BULLISH" in ma_signal else -1 if "BEARISH" in ma_signal else 0
+        crossover_direction = 0
         if ma_crossover:
-            if "GOLDEN" in ma_crossover_type:
-                signal_strength += 2
-            elif "DEATH" in ma_crossover_type:
-                signal_strength -= 2
-
-        # RSI contribution
-        if "OVERSOLD" in rsi_signal:
-            signal_strength += 1.5
-        elif "OVERBOUGHT" in rsi_signal:
-            signal_strength -= 1.5
-
-        # Determine final recommendation
-        if signal_strength >= 2:
-            recommendation = "STRONG BUY"
-        elif signal_strength > 0:
-            recommendation = "BUY"
-        elif signal_strength <= -2:
-            recommendation = "STRONG SELL"
-        elif signal_strength < 0:
-            recommendation = "SELL"
-        else:
-            recommendation = "HOLD"
+            crossover_direction = 1 if "GOLDEN" in ma_crossover_type else -1 if "DEATH" in ma_crossover_type else 0
+        signal_strength = float(scoring.signal_strength(ma_direction, crossover_direction, rsi_value))
 
-        # Calculate risk level (simple version)
-        risk_level = "MEDIUM"
-        if abs(signal_strength) > 3:
-            risk_level = "LOW"  # Strong signal, lower risk
-        elif abs(signal_strength) < 1:
-            risk_level = "HIGH"  # Weak signal, higher risk
+        # Determine final recommendation and risk level (strong signal, lower risk)
+        recommendation = scoring.recommendation(signal_strength)
+        risk_level = scoring.risk_level(signal_strength)
 
         analysis = f"""# Trading Recommendation for {symbol}
 
@@ -483,33 +897,304 @@ def main(port: int, transport: str) -> int:
         }
         return result_dict
 
-    @app.call_tool()
-    async def trade_recommendation(name: str, arguments: dict) -> list[types.TextContent | types.ImageContent | types.EmbeddedResource]:
+    async def analyze_batch(
+        symbols: list[str], short_period: int = 20, long_period: int = 50, period: int = 14
+    ) -> Dict[str, Any]:
+        """
+        Scores several symbols in one vectorized pass and ranks them.
+        """
+        logger.debug("analyze_batch called for %s symbols", len(symbols))
+        # Fetch concurrently; the scheduler keeps the fan-out within the API quota
+        fetched = await asyncio.gather(
+            *(get_market_data(symbol, "1min") for symbol in symbols), return_exceptions=True
+        )
+        frames: Dict[str, pd.DataFrame] = {}
+        errors: Dict[str, str] = {}
+        for symbol, result in zip(symbols, fetched):
+            if isinstance(result, BaseException):
+                logger.warning("Could not fetch data for %s in batch: %s", symbol, result)
+                errors[symbol] = str(result)
+            elif result.data.empty:
+                errors[symbol] = "No data available"
+            else:
+                frames[symbol] = result.data
+
+        results = []
+        if frames:
+            row_symbols, closes = panel.align_closes(frames, panel.panel_length(short_period, long_period, period))
+            signals = await compute_executor.run(
+                "panel_signals", panel.panel_signals, closes, short_period, long_period, period
+            )
+            for row, symbol in enumerate(row_symbols):
+                strength = float(signals["signal_strength"][row])
+                crossover = int(signals["crossover"][row])
+                rsi_value = float(signals["rsi"][row])
+                results.append({
+                    "symbol": symbol,
+                    "recommendation": scoring.recommendation(strength),
+                    "risk_level": scoring.risk_level(strength),
+                    "signal_strength": strength,
+                    "current_price": bars.price_value(signals["current_price"][row]),
+                    f"SMA{short_period}": float(signals["short_ma"][row]),
+                    f"SMA{long_period}": float(signals["long_ma"][row]),
+                    "crossover_type": "GOLDEN CROSS (Bullish)" if crossover > 0 else "DEATH CROSS (Bearish)" if crossover < 0 else "None",
+                    "rsi": rsi_value,
+                })
+            results.sort(key=lambda item: item["signal_strength"], reverse=True)
+            for rank, item in enumerate(results, start=1):
+                item["rank"] = rank
+
+        return {"results": results, "errors": errors}
+
+    async def trade_recommendation(arguments: dict) -> list[types.TextContent | types.ImageContent | types.EmbeddedResource]:
         """
         Provide a comprehensive trade recommendation based on multiple indicators
         """
-        # The 'name' parameter is passed by the low-level server; we don't need it here
-        # as the decorator handles routing.
-        logger.info(f"Executing tool 'trade_recommendation' with args: {arguments}")
+        logger.info("Executing tool 'trade_recommendation' with args: %s", arguments)
 
         if not arguments or "symbol" not in arguments:
-            logger.error(f"Missing required argument 'symbol' in trade_recommendation call. Args: {arguments}")
+            logger.error("Missing required argument 'symbol' in trade_recommendation call. Args: %s", arguments)
             # Consider returning an error message via MCP instead of raising ValueError directly
             # For now, raising is simpler.
             raise ValueError("Missing required argument 'symbol'")
 
         symbol = arguments["symbol"]
+        # Watchlist symbols are answered from the background precomputation
+        precomputed = watchlist.lookup(symbol)
+        if precomputed is not None:
+            result_dict = {
+                **precomputed.result,
+                "source": "watchlist",
+                "data_age_seconds": round(precomputed.age(), 1),
+                "computed_at": precomputed.computed_at.isoformat(),
+            }
+            return [types.TextContent(type="text", text=json.dumps(result_dict))]
+
+        # Stages: last known price, moving averages, RSI, recommendation
+        partial = PartialResults.for_request(current_request_context(), 4, "trade_recommendation", PARTIAL_RESULTS)
         try:
-            result_dict = await analyze_stock(symbol) # This function combines MA and RSI
-            logger.debug(f"analyze_stock result for {symbol}: {result_dict}")
+            if partial.enabled:
+                await partial.publish("price", await last_known_price(symbol))
+            result_dict = await analyze_stock(symbol, partial=partial) # This function combines MA and RSI
+            logger.debug("analyze_stock result for %s: %s", symbol, result_dict)
+            entry = market_data_cache.peek(symbol, "1min")
+            result_dict["source"] = "live"
+            result_dict["data_age_seconds"] = round(market_data_cache.age(entry), 1) if entry is not None else None
+            await partial.publish("recommendation", {k: v for k, v in result_dict.items() if k != "analysis"})
         except Exception as e:
-            logger.exception(f"Error during analyze_stock for {symbol} within trade_recommendation")
+            logger.exception("Error during analyze_stock for %s within trade_recommendation", symbol)
             # Re-raise the exception so the MCP framework can report an error
             raise
         # Ensure result_dict is defined before trying to dump it (it is defined within the try block)
         result_text = json.dumps(result_dict) # Convert the result dict to JSON string
         return [types.TextContent(type="text", text=result_text)] # Return as TextContent
 
+    async def trade_recommendation_batch(arguments: dict) -> list[types.TextContent | types.ImageContent | types.EmbeddedResource]:
+        """
+        Provide ranked trade recommendations for a list of symbols in one call
+        """
+        logger.info("Executing tool 'trade_recommendation_batch' with args: %s", arguments)
+        symbols = arguments.get("symbols") if arguments else None
+        if not isinstance(symbols, list) or not symbols:
+            raise ValueError("Missing required argument 'symbols' (non-empty list of strings)")
+        # Drop duplicates while keeping the caller's order
+        symbols = list(dict.fromkeys(str(symbol).strip() for symbol in symbols if str(symbol).strip()))
+        if len(symbols) > BATCH_MAX_SYMBOLS:
+            raise ValueError(f"Too many symbols: {len(symbols)} (maximum is {BATCH_MAX_SYMBOLS})")
+
+        result_dict = await analyze_batch(symbols)
+        return [types.TextContent(type="text", text=json.dumps(result_dict))]
+
+    async def manage_watchlist(arguments: dict) -> list[types.TextContent | types.ImageContent | types.EmbeddedResource]:
+        """
+        Show or change the watchlist of precomputed symbols
+        """
+        logger.info("Executing tool 'watchlist' with args: %s", arguments)
+        arguments = arguments or {}
+        action = arguments.get("action", "list")
+        symbols = arguments.get("symbols", [])
+        if not isinstance(symbols, list):
+            raise ValueError("'symbols' must be a list of strings")
+        if action in ("add", "remove") and not symbols:
+            raise ValueError(f"Missing required argument 'symbols' for action '{action}'")
+        if action == "add":
+            watchlist.add(symbols)
+        elif action == "remove":
+            watchlist.remove(symbols)
+        elif action == "set":
+            watchlist.replace(symbols)
+        elif action != "list":
+            raise ValueError(f"Unknown watchlist action: {action} (expected list, add, remove or set)")
+        return [types.TextContent(type="text", text=json.dumps(watchlist.snapshot()))]
+
+    async def signal_events(arguments: dict) -> list[types.TextContent | types.ImageContent | types.EmbeddedResource]:
+        """
+        Scan the cached history of a symbol for crossover and RSI events
+        """
+        logger.info("Executing tool 'signal_events' with args: %s", arguments)
+        if not arguments or "symbol" not in arguments:
+            raise ValueError("Missing required argument 'symbol'")
+        symbol = arguments["symbol"]
+        short_period = int(arguments.get("short_period", 20))
+        long_period = int(arguments.get("long_period", 50))
+        rsi_period = int(arguments.get("rsi_period", 14))
+        lookback = arguments.get("lookback")
+        lookback = int(lookback) if lookback is not None else None
+        limit = min(int(arguments.get("limit", 50)), SIGNAL_EVENTS_MAX)
+        wanted = arguments.get("events") or list(signals.EVENT_TYPES)
+        unknown = set(wanted) - set(signals.EVENT_TYPES)
+        if unknown:
+            raise ValueError(f"Unknown event types: {', '.join(sorted(unknown))}")
+        if min(short_period, long_period, rsi_period, limit) < 1 or (lookback is not None and lookback < 2):
+            raise ValueError("Periods and limit must be positive and lookback at least 2")
+
+        market_data = await get_market_data(symbol, "1min")
+        data = market_data.data
+        events = await compute_executor.run(
+            "signal_scan",
+            signals.scan,
+            data["close"].to_numpy(dtype=np.float64),
+            data.index.to_numpy(),
+            short_period,
+            long_period,
+            rsi_period,
+            lookback,
+        )
+        events = events[events["event"].isin(wanted)]
+        last = signals.last_events(events)
+
+        def number(value: float) -> Optional[float]:
+            return None if np.isnan(value) else float(value)
+
+        result_dict = {
+            "symbol": symbol,
+            "interval": "1min",
+            "bars_scanned": len(data) if lookback is None else min(lookback, len(data)),
+            "event_count": len(events),
+            "last": {event: last[event].isoformat() for event in wanted if last[event] is not None},
+            "events": [
+                {
+                    "timestamp": row.timestamp.isoformat(),
+                    "event": row.event,
+                    "close": bars.price_value(row.close),
+                    f"SMA{short_period}": number(row.short_ma),
+                    f"SMA{long_period}": number(row.long_ma),
+                    "rsi": number(row.rsi),
+                }
+                for row in events.tail(limit).itertuples(index=False)
+            ],
+        }
+        return [types.TextContent(type="text", text=json.dumps(result_dict))]
+
+    async def compute_indicators(arguments: dict) -> list[types.TextContent | types.ImageContent | types.EmbeddedResource]:
+        """
+        Evaluate indicator specs on one or more intervals of a symbol's bars
+        """
+        logger.info("Executing tool 'compute_indicators' with args: %s", arguments)
+        if not arguments or "symbol" not in arguments:
+            raise ValueError("Missing required argument 'symbol'")
+        symbol = arguments["symbol"]
+        intervals = list(dict.fromkeys(arguments.get("intervals") or ["1min"]))
+        unsupported = [interval for interval in intervals if interval not in bars.INTERVAL_MINUTES]
+        if unsupported:
+            raise ValueError(f"Unsupported intervals: {', '.join(unsupported)} (expected {', '.join(bars.INTERVAL_MINUTES)})")
+        raw_specs = arguments.get("indicators")
+        if not isinstance(raw_specs, list) or not raw_specs:
+            raise ValueError("Missing required argument 'indicators' (non-empty list of indicator specs)")
+        specs = [technicals.normalize_spec(spec) for spec in raw_specs]
+        lookback = int(arguments.get("lookback", 1))
+        if not 1 <= lookback <= INDICATOR_LOOKBACK_MAX:
+            raise ValueError(f"lookback must be between 1 and {INDICATOR_LOOKBACK_MAX}")
+
+        # All intervals are derived from the same cached 1min bars
+        entries = await asyncio.gather(*(get_bars(symbol, interval) for interval in intervals))
+        computed = await asyncio.gather(
+            *(compute_executor.run("compute_indicators", technicals.compute, entry.data, specs, lookback) for entry in entries)
+        )
+        results = {}
+        for interval, entry, values in zip(intervals, entries, computed):
+            results[interval] = {
+                "bars": len(entry.data),
+                "last_bar": entry.data.index[-1].isoformat() if len(entry.data) else None,
+                "data_age_seconds": round(market_data_cache.age(entry), 1),
+                **values,
+            }
+        return [types.TextContent(type="text", text=json.dumps({"symbol": symbol, "intervals": results}))]
+
+    async def backtest_strategy(arguments: dict) -> list[types.TextContent | types.ImageContent | types.EmbeddedResource]:
+        """
+        Replay the recommendation scoring rules over history for a parameter grid
+        """
+        logger.info("Executing tool 'backtest_strategy' with args: %s", arguments)
+        symbols = arguments.get("symbols") if arguments else None
+        if not isinstance(symbols, list) or not symbols:
+            raise ValueError("Missing required argument 'symbols' (non-empty list of strings)")
+        symbols = list(dict.fromkeys(str(symbol).strip() for symbol in symbols if str(symbol).strip()))
+        if len(symbols) > BATCH_MAX_SYMBOLS:
+            raise ValueError(f"Too many symbols: {len(symbols)} (maximum is {BATCH_MAX_SYMBOLS})")
+        interval = arguments.get("interval", "1min")
+        configs = backtest.parameter_grid(
+            [int(v) for v in arguments.get("short_periods") or [20]],
+            [int(v) for v in arguments.get("long_periods") or [50]],
+            [int(v) for v in arguments.get("rsi_periods") or [14]],
+            [float(v) for v in arguments.get("thresholds") or [0.5]],
+        )
+        if not configs:
+            raise ValueError("The parameter grid is empty (short periods must be below long periods)")
+        if len(configs) > BACKTEST_MAX_CONFIGS:
+            raise ValueError(f"Too many configurations: {len(configs)} (maximum is {BACKTEST_MAX_CONFIGS})")
+        cost_bps = float(arguments.get("cost_bps", 0))
+        allow_short = bool(arguments.get("allow_short", True))
+        top = int(arguments.get("top", 10))
+
+        closes, errors = await load_closes(symbols, interval)
+        tasks = [(symbol, chunk) for symbol in closes for chunk in backtest.chunked(configs, BACKTEST_CHUNK_SIZE)]
+        outputs = await asyncio.gather(
+            *(
+                compute_executor.run("backtest", backtest.backtest_symbol, closes[symbol], chunk, cost_bps, allow_short)
+                for symbol, chunk in tasks
+            )
+        )
+        results = backtest.results_frame([symbol for symbol, _ in tasks], outputs)
+        summary = backtest.summarize(results, top) if not results.empty else results
+        best = None
+        if not summary.empty:
+            fields = list(backtest.Config.__dataclass_fields__)
+            best_row = summary.iloc[0]
+            matches = (results[fields] == best_row[fields]).all(axis=1)
+            best = json.loads(results.loc[matches].drop(columns=fields).to_json(orient="records"))
+
+        result_dict = {
+            "interval": interval,
+            "configurations": len(configs),
+            "bars": {symbol: int(values.shape[0]) for symbol, values in closes.items()},
+            "ranking": json.loads(summary.to_json(orient="records")),
+            "best_by_symbol": best,
+            "errors": errors,
+        }
+        return [types.TextContent(type="text", text=json.dumps(result_dict))]
+
+    tool_handlers = {
+        "trade_recommendation": trade_recommendation,
+        "trade_recommendation_batch": trade_recommendation_batch,
+        "signal_events": signal_events,
+        "compute_indicators": compute_indicators,
+        "backtest_strategy": backtest_strategy,
+        "watchlist": manage_watchlist,
+    }
+
+    @app.call_tool()
+    async def call_tool(name: str, arguments: dict) -> list[types.TextContent | types.ImageContent | types.EmbeddedResource]:
+        """
+        Route a tool call to its handler
+        """
+        handler = tool_handlers.get(name)
+        if handler is None:
+            logger.error("Unknown tool requested: %s", name)
+            raise ValueError(f"Unknown tool: {name}")
+        with observability.tool_call(name):
+            return await handler(arguments)
+
     # --- MCP Prompts ---
     # These prompts guide an LLM (like Claude) on how to use the available tools
     # to perform specific financial analysis tasks.
@@ -577,9 +1262,9 @@ def main(port: int, transport: str) -> int:
         """
         Provide a detailed analysis prompt for a single stock ticker.
         """
-        logger.info(f"Generating prompt 'analyze_ticker' for args: {arguments}")
+        logger.info("Generating prompt 'analyze_ticker' for args: %s", arguments)
         if not arguments or "symbol" not in arguments:
-            logger.error(f"Missing required argument 'symbol' in analyze_ticker prompt request. Args: {arguments}")
+            logger.error("Missing required argument 'symbol' in analyze_ticker prompt request. Args: %s", arguments)
             raise ValueError("Missing required argument 'symbol'")
 
         symbol = arguments["symbol"]
@@ -605,17 +1290,17 @@ Present the analysis in a clear, professional format suitable for an investor re
         """
         Compare multiple stock tickers to find the best trading opportunity prompt.
         """
-        logger.info(f"Generating prompt 'compare_tickers' for args: {arguments}")
+        logger.info("Generating prompt 'compare_tickers' for args: %s", arguments)
         if name != "compare_tickers": # Keep existing name check
              raise ValueError(f"Unknown prompt: {name}")
         # Correct argument check for 'symbols' list
         if not arguments or "symbols" not in arguments:
-            logger.error(f"Missing required argument 'symbols' (list) in compare_tickers prompt request. Args: {arguments}")
+            logger.error("Missing required argument 'symbols' (list) in compare_tickers prompt request. Args: %s", arguments)
             raise ValueError("Missing required argument 'symbols' (list of strings)")
         symbols = arguments["symbols"] # Use 'symbols'
         # Check if symbols is actually a list
         if not isinstance(symbols, list):
-             logger.error(f"'symbols' argument is not a list in compare_tickers prompt request. Args: {arguments}")
+             logger.error("'symbols' argument is not a list in compare_tickers prompt request. Args: %s", arguments)
              raise ValueError("'symbols' argument must be a list of strings")
 
         symbol_list = ", ".join(symbols)
@@ -628,7 +1313,7 @@ Present the analysis in a clear, professional format suitable for an investor re
     For each stock in the list, please:
 
     1. Check the current market data using the appropriate resource (if available, otherwise rely on tools).
-    2. Generate a comprehensive trade recommendation using the trade_recommendation tool.
+    2. Generate trade recommendations for all of them with a single call to the trade_recommendation_batch tool.
     3. Compare all stocks based on:
     - Current trend direction and strength
     - Technical indicator signals
@@ -652,12 +1337,12 @@ Present the analysis in a clear, professional format suitable for an investor re
         """
         Build a custom intraday trading strategy for a specific ticker
         """
-        logger.info(f"Generating prompt 'intraday_strategy_builder' for args: {arguments}")
+        logger.info("Generating prompt 'intraday_strategy_builder' for args: %s", arguments)
         if name != "intraday_strategy_builder": # Keep existing name check
             raise ValueError(f"Unknown prompt: {name}")
 
         if not arguments or "symbol" not in arguments: # Check for 'symbol' based on current code
-             logger.error(f"Missing required argument 'symbol' in intraday_strategy_builder prompt request. Args: {arguments}")
+             logger.error("Missing required argument 'symbol' in intraday_strategy_builder prompt request. Args: %s", arguments)
              raise ValueError("please specify a stock symbol") # Keep existing error message
 
         symbol = arguments.get("symbol")
@@ -711,18 +1396,24 @@ My risk tolerance is {risk} and my allocated capital is {capital}.
             routes=[
                 Route("/sse", endpoint=handle_sse),
                 Mount("/messages/", app=sse.handle_post_message),
+                observability.metrics_route(),
             ],
+            lifespan=lambda _: server_lifespan(analyze_stock),
         )
         import uvicorn
 
-        logger.info(f"Starting SSE server on http://0.0.0.0:{port}")
+        logger.info("Starting SSE server on http://0.0.0.0:%s", port)
         uvicorn.run(starlette_app, host="0.0.0.0", port=port)
     else: # stdio
         from mcp.server.stdio import stdio_server
 
+        metrics_port = observability.start_metrics_server()
+        if metrics_port is not None:
+            logger.info("Serving metrics on port %s", metrics_port)
+
         async def arun():
             logger.info("Starting stdio server...")
-            async with stdio_server() as streams:
+            async with server_lifespan(analyze_stock), stdio_server() as streams:
                 await app.run(
                     streams[0], streams[1], app.create_initialization_options()
                 )
@@ -731,5 +1422,65 @@ My risk tolerance is {risk} and my allocated capital is {capital}.
         anyio.run(arun)
     return 0
 
-# Note: The if __name__ == "__main__": block is handled by the @click.command decorator
-# when the script is run directly or via `python -m`.
+def _int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item.strip()]
+
+@main.command("backtest")
+@click.argument("symbols", nargs=-1, required=True)
+@click.option("--interval", type=click.Choice(list(bars.INTERVAL_MINUTES)), default="1min", help="Bar interval")
+@click.option("--short", "short_periods", default="20", help="Comma-separated short MA windows")
+@click.option("--long", "long_periods", default="50", help="Comma-separated long MA windows")
+@click.option("--rsi", "rsi_periods", default="14", help="Comma-separated RSI windows")
+@click.option("--threshold", "thresholds", default="0.5", help="Comma-separated minimum signal strengths")
+@click.option("--cost-bps", default=0.0, help="Cost per position change in basis points")
+@click.option("--long-only", is_flag=True, help="Stay flat on bearish signals instead of going short")
+@click.option("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+@click.option("--offline", is_flag=True, help="Only use bars from the on-disk store")
+@click.option("--top", default=20, help="Number of best configurations to print")
+@click.option("--output", type=click.Path(dir_okay=False), help="Write all per-symbol results to this CSV file")
+def backtest_command(
+    symbols: Tuple[str, ...],
+    interval: str,
+    short_periods: str,
+    long_periods: str,
+    rsi_periods: str,
+    thresholds: str,
+    cost_bps: float,
+    long_only: bool,
+    workers: Optional[int],
+    offline: bool,
+    top: int,
+    output: Optional[str],
+) -> None:
+    """Backtest the recommendation scoring rules over a parameter grid."""
+    configs = backtest.parameter_grid(
+        _int_list(short_periods),
+        _int_list(long_periods),
+        _int_list(rsi_periods),
+        [float(item) for item in thresholds.split(",") if item.strip()],
+    )
+    if not configs:
+        raise click.UsageError("The parameter grid is empty (short periods must be below long periods)")
+
+    async def load() -> Tuple[Dict[str, np.ndarray], Dict[str, str]]:
+        try:
+            return await load_closes([symbol.upper() for symbol in symbols], interval, offline)
+        finally:
+            if _pending_writes:
+                await asyncio.gather(*_pending_writes, return_exceptions=True)
+            await http_client.close_client()
+
+    closes, errors = anyio.run(load)
+    for symbol, error in errors.items():
+        click.echo(f"Skipping {symbol}: {error}", err=True)
+    if not closes:
+        raise click.ClickException("No bar history available for any symbol")
+
+    click.echo(f"Backtesting {len(configs)} configurations on {len(closes)} symbols...", err=True)
+    results = backtest.run(closes, configs, cost_bps, not long_only, workers, BACKTEST_CHUNK_SIZE)
+    if output:
+        results.to_csv(output, index=False)
+    click.echo(backtest.summarize(results, top).to_string(index=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+# signals.py
+"""
+Vectorized detection of signal events over a bar history.
+
+Moving average crossovers and RSI threshold crossings are found with one
+NumPy comparison of each value against its predecessor, so scanning a full
+intraday history costs about as much as computing the indicators themselves.
+Every event is reported with its bar position and timestamp, not only the
+most recent one.
+"""
+
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from . import scoring
+from .indicators import rolling_mean, rsi_series
+
+GOLDEN_CROSS = "golden_cross"
+DEATH_CROSS = "death_cross"
+RSI_OVERSOLD = "rsi_oversold"
+RSI_OVERSOLD_EXIT = "rsi_oversold_exit"
+RSI_OVERBOUGHT = "rsi_overbought"
+RSI_OVERBOUGHT_EXIT = "rsi_overbought_exit"
+
+EVENT_TYPES = (GOLDEN_CROSS, DEATH_CROSS, RSI_OVERSOLD, RSI_OVERSOLD_EXIT, RSI_OVERBOUGHT, RSI_OVERBOUGHT_EXIT)
+
+EVENT_COLUMNS = ["timestamp", "event", "close", "short_ma", "long_ma", "rsi"]
+
+
+def crossing_masks(diff: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sign changes of a difference series along its last axis.
+
+    A change is upward when the previous value is <= 0 and the current one
+    > 0, downward when the previous value is >= 0 and the current one < 0
+    (NaN never crosses).
+
+    Args:
+        diff: e.g. short MA - long MA; 1-D or one series per row.
+
+    Returns:
+        (up, down) boolean arrays one shorter than `diff` along the last
+        axis; element i refers to the change from value i to value i + 1.
+    """
+    prev, curr = diff[..., :-1], diff[..., 1:]
+    with np.errstate(invalid="ignore"):
+        up = (prev <= 0) & (curr > 0)
+        down = (prev >= 0) & (curr < 0)
+    return up, down
+
+
+def first_crossover(short_ma: np.ndarray, long_ma: np.ndarray) -> int:
+    """
+    Direction of the earliest crossover in a (short) window of MA values.
+
+    Returns:
+        +1 for a golden cross, -1 for a death cross, 0 for none.
+    """
+    up, down = crossing_masks(np.asarray(short_ma, dtype=np.float64) - np.asarray(long_ma, dtype=np.float64))
+    events = np.flatnonzero(up | down)
+    if events.size == 0:
+        return 0
+    return 1 if up[events[0]] else -1
+
+
+def threshold_crossings(values: np.ndarray, level: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Bar positions where a series crosses a level.
+
+    Returns:
+        (above, below): positions of the bars on which the series moved from
+        <= level to > level, and from >= level to < level.
+    """
+    up, down = crossing_masks(np.asarray(values, dtype=np.float64) - level)
+    return np.flatnonzero(up) + 1, np.flatnonzero(down) + 1
+
+
+def scan(
+    closes: np.ndarray,
+    timestamps: np.ndarray,
+    short_period: int = 20,
+    long_period: int = 50,
+    rsi_period: int = 14,
+    lookback: Optional[int] = None,
+    oversold: float = scoring.RSI_OVERSOLD,
+    overbought: float = scoring.RSI_OVERBOUGHT,
+) -> pd.DataFrame:
+    """
+    Find every crossover and RSI threshold crossing in a close series.
+
+    Args:
+        closes: Close prices, oldest first.
+        timestamps: datetime64 timestamps aligned with `closes`.
+        short_period: Short moving average window.
+        long_period: Long moving average window.
+        rsi_period: RSI window.
+        lookback: Only report events within the last `lookback` bars (both
+            bars of a crossing must lie in the window). All bars by default.
+        oversold: RSI level marking oversold conditions.
+        overbought: RSI level marking overbought conditions.
+
+    Returns:
+        One row per event, oldest first, with the columns in EVENT_COLUMNS.
+    """
+    closes = np.asarray(closes, dtype=np.float64)
+    n = closes.shape[0]
+    short_ma = rolling_mean(closes, short_period)
+    long_ma = rolling_mean(closes, long_period)
+    rsi = rsi_series(closes, rsi_period)
+
+    golden, death = crossing_masks(short_ma - long_ma)
+    oversold_exit, oversold_enter = threshold_crossings(rsi, oversold)
+    overbought_enter, overbought_exit = threshold_crossings(rsi, overbought)
+    found: Dict[str, np.ndarray] = {
+        GOLDEN_CROSS: np.flatnonzero(golden) + 1,
+        DEATH_CROSS: np.flatnonzero(death) + 1,
+        RSI_OVERSOLD: oversold_enter,
+        RSI_OVERSOLD_EXIT: oversold_exit,
+        RSI_OVERBOUGHT: overbought_enter,
+        RSI_OVERBOUGHT_EXIT: overbought_exit,
+    }
+
+    positions = np.concatenate(list(found.values()))
+    kinds = np.repeat(np.array(list(found.keys()), dtype=object), [p.shape[0] for p in found.values()])
+    if lookback is not None:
+        keep = positions >= n - lookback + 1
+        positions, kinds = positions[keep], kinds[keep]
+    order = np.argsort(positions, kind="stable")
+    positions, kinds = positions[order], kinds[order]
+
+    return pd.DataFrame({
+        "timestamp": np.asarray(timestamps)[positions],
+        "event": kinds,
+        "close": closes[positions],
+        "short_ma": short_ma[positions],
+        "long_ma": long_ma[positions],
+        "rsi": rsi[positions],
+    }, columns=EVENT_COLUMNS)
+
+
+def last_events(events: pd.DataFrame) -> Dict[str, Optional[pd.Timestamp]]:
+    """Timestamp of the most recent event of each type (None if it never occurred)."""
+    latest = events.groupby("event", sort=False)["timestamp"].max()
+    return {event: latest.get(event) for event in EVENT_TYPES}
@@ -0,0 +1,73 @@
+# singleflight.py
+"""
+Request coalescing for concurrent identical calls.
+
+When several coroutines ask for the same key at once, only the first one
+starts the underlying call; the others await the same in-flight task and
+receive its result (or exception). The shared task is shielded, so a caller
+being cancelled does not cancel the work other callers are waiting on.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Registry of in-flight calls keyed by an arbitrary hashable key.
+
+    Attributes:
+        calls: Number of calls that actually executed the underlying function.
+        coalesced: Number of calls that joined an in-flight call instead.
+    """
+
+    def __init__(self) -> None:
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run `fn` for `key`, or join the call already in flight for that key.
+
+        Args:
+            key: Identifies equivalent calls.
+            fn: Zero-argument coroutine function performing the work.
+
+        Returns:
+            The result shared by every caller for this key.
+        """
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            logger.debug("Joining in-flight call for %s.", key)
+            return await asyncio.shield(task)
+
+        self.calls += 1
+        task = asyncio.get_running_loop().create_task(fn())
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._finish(key, t))
+        return await asyncio.shield(task)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Counters suitable for JSON serialization."""
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "inflight": len(self._inflight),
+        }
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved in case every waiter was cancelled.
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,178 @@
+# store.py
+"""
+Persistent on-disk store for intraday bars.
+
+Bars are written as Arrow IPC files partitioned by symbol, interval and
+trading day:
+
+    <root>/<SYMBOL>/<interval>/<YYYY-MM-DD>.arrow
+
+Partitions are read through memory maps rather than buffered file reads;
+the bars are then copied once into the returned DataFrame. Writes go to a
+temporary file that atomically replaces the partition.
+
+Symbols and intervals become path components, so only names matching
+`SYMBOL_PATTERN` and `INTERVAL_PATTERN` are accepted.
+
+pyarrow is an optional dependency; without it the store reports itself as
+unavailable and every operation is a no-op.
+"""
+
+import logging
+import os
+import re
+import tempfile
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:  # optional dependency
+    pa = None
+
+logger = logging.getLogger(__name__)
+
+FILE_SUFFIX = ".arrow"
+TIMESTAMP_COLUMN = "timestamp"
+# Ticker symbols such as "IBM", "BRK.B" or "RDS-A"; no path separators or dot-only names
+SYMBOL_PATTERN = re.compile(r"[A-Z0-9][A-Z0-9.\-]{0,15}")
+INTERVAL_PATTERN = re.compile(r"[a-z0-9]{1,16}")
+
+
+class BarStore:
+    """
+    Arrow IPC bar store rooted at a directory.
+
+    Args:
+        root: Directory holding the partitions; created on first write.
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(os.path.expanduser(root))
+        if pa is None:
+            logger.warning("pyarrow is not installed; the on-disk bar store is disabled.")
+
+    @property
+    def available(self) -> bool:
+        return pa is not None
+
+    def _series_dir(self, symbol: str, interval: str) -> str:
+        """
+        Directory of a series.
+
+        Raises:
+            ValueError: If the symbol or interval is not a valid name.
+        """
+        symbol = symbol.upper()
+        if not SYMBOL_PATTERN.fullmatch(symbol):
+            raise ValueError(f"Invalid symbol: {symbol!r}")
+        if not INTERVAL_PATTERN.fullmatch(interval):
+            raise ValueError(f"Invalid interval: {interval!r}")
+        return os.path.join(self.root, symbol, interval)
+
+    def days(self, symbol: str, interval: str) -> List[str]:
+        """Stored trading days for a symbol and interval, oldest first."""
+        directory = self._series_dir(symbol, interval)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name[: -len(FILE_SUFFIX)] for name in os.listdir(directory) if name.endswith(FILE_SUFFIX))
+
+    def series(self) -> List[Tuple[str, str, datetime]]:
+        """All stored (symbol, interval, last modified) combinations, most recently modified first."""
+        found = []
+        if not os.path.isdir(self.root):
+            return found
+        for symbol in os.listdir(self.root):
+            symbol_dir = os.path.join(self.root, symbol)
+            if not SYMBOL_PATTERN.fullmatch(symbol) or not os.path.isdir(symbol_dir):
+                continue
+            for interval in os.listdir(symbol_dir):
+                if not INTERVAL_PATTERN.fullmatch(interval):
+                    continue
+                modified = self.last_modified(symbol, interval)
+                if modified is not None:
+                    found.append((symbol, interval, modified))
+        found.sort(key=lambda item: item[2], reverse=True)
+        return found
+
+    def last_modified(self, symbol: str, interval: str) -> Optional[datetime]:
+        """Modification time of the newest partition, or None if nothing is stored."""
+        days = self.days(symbol, interval)
+        if not days:
+            return None
+        path = os.path.join(self._series_dir(symbol, interval), days[-1] + FILE_SUFFIX)
+        return datetime.fromtimestamp(os.path.getmtime(path))
+
+    def read(
+        self, symbol: str, interval: str, start: Optional[str] = None, end: Optional[str] = None
+    ) -> Optional[pd.DataFrame]:
+        """
+        Load stored bars, optionally restricted to a range of days.
+
+        Args:
+            symbol: The stock ticker symbol.
+            interval: The data interval.
+            start: First day to include ("YYYY-MM-DD"), inclusive.
+            end: Last day to include ("YYYY-MM-DD"), inclusive.
+
+        Returns:
+            The bars indexed by timestamp, or None if nothing is stored.
+        """
+        if pa is None:
+            return None
+        days = [d for d in self.days(symbol, interval) if (start is None or d >= start) and (end is None or d <= end)]
+        if not days:
+            return None
+        directory = self._series_dir(symbol, interval)
+        tables = []
+        for day in days:
+            path = os.path.join(directory, day + FILE_SUFFIX)
+            try:
+                with pa.memory_map(path, "r") as source:
+                    tables.append(pa.ipc.open_file(source).read_all())
+            except (OSError, pa.ArrowInvalid):
+                logger.warning("Skipping unreadable bar partition %s", path, exc_info=True)
+        if not tables:
+            return None
+        df = pa.concat_tables(tables, promote_options="default").to_pandas()
+        df = df.set_index(TIMESTAMP_COLUMN)
+        df.index.name = None
+        return df.sort_index()
+
+    def write(self, symbol: str, interval: str, df: pd.DataFrame, since: Optional[pd.Timestamp] = None) -> int:
+        """
+        Persist bars, replacing the partitions of every day they cover.
+
+        Args:
+            symbol: The stock ticker symbol.
+            interval: The data interval.
+            df: Bars indexed by timestamp. Each day written must be complete
+                (as held in the cache), since its partition is replaced.
+            since: Only write days on or after this timestamp's day.
+
+        Returns:
+            Number of partitions written.
+        """
+        if pa is None or df.empty:
+            return 0
+        directory = self._series_dir(symbol, interval)
+        os.makedirs(directory, exist_ok=True)
+        if since is not None:
+            df = df.loc[df.index >= pd.Timestamp(since).normalize()]
+        written = 0
+        for day, day_bars in df.groupby(df.index.normalize()):
+            table = pa.Table.from_pandas(day_bars.rename_axis(TIMESTAMP_COLUMN).reset_index(), preserve_index=False)
+            path = os.path.join(directory, day.strftime("%Y-%m-%d") + FILE_SUFFIX)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+                os.replace(tmp_path, path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+            written += 1
+        return written
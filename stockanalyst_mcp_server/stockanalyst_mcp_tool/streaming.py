@@ -0,0 +1,91 @@
+# streaming.py
+"""
+Partial results for long-running tool calls.
+
+MCP tool results are delivered in one piece, so a tool that needs a slow
+download only answers when everything is done. A `PartialResults` stream
+lets the tool publish intermediate stages while it works:
+
+- a progress notification (stage n of total) when the client sent a
+  progress token with the request, and
+- the stage's content as a JSON log message notification, which clients
+  display or consume as it arrives.
+
+Notifications are best effort: a failure to send (e.g. the client went away)
+is logged and never fails the tool call.
+"""
+
+import logging
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# When to send partial content: "progress" (only if the client asked for
+# progress), "always" or "off"
+MODES = ("progress", "always", "off")
+
+
+class PartialResults:
+    """
+    Publishes the stages of one tool call to the requesting client.
+
+    Args:
+        session: The MCP server session of the request, or None to disable.
+        progress_token: Token from the request's `_meta.progressToken`.
+        total: Number of stages the tool will publish.
+        source: Logger name attached to content notifications, e.g. the tool name.
+        send_content: Whether stage content is sent as log notifications.
+    """
+
+    def __init__(
+        self,
+        session: Any,
+        progress_token: Optional[str | int],
+        total: int,
+        source: str,
+        send_content: bool,
+    ):
+        self.session = session
+        self.progress_token = progress_token
+        self.total = total
+        self.source = source
+        self.send_content = send_content
+        self.published = 0
+
+    @classmethod
+    def for_request(cls, request_context: Any, total: int, source: str, mode: str = "progress") -> "PartialResults":
+        """
+        Build a stream for the current request.
+
+        Args:
+            request_context: `Server.request_context` of the call, or None
+                when the tool runs outside a request.
+            total: Number of stages.
+            source: Name identifying the tool in notifications.
+            mode: One of MODES.
+        """
+        if request_context is None or mode == "off":
+            return cls(None, None, total, source, False)
+        meta = request_context.meta
+        token = meta.progressToken if meta is not None else None
+        send_content = mode == "always" or token is not None
+        return cls(request_context.session, token, total, source, send_content)
+
+    @property
+    def enabled(self) -> bool:
+        return self.session is not None and (self.progress_token is not None or self.send_content)
+
+    async def publish(self, stage: str, data: Dict[str, Any]) -> None:
+        """Send one stage (progress and, if enabled, its content)."""
+        self.published += 1
+        if not self.enabled:
+            return
+        try:
+            if self.send_content:
+                await self.session.send_log_message(
+                    level="info", data={"stage": stage, "progress": self.published, "total": self.total, **data}, logger=self.source
+                )
+            if self.progress_token is not None:
+                await self.session.send_progress_notification(self.progress_token, self.published, self.total)
+        except Exception:
+            logger.warning("Could not send partial result %r for %s", stage, self.source, exc_info=True)
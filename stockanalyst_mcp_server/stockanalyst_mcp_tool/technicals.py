@@ -0,0 +1,190 @@
+# technicals.py
+"""
+Indicator specs for the `compute_indicators` tool.
+
+Each indicator is a vectorized function over a bar frame that returns one or
+more named output series. A spec is a mapping with the indicator name and
+optional parameters, e.g. {"name": "macd", "fast": 12, "slow": 26}; missing
+parameters take the function defaults. Recursive averages (EMA, MACD, ATR,
+Wilder RSI) are computed over the whole frame so they are warmed up before
+the values that are reported.
+"""
+
+import inspect
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .indicators import rolling_mean, rsi_series
+
+Outputs = Dict[str, np.ndarray]
+
+
+def ema(values: np.ndarray, span: int) -> np.ndarray:
+    """Exponential moving average with smoothing 2 / (span + 1), seeded with the first value."""
+    return pd.Series(values, dtype=np.float64).ewm(span=span, adjust=False).mean().to_numpy()
+
+
+def wilder_mean(values: np.ndarray, period: int) -> np.ndarray:
+    """Wilder's moving average: seeded with the mean of the first `period` values."""
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(values.shape[0], np.nan)
+    if period <= 0 or values.shape[0] < period:
+        return out
+    seeded = np.concatenate(([values[:period].mean()], values[period:]))
+    out[period - 1:] = pd.Series(seeded).ewm(alpha=1.0 / period, adjust=False).mean().to_numpy()
+    return out
+
+
+def _closes(df: pd.DataFrame) -> np.ndarray:
+    return df["close"].to_numpy(dtype=np.float64)
+
+
+def sma(df: pd.DataFrame, window: int = 20) -> Outputs:
+    return {"sma": rolling_mean(_closes(df), window)}
+
+
+def ema_indicator(df: pd.DataFrame, span: int = 20) -> Outputs:
+    return {"ema": ema(_closes(df), span)}
+
+
+def macd(df: pd.DataFrame, fast: int = 12, slow: int = 26, signal: int = 9) -> Outputs:
+    line = ema(_closes(df), fast) - ema(_closes(df), slow)
+    signal_line = ema(line, signal)
+    return {"macd": line, "signal": signal_line, "histogram": line - signal_line}
+
+
+def bollinger(df: pd.DataFrame, window: int = 20, num_std: float = 2.0) -> Outputs:
+    closes = _closes(df)
+    middle = rolling_mean(closes, window)
+    spread = pd.Series(closes).rolling(window).std(ddof=0).to_numpy()
+    return {"middle": middle, "upper": middle + num_std * spread, "lower": middle - num_std * spread}
+
+
+def atr(df: pd.DataFrame, period: int = 14) -> Outputs:
+    high = df["high"].to_numpy(dtype=np.float64)
+    low = df["low"].to_numpy(dtype=np.float64)
+    prev_close = np.concatenate(([np.nan], _closes(df)[:-1]))
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    return {"atr": wilder_mean(true_range, period)}
+
+
+def vwap(df: pd.DataFrame) -> Outputs:
+    """Volume weighted average (typical) price, restarting every trading day."""
+    typical = (df["high"].to_numpy(dtype=np.float64) + df["low"].to_numpy(dtype=np.float64) + _closes(df)) / 3
+    volume = df["volume"].to_numpy(dtype=np.float64)
+    day = df.index.normalize().asi8
+    starts = np.flatnonzero(np.concatenate(([True], day[1:] != day[:-1])))
+    # Cumulative sums restarted at each day boundary
+    cum_pv = np.cumsum(typical * volume)
+    cum_v = np.cumsum(volume)
+    lengths = np.diff(np.append(starts, day.shape[0]))
+    offset_pv = np.repeat(np.concatenate(([0.0], cum_pv[starts[1:] - 1])), lengths)
+    offset_v = np.repeat(np.concatenate(([0.0], cum_v[starts[1:] - 1])), lengths)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return {"vwap": (cum_pv - offset_pv) / (cum_v - offset_v)}
+
+
+def rsi(df: pd.DataFrame, period: int = 14, smoothing: str = "simple") -> Outputs:
+    if smoothing == "simple":
+        return {"rsi": rsi_series(_closes(df), period)}
+    if smoothing != "wilder":
+        raise ValueError(f"Unknown RSI smoothing: {smoothing}")
+    delta = np.diff(_closes(df))
+    avg_gain = wilder_mean(np.where(delta > 0, delta, 0.0), period)
+    avg_loss = wilder_mean(np.where(delta < 0, -delta, 0.0), period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = np.where(
+            avg_loss == 0, np.where(avg_gain == 0, 50.0, 100.0), 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+        )
+    values[np.isnan(avg_gain)] = np.nan
+    return {"rsi": np.concatenate(([np.nan], values))}
+
+
+# Allowed values of string parameters: (indicator, parameter) -> choices
+CHOICES = {("rsi", "smoothing"): ("simple", "wilder")}
+
+# Indicator name -> function(df, **params)
+INDICATORS: Dict[str, Callable[..., Outputs]] = {
+    "sma": sma,
+    "ema": ema_indicator,
+    "macd": macd,
+    "bollinger": bollinger,
+    "atr": atr,
+    "vwap": vwap,
+    "rsi": rsi,
+}
+
+
+def parameters(name: str) -> Dict[str, Any]:
+    """Parameter names and defaults of an indicator."""
+    signature = inspect.signature(INDICATORS[name])
+    return {p.name: p.default for p in list(signature.parameters.values())[1:]}
+
+
+def normalize_spec(spec: Mapping[str, Any]) -> Tuple[str, str, Dict[str, Any]]:
+    """
+    Validate a spec and fill in defaults.
+
+    Returns:
+        (label, name, params), where label identifies the spec in results,
+        e.g. "sma_20" or "macd_12_26_9".
+
+    Raises:
+        ValueError: If the indicator or one of its parameters is unknown or invalid.
+    """
+    if not isinstance(spec, Mapping) or "name" not in spec:
+        raise ValueError(f"Indicator spec must be an object with a 'name': {spec!r}")
+    name = str(spec["name"]).lower()
+    if name not in INDICATORS:
+        raise ValueError(f"Unknown indicator {name!r} (expected one of {', '.join(INDICATORS)})")
+    defaults = parameters(name)
+    unknown = set(spec) - set(defaults) - {"name"}
+    if unknown:
+        raise ValueError(f"Unknown parameters for {name}: {', '.join(sorted(unknown))}")
+    params = {}
+    for key, default in defaults.items():
+        value = spec.get(key, default)
+        try:
+            value = type(default)(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid value for {name}.{key}: {value!r}") from None
+        if isinstance(value, (int, float)) and value <= 0:
+            raise ValueError(f"{name}.{key} must be positive")
+        choices = CHOICES.get((name, key))
+        if choices is not None and value not in choices:
+            raise ValueError(f"{name}.{key} must be one of {', '.join(choices)}")
+        params[key] = value
+    label = "_".join([name] + [str(value) for value in params.values()])
+    return label, name, params
+
+
+def compute(
+    df: pd.DataFrame, specs: List[Tuple[str, str, Dict[str, Any]]], lookback: int = 1
+) -> Dict[str, Any]:
+    """
+    Evaluate normalized specs over a bar frame.
+
+    Args:
+        df: Bars indexed by timestamp in ascending order.
+        specs: Specs as returned by `normalize_spec`.
+        lookback: Number of trailing bars to report.
+
+    Returns:
+        {"timestamps": [...], "indicators": {label: {output: values}}}, with
+        one value per reported bar (a scalar when lookback is 1). Undefined
+        values (incomplete windows) are None.
+    """
+    tail = slice(-lookback, None)
+    indicators: Dict[str, Dict[str, Any]] = {}
+    for label, name, params in specs:
+        outputs = {}
+        for output, values in INDICATORS[name](df, **params).items():
+            reported: List[Optional[float]] = [None if np.isnan(v) else v for v in values[tail].tolist()]
+            outputs[output] = reported[-1] if lookback == 1 and reported else reported
+        indicators[label] = outputs
+    return {
+        "timestamps": [ts.isoformat() for ts in df.index[tail]],
+        "indicators": indicators,
+    }
@@ -0,0 +1,231 @@
+# watchlist.py
+"""
+Precomputed recommendations for a watchlist of symbols.
+
+Symbols that are queried all day are kept warm by a background task. It
+brings their cached bars up to date and runs the full analysis, so
+`trade_recommendation` answers them with a dictionary lookup instead of
+fetching and computing in the request path.
+
+Refreshes are paced to stay within a share of the AlphaVantage quota. With R
+calls per minute available to the warmer, consecutive refreshes are at least
+60 / R seconds apart. A full pass over N symbols therefore takes at least
+N * 60 / R seconds, even when the configured refresh interval is shorter. The
+least recently refreshed symbol always goes next.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .cache import background_refresh
+
+logger = logging.getLogger(__name__)
+
+# Refresher signature: symbol -> (analysis result, time its bars were fetched)
+Refresher = Callable[[str], Awaitable[Tuple[Dict[str, Any], datetime]]]
+
+
+@dataclass
+class Precomputed:
+    """
+    Analysis result kept for a watchlist symbol.
+
+    Attributes:
+        symbol: The stock ticker symbol.
+        result: The analysis result, as returned by the refresher.
+        data_updated: When the bars the result is based on were fetched.
+        computed_at: When the result was computed.
+    """
+
+    symbol: str
+    result: Dict[str, Any]
+    data_updated: datetime
+    computed_at: datetime
+
+    def age(self) -> float:
+        """Seconds elapsed since the underlying bars were fetched."""
+        return (datetime.now() - self.data_updated).total_seconds()
+
+
+class WatchlistWarmer:
+    """
+    Background refresher for a set of symbols.
+
+    Args:
+        symbols: Initial watchlist.
+        refresh_interval: Target number of seconds between refreshes of one symbol.
+        calls_per_minute: AlphaVantage calls per minute the warmer may use.
+        max_symbols: Maximum watchlist size.
+        max_age: Results based on older data are not served.
+    """
+
+    def __init__(
+        self,
+        symbols: Iterable[str] = (),
+        refresh_interval: float = 300.0,
+        calls_per_minute: float = 2.5,
+        max_symbols: int = 100,
+        max_age: float = 900.0,
+    ):
+        self.refresh_interval = refresh_interval
+        self.calls_per_minute = calls_per_minute
+        self.max_symbols = max_symbols
+        self.max_age = max_age
+        self.refreshes = 0
+        self.failures = 0
+        self.served = 0
+        self.expired = 0
+        # Symbol -> monotonic time of the last refresh attempt (0.0 = never)
+        self._attempts: Dict[str, float] = {}
+        self._results: Dict[str, Precomputed] = {}
+        self._errors: Dict[str, str] = {}
+        self._changed: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.add(symbols)
+
+    @staticmethod
+    def normalize(symbols: Iterable[str]) -> List[str]:
+        """Upper-case, strip and de-duplicate symbols, keeping their order."""
+        return list(dict.fromkeys(str(symbol).strip().upper() for symbol in symbols if str(symbol).strip()))
+
+    @property
+    def symbols(self) -> List[str]:
+        return list(self._attempts)
+
+    @property
+    def spacing(self) -> float:
+        """Minimum number of seconds between two refreshes."""
+        return 60.0 / self.calls_per_minute if self.calls_per_minute > 0 else 0.0
+
+    def cycle_seconds(self) -> float:
+        """Time needed to refresh every symbol once at the current pace."""
+        return max(self.refresh_interval, len(self._attempts) * self.spacing)
+
+    def add(self, symbols: Iterable[str]) -> List[str]:
+        """
+        Add symbols; new ones are refreshed first.
+
+        Raises:
+            ValueError: If the watchlist would exceed `max_symbols`.
+        """
+        new = [symbol for symbol in self.normalize(symbols) if symbol not in self._attempts]
+        if len(self._attempts) + len(new) > self.max_symbols:
+            raise ValueError(f"Watchlist is limited to {self.max_symbols} symbols")
+        for symbol in new:
+            self._attempts[symbol] = 0.0
+        if new:
+            self._notify()
+        return new
+
+    def remove(self, symbols: Iterable[str]) -> List[str]:
+        """Remove symbols and drop their results."""
+        removed = [symbol for symbol in self.normalize(symbols) if symbol in self._attempts]
+        for symbol in removed:
+            del self._attempts[symbol]
+            self._results.pop(symbol, None)
+            self._errors.pop(symbol, None)
+        return removed
+
+    def replace(self, symbols: Iterable[str]) -> None:
+        """Replace the whole watchlist."""
+        symbols = self.normalize(symbols)
+        if len(symbols) > self.max_symbols:
+            raise ValueError(f"Watchlist is limited to {self.max_symbols} symbols")
+        self.remove([symbol for symbol in self._attempts if symbol not in symbols])
+        self.add(symbols)
+
+    def lookup(self, symbol: str) -> Optional[Precomputed]:
+        """The precomputed result for a symbol, or None if there is none recent enough."""
+        found = self._results.get(str(symbol).strip().upper())
+        if found is None:
+            return None
+        if found.age() > self.max_age:
+            self.expired += 1
+            return None
+        self.served += 1
+        return found
+
+    def start(self, refresh: Refresher) -> None:
+        """Start the background task (also when the watchlist is still empty)."""
+        if self._task is None or self._task.done():
+            self._changed = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run(refresh))
+
+    async def aclose(self) -> None:
+        """Stop the background task."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Pace, counters and per-symbol status suitable for JSON serialization."""
+        symbols = {}
+        for symbol in self._attempts:
+            found = self._results.get(symbol)
+            symbols[symbol] = {
+                "recommendation": found.result.get("recommendation") if found else None,
+                "data_age_seconds": round(found.age(), 1) if found else None,
+                "computed_at": found.computed_at.isoformat() if found else None,
+                "error": self._errors.get(symbol),
+            }
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "refresh_interval": self.refresh_interval,
+            "calls_per_minute": self.calls_per_minute,
+            "cycle_seconds": round(self.cycle_seconds(), 1),
+            "max_age": self.max_age,
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "served": self.served,
+            "expired": self.expired,
+            "symbols": symbols,
+        }
+
+    def _notify(self) -> None:
+        if self._changed is not None:
+            self._changed.set()
+
+    def _next_due(self) -> Tuple[Optional[str], float]:
+        if not self._attempts:
+            return None, 0.0
+        symbol = min(self._attempts, key=self._attempts.__getitem__)
+        attempted = self._attempts[symbol]
+        return symbol, attempted + self.cycle_seconds() if attempted else 0.0
+
+    async def _run(self, refresh: Refresher) -> None:
+        # Fetches made from this task use the scheduler's background lane
+        background_refresh.set(True)
+        while True:
+            symbol, due = self._next_due()
+            delay = None if symbol is None else due - time.monotonic()
+            if delay is None or delay > 0:
+                # Sleep until the next symbol is due or the watchlist changes
+                self._changed.clear()
+                try:
+                    await asyncio.wait_for(self._changed.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            self._attempts[symbol] = time.monotonic()
+            try:
+                result, data_updated = await refresh(symbol)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failures += 1
+                if symbol in self._attempts:
+                    self._errors[symbol] = str(e)
+                logger.warning("Watchlist refresh failed for %s: %s", symbol, e)
+            else:
+                self.refreshes += 1
+                if symbol in self._attempts:
+                    self._results[symbol] = Precomputed(symbol, result, data_updated, datetime.now())
+                    self._errors.pop(symbol, None)
+                logger.debug("Watchlist refreshed %s.", symbol)
+            await asyncio.sleep(self.spacing)
@@ -2,6 +2,7 @@ import logging
 import json
 import anyio
 import click # Import click for CLI args
+import mcp_observability as observability
 # Remove FastAPI import
 from pydantic import ValidationError
 from mcp.server.lowlevel import Server as McpServer # Use lowlevel Server
@@ -14,7 +15,7 @@ from .schemas import GetTariffReactionNewsInput, SearchSuccessOutput, SearchErro
 from .tool import get_tariff_reaction_news
 
 # Configure basic logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+observability.configure_logging("tariff-news-server", level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # --- MCP Server Setup ---
@@ -44,40 +45,46 @@ async def list_tools() -> list[types.Tool]:
 
 @mcp_server.call_tool()
 async def call_tool(name: str, arguments: dict) -> list[types.TextContent]: # Correct return type hint
-    logger.info(f"Received call_tool request for tool: {name}")
+    logger.info("Received call_tool request for tool: %s", name)
     if name != TOOL_NAME:
-        logger.warning(f"Unknown tool requested: {name}")
+        logger.warning("Unknown tool requested: %s", name)
         # Raise standard ValueError for unknown tool with this API style
         raise ValueError(f"Unknown tool: {name}")
 
+    with observability.tool_call(name):
+        return _run_tool(arguments)
+
+
+def _run_tool(arguments: dict) -> list[types.TextContent]:
+    """Validates the arguments, runs the search and formats its result."""
     try:
         # Validate and parse input arguments using the Pydantic schema
         tool_input = GetTariffReactionNewsInput.model_validate(arguments or {})
-        logger.info(f"Parsed tool input: {tool_input}")
+        logger.info("Parsed tool input: %s", tool_input)
     except ValidationError as e:
-        logger.error(f"Invalid input arguments: {e}")
+        logger.error("Invalid input arguments: %s", e)
         # Raise standard ValueError for invalid params
         raise ValueError(f"Invalid input arguments: {e}")
 
     # Call the actual tool implementation
     result = get_tariff_reaction_news(tool_input)
-    logger.info(f"Tool execution result type: {type(result)}")
+    logger.info("Tool execution result type: %s", type(result))
 
     # Format the response based on success or error
     if isinstance(result, SearchSuccessOutput):
-        logger.info(f"Tool succeeded, returning {len(result.results)} results.")
+        logger.info("Tool succeeded, returning %s results.", len(result.results))
         # Serialize the Pydantic model to JSON string for the TextContentBlock
         response_text = result.model_dump_json(indent=2)
         return [types.TextContent(type="text", text=response_text)]
     elif isinstance(result, SearchErrorOutput):
-        logger.warning(f"Tool returned an error: {result.error}")
+        logger.warning("Tool returned an error: %s", result.error)
         # Serialize the error model to JSON string for the error message
         error_text = result.model_dump_json(indent=2)
         # Raise standard Exception for tool errors, MCP handles formatting it
         raise Exception(error_text)
     else:
         # Should not happen if tool function type hints are correct
-        logger.error(f"Unexpected return type from tool function: {type(result)}")
+        logger.error("Unexpected return type from tool function: %s", type(result))
         raise Exception("Unexpected internal server error.")
 
 
@@ -92,7 +99,8 @@ async def call_tool(name: str, arguments: dict) -> list[types.TextContent]: # Co
 )
 def main_cli(port: int, transport: str):
     """Runs the Tariff News MCP Server with the specified transport."""
-    logger.info(f"Starting server with transport: {transport}")
+    logger.info("Starting server with transport: %s", transport)
+    observability.configure_tracing("tariff-news-server")
 
     if transport == "sse":
         # Import SSE-specific components only when needed
@@ -105,14 +113,14 @@ def main_cli(port: int, transport: str):
             logger.error("Please install 'starlette' and 'uvicorn' for SSE transport: pip install starlette \"uvicorn[standard]\"")
             return 1 # Indicate error
 
-        logger.info(f"Configuring SSE transport on port {port}")
+        logger.info("Configuring SSE transport on port %s", port)
         # Define the SSE endpoint path, e.g., /mcp/sse
         sse_path = "/mcp/sse"
         sse_transport = SseServerTransport(sse_path)
 
         async def handle_sse(request):
             """Handles incoming SSE connection requests."""
-            logger.info(f"SSE connection request received from {request.client}")
+            logger.info("SSE connection request received from %s", request.client)
             async with sse_transport.connect_sse(
                 request.scope, request.receive, request._send
             ) as streams:
@@ -129,15 +137,20 @@ def main_cli(port: int, transport: str):
                 Route(sse_path, endpoint=handle_sse),
                 # Mount the POST handler for client messages
                 Mount(sse_transport.post_message_path, app=sse_transport.handle_post_message),
+                # Prometheus metrics
+                observability.metrics_route(),
             ],
         )
 
         # Run with Uvicorn
-        logger.info(f"Running Uvicorn server on 0.0.0.0:{port}")
+        logger.info("Running Uvicorn server on 0.0.0.0:%s", port)
         uvicorn.run(starlette_app, host="0.0.0.0", port=port)
 
     else: # Default to stdio
         logger.info("Configuring stdio transport")
+        metrics_port = observability.start_metrics_server()
+        if metrics_port is not None:
+            logger.info("Serving metrics on port %s", metrics_port)
         async def run_stdio():
             async with stdio_server() as streams:
                 logger.info("MCP stdio streams acquired. Running server...")
@@ -148,7 +161,7 @@ def main_cli(port: int, transport: str):
         except KeyboardInterrupt:
             logger.info("Stdio server stopped by user.")
         except Exception as e:
-            logger.error(f"Stdio server exited with error: {e}", exc_info=True)
+            logger.error("Stdio server exited with error: %s", e, exc_info=True)
             return 1 # Indicate error
 
     return 0 # Indicate success
@@ -2,6 +2,7 @@ import logging
 from typing import Union, List, Optional
 from urllib.parse import urlparse
 from duckduckgo_search import DDGS
+from mcp_observability import upstream_request
 from .schemas import (
     GetTariffReactionNewsInput,
     SearchResultItem,
@@ -30,14 +31,14 @@ def get_tariff_reaction_news(
         query_parts.append(input_data.additional_keywords)
 
     search_query = " ".join(query_parts)
-    logger.info(f"Executing search with query: '{search_query}'")
+    logger.info("Executing search with query: '%s'", search_query)
 
     results: List[SearchResultItem] = []
     try:
         # Use DDGS context manager for search
         # timelimit='w' searches for results from the past week
         # region='wt-wt' is world-wide search
-        with DDGS() as ddgs:
+        with DDGS() as ddgs, upstream_request("duckduckgo") as call:
             search_results = ddgs.news(
                 keywords=search_query,
                 region="wt-wt",
@@ -45,6 +46,7 @@ def get_tariff_reaction_news(
                 timelimit="w", # Past week
                 max_results=10 # Limit results for brevity
             )
+            call.status = "ok"
 
             if not search_results:
                  logger.info("No results found from DDGS.")
@@ -59,7 +61,7 @@ def get_tariff_reaction_news(
                         # Remove www. if present
                         source = parsed_url.netloc.replace("www.", "")
                 except Exception:
-                    logger.warning(f"Could not parse source from URL: {r.get('url')}", exc_info=True)
+                    logger.warning("Could not parse source from URL: %s", r.get('url'), exc_info=True)
 
                 results.append(
                     SearchResultItem(
@@ -72,7 +74,7 @@ def get_tariff_reaction_news(
                 )
 
     except Exception as e:
-        logger.error(f"Error during DuckDuckGo search: {e}", exc_info=True)
+        logger.error("Error during DuckDuckGo search: %s", e, exc_info=True)
         return SearchErrorOutput(error=f"Error connecting to search service or processing results: {e}")
 
     if not results:
@@ -80,5 +82,5 @@ def get_tariff_reaction_news(
          # This case might be redundant if DDGS already returned empty, but good safety check
          return SearchErrorOutput(error="No results found after processing.")
 
-    logger.info(f"Found {len(results)} results.")
+    logger.info("Found %s results.", len(results))
     return SearchSuccessOutput(results=results)
\ No newline at end of file